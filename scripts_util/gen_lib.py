@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import Optional
+
 import sys
 import argparse
 from pathlib import Path
@@ -20,7 +22,9 @@ from pathlib import Path
 from bag.io import read_yaml
 from bag.core import BagProject
 
-from bag3_digital.measurement.liberty.io import generate_liberty
+from bag3_digital.measurement.liberty.io import (
+    generate_liberty, generate_liberty_library, regenerate_liberty_library
+)
 
 
 def _info(etype, value, tb):
@@ -43,9 +47,16 @@ sys.excepthook = _info
 
 def parse_options() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Generate libert file from spec file.')
-    parser.add_argument('specs', help='Cell specification yaml file name.')
+    parser.add_argument('specs', nargs='*', help='Cell specification yaml file names.')
+    parser.add_argument('-m', '--manifest', default='',
+                        help='Library manifest yaml file name, listing cell specification files.')
+    parser.add_argument('-n', '--lib_name', default='',
+                        help='If given, also write a merged liberty file containing all cells.')
     parser.add_argument('-f', '--fake', dest='fake', action='store_true', default=False,
                         help='generate fake liberty file.')
+    parser.add_argument('--estimate', action='store_true', default=False,
+                        help='generate preview liberty file from analytic estimates, '
+                             'without simulation.')
     parser.add_argument('-x', '--extract', dest='extract', action='store_true', default=False,
                         help='Run extracted simulation.')
     parser.add_argument('--force_extract', action='store_true', default=False,
@@ -58,19 +69,70 @@ def parse_options() -> argparse.Namespace:
                         help='Generate liberty file for all defined environments.')
     parser.add_argument('-l', '--export_lay', action='store_true', default=False,
                         help='Use CAD tool to export GDS.')
+    parser.add_argument('-j', '--max_jobs', type=int, default=0,
+                        help='Maximum number of cell/corner jobs to characterize concurrently.  '
+                             '0 for no limit.')
+    parser.add_argument('-i', '--incremental', action='store_true', default=False,
+                        help='Only re-characterize arcs that changed since the last run.')
+    parser.add_argument('--stream', action='store_true', default=False,
+                        help='Write timing data to disk as soon as it is characterized.')
+    parser.add_argument('-r', '--resume', action='store_true', default=False,
+                        help='Resume an interrupted run, skipping completed measurements.')
+    parser.add_argument('-t', '--telemetry', action='store_true', default=False,
+                        help='Record per-measurement timing, and write a trace timeline.')
+    parser.add_argument('--regen', action='store_true', default=False,
+                        help='Regenerate liberty files from stored characterization results, '
+                             'without simulation.')
     args = parser.parse_args()
+    if not args.specs and not args.manifest:
+        parser.error('Must specify cell specification files or a library manifest.')
     return args
 
 
 def run_main(prj: BagProject, args: argparse.Namespace) -> None:
-    specs_path = Path(args.specs)
-    root_dir = specs_path.parent
-    specs = read_yaml(specs_path)
+    lib_name: str = args.lib_name
+    db_root_dir: Optional[Path] = None
+    impl_lib = ''
+    if args.manifest:
+        manifest_path = Path(args.manifest)
+        root_dir = manifest_path.parent
+        manifest = read_yaml(manifest_path)
+        specs_list = [root_dir / fname for fname in manifest['cells']]
+        lib_name = lib_name or manifest.get('lib_name', '')
+        impl_lib = manifest.get('impl_lib', '')
+        if 'root_dir' in manifest:
+            db_root_dir = Path(manifest['root_dir'])
+    else:
+        specs_list = [Path(fname) for fname in args.specs]
+        root_dir = specs_list[0].parent
+
     lib_config = read_yaml(root_dir / 'lib_config.yaml')
+    if args.regen:
+        cell_specs_list = [read_yaml(specs_path) for specs_path in specs_list]
+        regenerate_liberty_library(lib_config, cell_specs_list, lib_name=lib_name,
+                                   root_dir=db_root_dir, gen_all_env=args.gen_all_env)
+        return
+
     sim_config = read_yaml(root_dir / 'sim_config.yaml')
-    generate_liberty(prj, lib_config, sim_config, specs, fake=args.fake, extract=args.extract,
-                     force_sim=args.force_sim, force_extract=args.force_extract,
-                     gen_sch=args.gen_sch, gen_all_env=args.gen_all_env, export_lay=args.export_lay)
+    if len(specs_list) == 1 and not lib_name:
+        specs = read_yaml(specs_list[0])
+        generate_liberty(prj, lib_config, sim_config, specs, fake=args.fake, extract=args.extract,
+                         force_sim=args.force_sim, force_extract=args.force_extract,
+                         gen_sch=args.gen_sch, gen_all_env=args.gen_all_env,
+                         export_lay=args.export_lay, max_env_jobs=args.max_jobs,
+                         incremental=args.incremental, stream=args.stream,
+                         estimate=args.estimate, resume=args.resume,
+                         telemetry=args.telemetry)
+    else:
+        cell_specs_list = [read_yaml(specs_path) for specs_path in specs_list]
+        generate_liberty_library(prj, lib_config, sim_config, cell_specs_list, lib_name=lib_name,
+                                 root_dir=db_root_dir, impl_lib=impl_lib, fake=args.fake,
+                                 extract=args.extract, force_sim=args.force_sim,
+                                 force_extract=args.force_extract, gen_sch=args.gen_sch,
+                                 gen_all_env=args.gen_all_env, export_lay=args.export_lay,
+                                 max_jobs=args.max_jobs, incremental=args.incremental,
+                                 stream=args.stream, estimate=args.estimate,
+                                 resume=args.resume, telemetry=args.telemetry)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,197 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Tuple, Mapping, Union, Sequence, Dict, List, cast
+
+import math
+
+import numpy as np
+
+from pybag.core import get_cdba_name_bits
+
+from bag.simulation.core import TestbenchManager
+from bag.simulation.cache import SimulationDB, DesignInstance, SimResults, MeasureResult
+from bag.simulation.measure import MeasurementManager, MeasInfo
+
+from bag3_liberty.util import cdba_to_unusal
+
+from bag3_testbenches.measurement.ac.base import ACTB
+from bag3_testbenches.measurement.tran.digital import DigitalTranTB
+
+from ..util import get_select_expr
+
+
+class CapACAdmittance(MeasurementManager):
+    """Measures input capacitance of many pins from a single AC simulation.
+
+    Every input is driven through a resistor r_src, and the probed pin has a unit AC source, so
+    its capacitance is Im(1 / v) / (2 * pi * freq * r_src).  This is averaged over the bias
+    points of the probed pin, and the maximum over all logic states is reported.
+
+    Notes
+    -----
+    specification dictionary has the following entries:
+
+    in_pins : Sequence[str]
+        the input pins to measure.
+    tbm_specs : Mapping[str, Any]
+        testbench specifications, with the same sim_envs, pwr_domain, sup_values, pin_values,
+        and reset_list entries as DigitalTranTB.  Only one corner is supported.
+    freq : float
+        Defaults to 1 GHz.  the AC frequency.
+    r_src : float
+        Defaults to 1 MOhm.  the source resistance.
+    num_bias : int
+        Defaults to 5.  number of bias points of the probed pin.
+    states : Sequence[Mapping[str, int]]
+        Optional.  logic states to measure at, each one updating pin_values.  Defaults to the
+        pin_values state only, with reset pins deasserted.  States that change the input load,
+        such as mux selects, must be listed.
+    gnd_name : str
+        Defaults to 'VSS'.  the testbench ground net.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._in_bits: List[str] = []
+        super().__init__(*args, **kwargs)
+
+    def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
+        in_pins: Sequence[str] = self.specs['in_pins']
+
+        self._in_bits = [bit_name for pin in in_pins for bit_name in get_cdba_name_bits(pin)]
+        if not self._in_bits:
+            raise ValueError('No input pins to measure.')
+        return False, MeasInfo('ac', {})
+
+    def get_sim_info(self, sim_db: SimulationDB, dut: DesignInstance, cur_info: MeasInfo
+                     ) -> Tuple[Union[Tuple[TestbenchManager, Mapping[str, Any]],
+                                      MeasurementManager], bool]:
+        specs = self.specs
+        tbm_specs_orig: Mapping[str, Any] = specs['tbm_specs']
+        freq: float = specs.get('freq', 1.0e9)
+        r_src: float = specs.get('r_src', 1.0e6)
+        num_bias: int = specs.get('num_bias', 5)
+        gnd_name: str = specs.get('gnd_name', 'VSS')
+
+        sim_envs: Sequence[str] = tbm_specs_orig['sim_envs']
+        pwr_domain: Mapping[str, Tuple[str, str]] = tbm_specs_orig['pwr_domain']
+        sup_values: Mapping[str, Union[float, Mapping[str, float]]] = \
+            tbm_specs_orig['sup_values']
+        if len(sim_envs) != 1:
+            raise ValueError('Corner sweep is not supported.')
+        sim_env = sim_envs[0]
+
+        sup_table = {}
+        src_list = []
+        for sup_name, sup_val in sup_values.items():
+            if isinstance(sup_val, Mapping):
+                sup_val = sup_val[sim_env]
+            sup_table[sup_name] = sup_val
+            if sup_name != gnd_name:
+                src_list.append(dict(type='vdc', lib='analogLib', value=sup_val,
+                                     conns=dict(PLUS=sup_name, MINUS=gnd_name)))
+
+        states: Sequence[Mapping[str, int]] = specs.get('states', None) or [{}]
+        pin_values: Mapping[str, int] = tbm_specs_orig.get('pin_values', {})
+        logic_list = [_get_logic_values(dict(tbm_specs_orig, pin_values=dict(pin_values, **state)))
+                      for state in states]
+        sim_params = {}
+        for idx, bit_name in enumerate(self._in_bits):
+            vss_name, vdd_name = DigitalTranTB.get_pin_supplies(bit_name, pwr_domain)
+            v_lo = sup_table[vss_name]
+            v_hi = sup_table[vdd_name]
+            v_logic = get_select_expr('i_state', [v_hi if logic_table.get(bit_name, 0) else v_lo
+                                                  for logic_table in logic_list])
+            sel = get_select_expr('i_pin', [int(k == idx) for k in range(len(self._in_bits))])
+
+            base = cdba_to_unusal(bit_name)
+            v_name = f'v_{base}'
+            acm_name = f'acm_{base}'
+            sim_params[v_name] = f'{v_logic}+({sel})*({v_lo:.9g}+v_frac*({v_hi - v_lo:.9g})' \
+                                 f'-({v_logic}))'
+            sim_params[acm_name] = sel
+            src_name = f'{base}_src_'
+            src_list.append(dict(type='vdc', lib='analogLib',
+                                 value=dict(vdc=v_name, acm=acm_name),
+                                 conns=dict(PLUS=src_name, MINUS=gnd_name)))
+            src_list.append(dict(type='res', lib='analogLib', value=r_src,
+                                 conns=dict(PLUS=src_name, MINUS=bit_name)))
+
+        # NOTE: the DUT is instantiated directly, so every DUT pin is a testbench net
+        tbm_specs = dict(
+            sim_envs=sim_envs,
+            sim_params=sim_params,
+            dut_pins=list(dut.sch_master.pins.keys()),
+            src_list=src_list,
+            load_list=[],
+            swp_info=[('i_state', dict(type='LIST', values=list(range(len(states))))),
+                      ('i_pin', dict(type='LIST', values=list(range(len(self._in_bits))))),
+                      ('v_frac', dict(type='LIST',
+                                      values=np.linspace(0, 1, num_bias).tolist()))],
+            sweep_var='freq',
+            sweep_options=dict(type='LIST', values=[freq]),
+            save_outputs=self._in_bits,
+        )
+        tbm = cast(ACTB, sim_db.make_tbm(ACTB, tbm_specs))
+        return (tbm, {}), True
+
+    def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
+                       ) -> Tuple[bool, MeasInfo]:
+        specs = self.specs
+        freq: float = specs.get('freq', 1.0e9)
+        r_src: float = specs.get('r_src', 1.0e6)
+        num_bias: int = specs.get('num_bias', 5)
+        num_states = len(specs.get('states', None) or [{}])
+
+        data = cast(SimResults, sim_results).data
+        num_pins = len(self._in_bits)
+        # NOTE: make sure the testbench ran the requested sweep, as a testbench that ignores
+        # any of the specifications would still produce plausible numbers.
+        swp_names = [var for var in data.sweep_params if var in {'i_state', 'i_pin', 'v_frac'}]
+        if swp_names != ['i_state', 'i_pin', 'v_frac']:
+            raise ValueError(f'ACTB did not run the input cap sweep, got sweep {swp_names}.')
+        shape = (num_states, num_pins, num_bias)
+        ans = {}
+        for idx, bit_name in enumerate(self._in_bits):
+            v_ac = np.asarray(data[bit_name])
+            if v_ac.size != num_states * num_pins * num_bias:
+                raise ValueError(f'ACTB output {bit_name} has {v_ac.size} points, '
+                                 f'expected sweep shape {shape}.')
+            v_ac = v_ac.reshape(shape)[:, idx, :]
+            cap_list = np.imag(1 / v_ac) / (2 * math.pi * freq * r_src)
+            cap = float(np.max(np.mean(cap_list, axis=1)))
+            if cap <= 0:
+                raise ValueError(f'Nonpositive AC input capacitance of {bit_name}: {cap:.4g}')
+            ans[bit_name] = dict(cap_rise=cap, cap_fall=cap)
+
+        return True, MeasInfo('done', ans)
+
+
+def _get_logic_values(tbm_specs: Mapping[str, Any]) -> Dict[str, int]:
+    """Returns logic values of input bits after reset."""
+    pin_values: Mapping[str, int] = tbm_specs.get('pin_values', {})
+    reset_list: Sequence[Tuple[str, bool]] = tbm_specs.get('reset_list', [])
+
+    ans = {}
+    for pin, val in pin_values.items():
+        bit_list = get_cdba_name_bits(pin)
+        num_bits = len(bit_list)
+        # NOTE: bus values are integers, most significant bit first
+        for idx, bit_name in enumerate(bit_list):
+            ans[bit_name] = (val >> (num_bits - 1 - idx)) & 1
+    for pin, active_high in reset_list:
+        for bit_name in get_cdba_name_bits(pin):
+            ans[bit_name] = int(not active_high)
+    return ans
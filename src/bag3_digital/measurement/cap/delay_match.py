@@ -15,12 +15,21 @@
 
 from __future__ import annotations
 
-from typing import Any, Tuple, Mapping, Optional, Union, Sequence, cast
+from typing import Any, Tuple, Mapping, Optional, Union, Sequence, Dict, List, cast
 
+import os
 import pprint
+import asyncio
+from copy import deepcopy
+from pathlib import Path
+from uuid import uuid4
 
+import numpy as np
+
+from bag.concurrent.util import GatherHelper
 from bag.simulation.core import TestbenchManager
 from bag.simulation.cache import SimulationDB, DesignInstance, SimResults, MeasureResult
+from bag.simulation.data import SimData
 from bag.simulation.measure import MeasurementManager, MeasInfo
 
 from bag3_testbenches.measurement.data.tran import EdgeType
@@ -29,7 +38,9 @@ from bag3_testbenches.measurement.digital.util import setup_digital_tran
 from bag3_testbenches.measurement.digital.delay_match import DelayMatch
 
 from ..util import get_digital_wrapper_params, get_in_buffer_pin_names
-
+from ..liberty.cache import get_content_hash
+from .secant import DelayMatchSecant
+from ..estimate import RCEstimator
 
 class CapDelayMatch(MeasurementManager):
     """Measures input capacitance by matching delay.
@@ -42,8 +53,40 @@ class CapDelayMatch(MeasurementManager):
 
     in_pin : str
         input pin name.
+    concurrent_edges : bool
+        Defaults to False.  True to search rising and falling capacitance at the same time.
+        Otherwise, the falling search waits for the rising one, and uses its result as guess.
+    ref_curve : Optional[Mapping[str, Any]]
+        Optional.  If given, get capacitance from the delay vs. load curve of the reference
+        buffer instead of searching.  The curve does not depend on the DUT, so it is simulated
+        once in a single sweep, shared by measurements given the same set_ref_curve_tasks()
+        table, and cached on disk.  Falls back to the search if the reference delay is outside
+        of the curve.  Capacitances from the curve have no tr_adj and tf_adj results, which
+        are the buffer delays measured at the matched load by the search.  Has the following
+        entries:
+
+        path : str
+            the cache directory.
+        low : float
+            Defaults to search_params low.  smallest load capacitance of the curve.
+        high : float
+            Defaults to search_params high.  largest load capacitance of the curve.
+        num : int
+            Defaults to 65.  number of points of the curve.
     fake : bool
         Defaults to False.  True to generate fake data.
+    estimate : Optional[Mapping[str, Any]]
+        Optional.  If given, estimate input capacitance analytically instead of simulating.
+        Has the following entries:
+
+        rc_table : Mapping[str, Any]
+            the technology RC table.  See RCEstimator.
+        seg_in : int
+            number of unit segments connected to the input pin.
+    reset_state : Optional[Mapping[str, Any]]
+        Optional.  Used only by the 'illinois' search method.  If given, the search simulates
+        the reset window once, and starts every iteration from its final state.  See
+        bag3_digital.measurement.reset.
     buf_params : Optional[Mapping[str, Any]]
         Optional.  Input buffer parameters.
     buf_config : Optional[Mapping[str, Any]]
@@ -64,6 +107,9 @@ class CapDelayMatch(MeasurementManager):
             raise an error.
         overhead_factor : float
             ratio of simulation startup time to time it takes to simulate one sweep point.
+        method : str
+            Defaults to 'bisect'.  'illinois' to interpolate the next capacitance from the
+            measured delay errors instead.  See DelayMatchSecant.
     tbm_specs : Mapping[str, Any]
         DigitalTranTB related specifications.  The following simulation parameters are required:
 
@@ -88,8 +134,12 @@ class CapDelayMatch(MeasurementManager):
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self._tbm_info: Optional[Tuple[DigitalTranTB, Mapping[str, Any]]] = None
-        self._mm: Optional[DelayMatch] = None
+        self._mm: Optional[Union[DelayMatch, DelayMatchSecant]] = None
         self._wrapper_params: Mapping[str, Any] = {}
+        self._curve_file: Optional[Path] = None
+        self._curve_tbm: Optional[DigitalTranTB] = None
+        self._curve: Optional[Mapping[str, np.ndarray]] = None
+        self._curve_tasks: Dict[Path, asyncio.Future] = {}
 
         # TODO: make cap measurement more accurate by determining buf_params automatically
         # TODO: add option to automatically adjust load cap to determine input cap accurately
@@ -99,6 +149,71 @@ class CapDelayMatch(MeasurementManager):
     def wrapper_params(self) -> Mapping[str, Any]:
         return self._wrapper_params
 
+    def set_ref_curve_tasks(self, tasks: Dict[Path, asyncio.Future]) -> None:
+        """Share reference curve simulations in progress with other measurements."""
+        self._curve_tasks = tasks
+
+    async def async_measure_performance(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                                        dut: Optional[DesignInstance]) -> Dict[str, Any]:
+        concurrent_edges: bool = self.specs.get('concurrent_edges', False)
+        if not concurrent_edges and not self.specs.get('ref_curve', None):
+            return await super().async_measure_performance(name, sim_dir, sim_db, dut)
+
+        done, cur_info = self.initialize(sim_db, dut)
+        if done:
+            return cur_info.prev_results
+
+        tbm, tb_params = self._tbm_info
+        sim_results = await sim_db.async_simulate_tbm_obj('init', sim_dir / 'init', dut, tbm,
+                                                          tb_params, tb_name=f'{name}_init')
+        done, cur_info = self.process_output(cur_info, sim_results)
+        if not done and cur_info.state == 'ref_curve':
+            # NOTE: the curve does not depend on the DUT, so all pins share one simulation
+            curve_file = self._curve_file
+            curve_tasks = self._curve_tasks
+            task = curve_tasks.get(curve_file, None)
+            if task is not None:
+                self._curve = await task
+            elif curve_file.is_file():
+                # another pin finished the simulation after this one was initialized
+                self._load_ref_curve()
+            else:
+                curve_tasks[curve_file] = task = asyncio.ensure_future(
+                    self._async_simulate_ref_curve(name, sim_dir, sim_db))
+                task.add_done_callback(lambda _: curve_tasks.pop(curve_file, None))
+                self._curve = await task
+            done, cur_info = self._invert_ref_curve(cur_info.prev_results)
+        if done:
+            return cur_info.prev_results
+        if not concurrent_edges:
+            while not done:
+                state = cur_info.state
+                mm = cast(MeasurementManager, self.get_sim_info(sim_db, dut, cur_info)[0])
+                sim_results = await sim_db.async_simulate_mm_obj(f'{name}_{state}',
+                                                                 sim_dir / state, None, mm)
+                done, cur_info = self.process_output(cur_info, sim_results)
+            return cur_info.prev_results
+        ans = dict(cur_info.prev_results)
+
+        # NOTE: each edge gets its own copy of DelayMatch specifications, so that the two
+        # searches do not interfere with each other.
+        gatherer = GatherHelper()
+        for state in ['cap_rise', 'cap_fall']:
+            mm_specs = deepcopy(self._mm.specs)
+            _set_edge_specs(mm_specs, state == 'cap_rise', ans)
+            mm = sim_db.make_mm(type(self._mm), mm_specs)
+            gatherer.append(sim_db.async_simulate_mm_obj(f'{name}_{state}', sim_dir / state,
+                                                         None, mm))
+        rise_results, fall_results = await gatherer.gather_err()
+
+        data = rise_results.data['c_load']
+        ans['cap_rise'] = data['value']
+        ans['tr_adj'] = data['td_adj']
+        data = fall_results.data['c_load']
+        ans['cap_fall'] = data['value']
+        ans['tf_adj'] = data['td_adj']
+        return ans
+
     def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
         specs = self.specs
         in_pin: str = specs['in_pin']
@@ -106,12 +221,19 @@ class CapDelayMatch(MeasurementManager):
         buf_params: Optional[Mapping[str, Any]] = specs.get('buf_params', None)
         buf_config: Optional[Mapping[str, Any]] = specs.get('buf_config', None)
         fake: bool = specs.get('fake', False)
+        estimate: Optional[Mapping[str, Any]] = specs.get('estimate', None)
         load_list: Sequence[Mapping[str, Any]] = specs.get('load_list', [])
 
         if fake:
             return True, MeasInfo('done', dict(cap_rise=1.0e-12, cap_fall=1.0e-12,
                                                tr_ref=50.0e-12, tf_ref=50.0e-12,
                                                tr_adj=50.0e-12, tf_adj=50.0e-12))
+        if estimate is not None:
+            tbm_specs: Mapping[str, Any] = specs['tbm_specs']
+            estimator = RCEstimator(estimate['rc_table'], tbm_specs['sim_envs'][0],
+                                    tbm_specs['thres_lo'], tbm_specs['thres_hi'])
+            cap = estimator.get_in_cap(estimate['seg_in'])
+            return True, MeasInfo('done', dict(cap_rise=cap, cap_fall=cap))
 
         if buf_params is None and buf_config is None:
             raise ValueError('one of buf_params or buf_config must be specified.')
@@ -198,8 +320,21 @@ class CapDelayMatch(MeasurementManager):
                              td='t_bit', pos=True)],
             load_list=[dict(pin='out', type='cap', value='c_load')],
         )
+        search_params = dict(**search_params)
+        method: str = search_params.pop('method', 'bisect')
+        if method == 'bisect':
+            mm_cls = DelayMatch
+        elif method == 'illinois':
+            mm_cls = DelayMatchSecant
+            reset_state: Optional[Mapping[str, Any]] = specs.get('reset_state', None)
+            if reset_state:
+                mm_specs['reset_state'] = reset_state
+        else:
+            raise ValueError(f'Unknown capacitance search method: {method}')
+        mm_specs['search_params'] = search_params
         mm_specs.update(search_params)
-        self._mm = sim_db.make_mm(DelayMatch, mm_specs)
+        self._mm = sim_db.make_mm(mm_cls, mm_specs)
+        self._setup_ref_curve()
 
         return False, MeasInfo('init', {})
 
@@ -209,22 +344,26 @@ class CapDelayMatch(MeasurementManager):
         state = cur_info.state
         if state == 'init':
             return self._tbm_info, True
-        elif state == 'cap_rise':
+        elif state == 'ref_curve':
             mm_specs = self._mm.specs
             adj_params = mm_specs['adj_params']
-            adj_params['out_edge'] = EdgeType.RISE
-            adj_params['in_edge'] = EdgeType.FALL
-            mm_specs['ref_delay'] = cur_info.prev_results['tr_ref']
-
+            tbm_specs, tb_params = setup_digital_tran(mm_specs, None,
+                                                      wrapper_params=mm_specs['wrapper_params'],
+                                                      pulse_list=mm_specs['pulse_list'],
+                                                      load_list=mm_specs['load_list'])
+            tbm_specs['save_outputs'] = [adj_params['in_name'], adj_params['out_name']]
+            tbm_specs['swp_info'] = [('c_load', dict(type='LIST',
+                                                     values=self._get_curve_values()))]
+            self._curve_tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, tbm_specs))
+            return (self._curve_tbm, tb_params), False
+        elif state == 'cap_rise':
+            _set_edge_specs(self._mm.specs, True, cur_info.prev_results)
             self._mm.commit()
             return self._mm, False
         elif state == 'cap_fall':
             cap_rise = cur_info.prev_results['cap_rise']
             mm_specs = self._mm.specs
-            adj_params = mm_specs['adj_params']
-            adj_params['out_edge'] = EdgeType.FALL
-            adj_params['in_edge'] = EdgeType.RISE
-            mm_specs['ref_delay'] = cur_info.prev_results['tf_ref']
+            _set_edge_specs(mm_specs, False, cur_info.prev_results)
 
             search_params = mm_specs['search_params']
             search_params['guess'] = (cap_rise * 0.9, cap_rise * 1.1)
@@ -247,7 +386,15 @@ class CapDelayMatch(MeasurementManager):
                                 EdgeType.RISE, t_start=t0)
             tf = tbm.calc_delay(sim_data, buf_mid, buf_out, EdgeType.RISE,
                                 EdgeType.FALL, t_start=t0)
-            return False, MeasInfo('cap_rise', dict(tr_ref=tr.item(), tf_ref=tf.item()))
+            new_result = dict(tr_ref=tr.item(), tf_ref=tf.item())
+            if self._curve_file is None:
+                return False, MeasInfo('cap_rise', new_result)
+            if self._curve is None:
+                return False, MeasInfo('ref_curve', new_result)
+            return self._invert_ref_curve(new_result)
+        elif state == 'ref_curve':
+            self._curve = self._save_ref_curve(sim_results.data)
+            return self._invert_ref_curve(cur_info.prev_results)
         elif state == 'cap_rise':
             data = sim_results.data['c_load']
             new_result = cur_info.prev_results.copy()
@@ -262,3 +409,97 @@ class CapDelayMatch(MeasurementManager):
             return True, MeasInfo('done', new_result)
         else:
             raise ValueError(f'Unknown state: {state}')
+
+    async def _async_simulate_ref_curve(self, name: str, sim_dir: Path, sim_db: SimulationDB
+                                        ) -> Dict[str, np.ndarray]:
+        tbm, tb_params = self.get_sim_info(sim_db, None, MeasInfo('ref_curve', {}))[0]
+        sim_results = await sim_db.async_simulate_tbm_obj('ref_curve', sim_dir / 'ref_curve',
+                                                          None, tbm, tb_params,
+                                                          tb_name=f'{name}_ref_curve')
+        return self._save_ref_curve(sim_results.data)
+
+    def _save_ref_curve(self, sim_data: SimData) -> Dict[str, np.ndarray]:
+        """Computes the reference curve from simulation data, and writes it to the curve file.
+        """
+        tbm = self._curve_tbm
+        adj_params = self._mm.specs['adj_params']
+        in_name: str = adj_params['in_name']
+        out_name: str = adj_params['out_name']
+        t_start: str = adj_params['t_start']
+        tr = tbm.calc_delay(sim_data, in_name, out_name, EdgeType.FALL, EdgeType.RISE,
+                            t_start=t_start)
+        tf = tbm.calc_delay(sim_data, in_name, out_name, EdgeType.RISE, EdgeType.FALL,
+                            t_start=t_start)
+        curve = dict(c_load=np.asarray(self._get_curve_values()),
+                     tr=np.asarray(tr, dtype=float).ravel(),
+                     tf=np.asarray(tf, dtype=float).ravel())
+        # NOTE: write to a temporary file first, so concurrent readers never see a
+        # partial file
+        self._curve_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self._curve_file.with_name(f'{self._curve_file.stem}_{uuid4().hex}.npz')
+        np.savez(tmp_file, **curve)
+        os.replace(tmp_file, self._curve_file)
+        return curve
+
+    def _get_curve_values(self) -> List[float]:
+        ref_curve: Mapping[str, Any] = self.specs['ref_curve']
+        search_params: Mapping[str, Any] = self._mm.specs['search_params']
+        low: float = ref_curve.get('low', search_params['low'])
+        high: Optional[float] = ref_curve.get('high', search_params.get('high', None))
+        num: int = ref_curve.get('num', 65)
+        if high is None:
+            raise ValueError('ref_curve high must be specified for unbounded search.')
+        return np.linspace(low, high, num).tolist()
+
+    def _setup_ref_curve(self) -> None:
+        """Finds the reference curve file, and loads it if it exists."""
+        ref_curve: Optional[Mapping[str, Any]] = self.specs.get('ref_curve', None)
+        self._curve = None
+        if not ref_curve:
+            self._curve_file = None
+            return
+
+        # NOTE: only hash entries that affect the reference testbench, which does not
+        # depend on the DUT
+        mm_specs = self._mm.specs
+        tbm_specs: Mapping[str, Any] = mm_specs['tbm_specs']
+        key = get_content_hash(dict(
+            tbm_specs={k: v for k, v in tbm_specs.items()
+                       if k not in {'save_outputs', 'swp_info', 'pulse_list', 'dut_pins'}},
+            wrapper_params=mm_specs['wrapper_params'],
+            pulse_list=mm_specs['pulse_list'],
+            load_list=mm_specs['load_list'],
+            t_start=mm_specs['adj_params']['t_start'],
+            c_load=self._get_curve_values(),
+        ))
+        self._curve_file = Path(ref_curve['path']) / f'{key}.npz'
+        if self._curve_file.is_file():
+            self._load_ref_curve()
+
+    def _load_ref_curve(self) -> None:
+        with np.load(self._curve_file) as npz_file:
+            self._curve = {name: npz_file[name] for name in npz_file.files}
+
+    def _invert_ref_curve(self, prev_results: Mapping[str, Any]) -> Tuple[bool, MeasInfo]:
+        """Gets capacitances from the reference curve, or falls back to the search."""
+        c_load = self._curve['c_load']
+        new_result = dict(prev_results)
+        for edge, td_key in [('rise', 'tr'), ('fall', 'tf')]:
+            td_curve = self._curve[td_key]
+            td_ref: float = prev_results[f'{td_key}_ref']
+            if (not np.all(np.isfinite(td_curve)) or not np.all(np.diff(td_curve) > 0) or
+                    not td_curve[0] <= td_ref <= td_curve[-1]):
+                self.log(f'Reference delay {td_ref:.4g} of {edge} edge is outside of reference '
+                         f'curve, searching instead.')
+                return False, MeasInfo('cap_rise', dict(prev_results))
+            new_result[f'cap_{edge}'] = float(np.interp(td_ref, td_curve, c_load))
+        return True, MeasInfo('done', new_result)
+
+
+def _set_edge_specs(mm_specs: Dict[str, Any], rise: bool, prev_results: Mapping[str, Any]
+                    ) -> None:
+    """Sets up DelayMatch specifications to search the given edge."""
+    adj_params = mm_specs['adj_params']
+    adj_params['out_edge'] = EdgeType.RISE if rise else EdgeType.FALL
+    adj_params['in_edge'] = EdgeType.FALL if rise else EdgeType.RISE
+    mm_specs['ref_delay'] = prev_results['tr_ref' if rise else 'tf_ref']
@@ -15,15 +15,26 @@
 
 from __future__ import annotations
 
-from typing import Any, Tuple, Mapping, Optional, Union, cast
+from typing import Any, Tuple, Mapping, Optional, Union, Sequence, List, Dict, cast
+
+from pathlib import Path
+
+import numpy as np
 
 from bag.simulation.core import TestbenchManager
 from bag.simulation.cache import SimulationDB, DesignInstance, SimResults, MeasureResult
 from bag.simulation.measure import MeasurementManager, MeasInfo
 
+from bag3_testbenches.measurement.tran.digital import DigitalTranTB
+from bag3_testbenches.measurement.digital.util import setup_digital_tran
 from bag3_testbenches.measurement.digital.max_trf import MaxRiseFallTime
 
 from ..util import get_digital_wrapper_params
+from ..reset import (
+    get_reset_state_file, get_reset_tmp_file, make_reset_tbm, commit_reset_state,
+    apply_reset_state, check_tran_options
+)
+from ..estimate import RCEstimator
 
 
 class CapMaxRiseFallTime(MeasurementManager):
@@ -43,8 +54,34 @@ class CapMaxRiseFallTime(MeasurementManager):
         maximum rise/fall time, in seconds.
     fake : bool
         Defaults to False.  True to return fake data.
+    estimate : Optional[Mapping[str, Any]]
+        Optional.  If given, estimate maximum output capacitance analytically instead of
+        simulating.  Has the following entries:
+
+        rc_table : Mapping[str, Any]
+            the technology RC table.  See RCEstimator.
+        seg_out : int
+            number of unit segments driving the output pin.
     buf_params : Mapping[str, Any]
         input buffer parameters.
+    sweep : Optional[Mapping[str, Any]]
+        Optional.  If given, simulate a log-spaced c_load sweep in a single simulation, and
+        interpolate where rise/fall time crosses max_trf, instead of searching.  If the
+        interpolation is not accurate because of curvature, simulate the estimated crossing
+        to refine it.  Falls back to the search if max_trf is outside the sweep range, or if
+        any transition time cannot be measured.  Has the following entries:
+
+        low : float
+            Defaults to search_params low.  smallest load capacitance, must be positive.
+        high : float
+            Defaults to search_params high.  largest load capacitance.
+        num : int
+            Defaults to 17.  number of sweep points.
+        max_refine : int
+            Defaults to 2.  maximum number of refinement simulations.
+    reset_state : Optional[Mapping[str, Any]]
+        Optional.  If given, simulate the reset window once, and start every sweep simulation
+        from its final state.  See bag3_digital.measurement.reset.
     search_params : Mapping[str, Any]
         interval search parameters, with the following entries:
 
@@ -76,15 +113,28 @@ class CapMaxRiseFallTime(MeasurementManager):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         super().__init__(*args, **kwargs)
         self._mm: Optional[MaxRiseFallTime] = None
+        self._tbm_specs: Dict[str, Any] = {}
+        self._tb_params: Mapping[str, Any] = {}
+        self._tbm: Optional[DigitalTranTB] = None
+        self._reset_file: Optional[Path] = None
+        self._reset_tmp_file: Optional[Path] = None
 
     def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
         specs = self.specs
         in_pin: str = specs['in_pin']
         out_pin: str = specs['out_pin']
         fake: str = specs.get('fake', False)
+        estimate: Optional[Mapping[str, Any]] = specs.get('estimate', None)
 
         if fake:
             return True, MeasInfo('done', dict(cap=100.0e-15, tr=20.0e-12, tf=20.0e-12))
+        if estimate is not None:
+            tbm_specs: Mapping[str, Any] = specs['tbm_specs']
+            max_trf: float = specs['max_trf']
+            estimator = RCEstimator(estimate['rc_table'], tbm_specs['sim_envs'][0],
+                                    tbm_specs['thres_lo'], tbm_specs['thres_hi'])
+            cap = estimator.get_max_cap(estimate['seg_out'], max_trf)
+            return True, MeasInfo('done', dict(cap=cap, tr=max_trf, tf=max_trf))
 
         load_list = [dict(pin=out_pin, type='cap', value='c_load')]
         wrapper_params = get_digital_wrapper_params(specs, dut, [in_pin])
@@ -97,15 +147,155 @@ class CapMaxRiseFallTime(MeasurementManager):
         mm_specs['load_list'] = load_list
         self._mm = sim_db.make_mm(MaxRiseFallTime, mm_specs)
 
-        return False, MeasInfo('max_trf', {})
+        sweep: Optional[Mapping[str, Any]] = specs.get('sweep', None)
+        if not sweep:
+            return False, MeasInfo('max_trf', {})
+
+        pulse_list = [dict(pin=in_pin, tper='2*t_bit', tpw='t_bit', trf='t_rf',
+                           td='t_bit', pos=True)]
+        tbm_specs, self._tb_params = setup_digital_tran(specs, dut, wrapper_params=wrapper_params,
+                                                        pulse_list=pulse_list,
+                                                        load_list=load_list)
+        tbm_specs['save_outputs'] = [out_pin]
+        # remove input pin from reset list
+        reset_list: Sequence[Tuple[str, bool]] = tbm_specs.get('reset_list', [])
+        tbm_specs['reset_list'] = [ele for ele in reset_list if ele[0] != in_pin]
+        self._tbm_specs = tbm_specs
+
+        search_params: Mapping[str, Any] = specs['search_params']
+        low: float = sweep.get('low', search_params['low'])
+        high: Optional[float] = sweep.get('high', search_params.get('high', None))
+        num: int = sweep.get('num', 17)
+        if high is None or low <= 0 or high <= low:
+            raise ValueError('c_load sweep needs 0 < low < high.')
+        values = np.geomspace(low, high, num).tolist()
+        info = dict(values=values, c_load=[], tr=[], tf=[])
+
+        reset_state: Optional[Mapping[str, Any]] = specs.get('reset_state', None)
+        if reset_state:
+            self._reset_file = get_reset_state_file(reset_state, dut,
+                                                    self._get_tbm_specs(values),
+                                                    self._tb_params)
+        else:
+            self._reset_file = None
+        if self._reset_file is not None and not self._reset_file.is_file():
+            return False, MeasInfo('reset', info)
+        return False, MeasInfo('sweep', info)
 
     def get_sim_info(self, sim_db: SimulationDB, dut: DesignInstance, cur_info: MeasInfo
                      ) -> Tuple[Union[Tuple[TestbenchManager, Mapping[str, Any]],
                                       MeasurementManager], bool]:
-        return self._mm, True
+        if cur_info.state == 'max_trf':
+            return self._mm, True
+
+        tbm_specs = self._get_tbm_specs(cur_info.prev_results['values'])
+        if cur_info.state == 'reset':
+            self._reset_tmp_file = get_reset_tmp_file(self._reset_file)
+            tbm = make_reset_tbm(sim_db, tbm_specs, self._reset_tmp_file)
+            return (tbm, self._tb_params), True
+
+        if self._reset_file is not None:
+            tbm_specs = apply_reset_state(self.specs['reset_state'], tbm_specs,
+                                          self._reset_file)
+        self._tbm = tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, tbm_specs))
+        if tbm.num_sim_envs != 1:
+            self.error('Corner sweep is not supported.')
+        tbm.sim_params['t_sim'] = f'{tbm.t_rst_end_expr}+3*t_bit'
+        check_tran_options(tbm)
+        return (tbm, self._tb_params), True
 
     def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
                        ) -> Tuple[bool, MeasInfo]:
-        data = cast(MeasureResult, sim_results).data['c_load']
-        new_result = dict(cap=data['value'], tr=data['tr'], tf=data['tf'])
-        return True, MeasInfo('done', new_result)
+        if cur_info.state == 'max_trf':
+            data = cast(MeasureResult, sim_results).data['c_load']
+            new_result = dict(cap=data['value'], tr=data['tr'], tf=data['tf'])
+            return True, MeasInfo('done', new_result)
+        if cur_info.state == 'reset':
+            commit_reset_state(self._reset_tmp_file, self._reset_file)
+            return False, MeasInfo('sweep', cur_info.prev_results)
+
+        specs = self.specs
+        out_pin: str = specs['out_pin']
+        max_trf: float = specs['max_trf']
+        tol: float = specs['search_params']['tol']
+        max_refine: int = specs['sweep'].get('max_refine', 2)
+
+        tbm = self._tbm
+        sim_data = sim_results.data
+        t0 = tbm.get_t_rst_end(sim_data)
+        info = dict(cur_info.prev_results)
+        info['c_load'] = info['c_load'] + info['values']
+        for key, out_rise in [('tr', True), ('tf', False)]:
+            trf = tbm.calc_trf(sim_data, out_pin, out_rise, t_start=t0)
+            info[key] = info[key] + np.asarray(trf, dtype=float).ravel().tolist()
+
+        order = np.argsort(info['c_load'])
+        c_load = np.asarray(info['c_load'])[order]
+        cap_list = []
+        refine_list = []
+        for key in ['tr', 'tf']:
+            cap, c_refine = _find_crossing(c_load, np.asarray(info[key])[order], max_trf, tol)
+            if cap is None:
+                self.log('max_trf is outside of c_load sweep range, or transition time '
+                         'measurement failed, searching instead.')
+                return False, MeasInfo('max_trf', {})
+            cap_list.append(cap)
+            if c_refine is not None:
+                refine_list.append(c_refine)
+
+        num_refine = 0 if cur_info.state == 'sweep' else int(cur_info.state[len('refine_'):])
+        if refine_list and num_refine < max_refine:
+            info['values'] = refine_list
+            return False, MeasInfo(f'refine_{num_refine + 1}', info)
+
+        # NOTE: the largest load that satisfies both rise and fall time
+        cap = min(cap_list)
+        tr = float(np.interp(cap, c_load, np.asarray(info['tr'])[order]))
+        tf = float(np.interp(cap, c_load, np.asarray(info['tf'])[order]))
+        return True, MeasInfo('done', dict(cap=cap, tr=tr, tf=tf))
+
+    def _get_tbm_specs(self, values: Sequence[float]) -> Dict[str, Any]:
+        tbm_specs = dict(**self._tbm_specs)
+        tbm_specs['swp_info'] = [('c_load', dict(type='LIST', values=values))]
+        return tbm_specs
+
+
+def _find_crossing(xs: np.ndarray, ys: np.ndarray, target: float, tol: float
+                   ) -> Tuple[Optional[float], Optional[float]]:
+    """Finds where the increasing curve crosses the target.
+
+    Returns the linearly interpolated crossing, or None if the target is outside of the curve,
+    or if the curve has unmeasured (NaN) points.  Also returns a point to simulate to refine
+    the crossing, or None if the quadratic through the nearest outside point agrees with the
+    linear estimate within tol.
+    """
+    # NOTE: if even the smallest load violates the target, the answer is below the sweep
+    if not np.all(np.isfinite(ys)) or ys[-1] < target or ys[0] > target:
+        return None, None
+    if ys[0] == target:
+        return float(xs[0]), None
+
+    idx = int(np.argmax(ys >= target))
+    x0, x1 = xs[idx - 1], xs[idx]
+    y0, y1 = ys[idx - 1], ys[idx]
+    x_lin = float(x0 + (target - y0) * (x1 - x0) / (y1 - y0))
+    if x1 - x0 <= tol:
+        return x_lin, None
+
+    # NOTE: check curvature with a quadratic through the nearest outside point
+    if idx >= 2:
+        pts: List[int] = [idx - 2, idx - 1, idx]
+    elif idx + 1 < xs.size:
+        pts = [idx - 1, idx, idx + 1]
+    else:
+        return x_lin, None
+    # NOTE: normalize for numerical conditioning
+    coeffs = np.polyfit(xs[pts] / x1, (ys[pts] - target) / (y1 - y0), 2)
+    roots = [r.real * x1 for r in np.roots(coeffs)
+             if np.isreal(r) and x0 <= r.real * x1 <= x1]
+    if not roots:
+        return x_lin, None
+    x_quad = float(roots[0])
+    if abs(x_quad - x_lin) <= tol:
+        return x_lin, None
+    return x_lin, x_quad
@@ -0,0 +1,287 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+from typing import Any, Tuple, Mapping, Optional, Union, Sequence, Dict, List, cast
+
+import math
+from pathlib import Path
+
+import numpy as np
+
+from bag.simulation.core import TestbenchManager
+from bag.simulation.cache import SimulationDB, DesignInstance, SimResults, MeasureResult
+from bag.simulation.measure import MeasurementManager, MeasInfo
+
+from bag3_testbenches.measurement.tran.digital import DigitalTranTB
+from bag3_testbenches.measurement.digital.util import setup_digital_tran
+
+from ..reset import (
+    get_reset_state_file, get_reset_tmp_file, make_reset_tbm, commit_reset_state,
+    apply_reset_state, check_tran_options
+)
+
+
+class DelayMatchSecant(MeasurementManager):
+    """Adjusts a parameter to match a delay, using the Illinois (regula falsi) method.
+
+    A drop-in replacement of DelayMatch for delays that are nearly linear in the adjusted
+    parameter.  The next value is interpolated from the measured delay errors at the two
+    ends of the bracket, with the retained end's error halved if the same end is kept twice
+    (the Illinois modification).  If an interpolation step does not halve the bracket, the next
+    step is a bisection step, so convergence is never slower than bisection.
+
+    The first simulation sweeps both ends of the initial guess.  If they do not bracket the
+    answer, the bracket is expanded by doubling, as in an unbounded binary search.
+
+    Notes
+    -----
+    specification dictionary has the following entries:
+
+    adj_name : str
+        the adjusted parameter name.
+    adj_sign : bool
+        True if delay increases with the adjusted parameter.
+    adj_params : Mapping[str, Any]
+        delay measurement parameters, with in_name, out_name, in_edge, out_edge, and t_start.
+    ref_delay : float
+        the delay to match.
+    use_dut : bool
+        True to simulate with the DUT.
+    search_params : Mapping[str, Any]
+        search parameters, same as DelayMatch.  The following entries are used:
+
+        low : float
+            lower bound.
+        high : Optional[float]
+            upper bound.  If None, the bracket expands without bound.
+        step : float
+            initial bracket size if no guess is given.
+        tol : float
+            tolerance of the search.
+        max_err : float
+            Used only without upper bound.  If the bracket expands beyond this value, raise an
+            error.
+        guess : Optional[Tuple[float, float]]
+            Optional.  the initial bracket.
+        max_iter : int
+            Defaults to 50.  maximum number of simulations.
+    tbm_specs : Mapping[str, Any]
+        DigitalTranTB related specifications.
+    wrapper_params : Mapping[str, Any]
+        Optional.  the wrapper parameters.
+    pulse_list : Sequence[Mapping[str, Any]]
+        the input pulses.
+    load_list : Sequence[Mapping[str, Any]]
+        Optional.  the loads.
+    reset_state : Optional[Mapping[str, Any]]
+        Optional.  If given, simulate the reset window once, and start every search simulation
+        from its final state.  See bag3_digital.measurement.reset.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._tbm_specs: Dict[str, Any] = {}
+        self._tb_params: Mapping[str, Any] = {}
+        self._tbm: Optional[DigitalTranTB] = None
+        self._reset_file: Optional[Path] = None
+        self._reset_tmp_file: Optional[Path] = None
+        super().__init__(*args, **kwargs)
+
+    def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
+        specs = self.specs
+        adj_params: Mapping[str, Any] = specs['adj_params']
+        search_params: Mapping[str, Any] = specs['search_params']
+        use_dut: bool = specs['use_dut']
+        wrapper_params: Optional[Mapping[str, Any]] = specs.get('wrapper_params', None)
+        pulse_list: Sequence[Mapping[str, Any]] = specs['pulse_list']
+        load_list: Sequence[Mapping[str, Any]] = specs.get('load_list', [])
+
+        tbm_specs, self._tb_params = setup_digital_tran(specs, dut if use_dut else None,
+                                                        wrapper_params=wrapper_params,
+                                                        pulse_list=pulse_list,
+                                                        load_list=load_list)
+        tbm_specs['save_outputs'] = [adj_params['in_name'], adj_params['out_name']]
+        self._tbm_specs = tbm_specs
+
+        low: float = search_params['low']
+        high: Optional[float] = search_params.get('high', None)
+        guess: Optional[Tuple[float, float]] = search_params.get('guess', None)
+        if guess is None:
+            x0 = low
+            x1 = low + search_params['step'] if high is None else high
+        else:
+            x0 = max(guess[0], low)
+            x1 = guess[1] if high is None else min(guess[1], high)
+            if x1 <= x0:
+                x1 = x0 + search_params['tol']
+        info = dict(values=[x0, x1], xs=[], fs=[], tds=[], interp=False, width=math.inf)
+
+        reset_state: Optional[Mapping[str, Any]] = specs.get('reset_state', None)
+        if reset_state:
+            self._reset_file = get_reset_state_file(reset_state, dut if use_dut else None,
+                                                    self._get_tbm_specs(info['values']),
+                                                    self._tb_params)
+        else:
+            self._reset_file = None
+        if self._reset_file is not None and not self._reset_file.is_file():
+            return False, MeasInfo('reset', info)
+        return False, MeasInfo('init', info)
+
+    def get_sim_info(self, sim_db: SimulationDB, dut: DesignInstance, cur_info: MeasInfo
+                     ) -> Tuple[Union[Tuple[TestbenchManager, Mapping[str, Any]],
+                                      MeasurementManager], bool]:
+        specs = self.specs
+        use_dut: bool = specs['use_dut']
+
+        tbm_specs = self._get_tbm_specs(cur_info.prev_results['values'])
+        if cur_info.state == 'reset':
+            self._reset_tmp_file = get_reset_tmp_file(self._reset_file)
+            tbm = make_reset_tbm(sim_db, tbm_specs, self._reset_tmp_file)
+            return (tbm, self._tb_params), use_dut
+
+        if self._reset_file is not None:
+            tbm_specs = apply_reset_state(specs['reset_state'], tbm_specs, self._reset_file)
+        self._tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, tbm_specs))
+        check_tran_options(self._tbm)
+        return (self._tbm, self._tb_params), use_dut
+
+    def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
+                       ) -> Tuple[bool, MeasInfo]:
+        if cur_info.state == 'reset':
+            commit_reset_state(self._reset_tmp_file, self._reset_file)
+            return False, MeasInfo('init', cur_info.prev_results)
+
+        specs = self.specs
+        adj_name: str = specs['adj_name']
+        adj_sign: bool = specs['adj_sign']
+        adj_params: Mapping[str, Any] = specs['adj_params']
+        ref_delay: float = specs['ref_delay']
+        search_params: Mapping[str, Any] = specs['search_params']
+
+        td = self._tbm.calc_delay(sim_results.data, adj_params['in_name'],
+                                  adj_params['out_name'], adj_params['in_edge'],
+                                  adj_params['out_edge'], t_start=adj_params['t_start'])
+        td_list = np.asarray(td, dtype=float).ravel().tolist()
+        if not all((math.isfinite(val) for val in td_list)):
+            raise ValueError(f'Delay measurement failed at {adj_name} = '
+                             f'{cur_info.prev_results["values"]}')
+
+        info = dict(cur_info.prev_results)
+        for x, td_val in zip(info['values'], td_list):
+            info['xs'] = info['xs'] + [x]
+            info['tds'] = info['tds'] + [td_val]
+            # NOTE: error is increasing in the adjusted parameter
+            err = td_val - ref_delay
+            info['fs'] = info['fs'] + [err if adj_sign else -err]
+
+        done, info = _update_search(info, search_params)
+        if done:
+            self.log(f'{adj_name} search done in {len(info["xs"])} points.')
+            idx = int(np.argmin(np.abs(info['fs'])))
+            return True, MeasInfo('done', {adj_name: dict(value=info['xs'][idx],
+                                                          td_adj=info['tds'][idx])})
+        self.log(f'{adj_name} search, next value: {info["values"][0]:.4g}')
+        return False, MeasInfo(f'iter_{len(info["xs"])}', info)
+
+    def _get_tbm_specs(self, values: Sequence[float]) -> Dict[str, Any]:
+        tbm_specs = dict(**self._tbm_specs)
+        tbm_specs['swp_info'] = [(self.specs['adj_name'], dict(type='LIST', values=values))]
+        return tbm_specs
+
+
+def _update_search(info: Dict[str, Any], search_params: Mapping[str, Any]
+                   ) -> Tuple[bool, Dict[str, Any]]:
+    """Picks the next value to simulate.
+
+    info contains all simulated values xs and their errors fs, where error is increasing in
+    the value.  Returns True if the search is done, otherwise the next values to simulate are
+    stored in info.
+    """
+    low: float = search_params['low']
+    high: Optional[float] = search_params.get('high', None)
+    tol: float = search_params['tol']
+    max_err: float = search_params.get('max_err', math.inf)
+    max_iter: int = search_params.get('max_iter', 50)
+
+    xs: List[float] = info['xs']
+    fs: List[float] = info['fs']
+    if any((f == 0 for f in fs)):
+        return True, info
+    if len(xs) >= max_iter:
+        raise ValueError(f'Delay match search did not converge in {max_iter} points.')
+
+    if info.get('a', None) is None:
+        neg = [(x, f) for x, f in zip(xs, fs) if f < 0]
+        pos = [(x, f) for x, f in zip(xs, fs) if f > 0]
+        if not neg:
+            # every value is too large, expand down
+            x_min = min(xs)
+            if x_min <= low:
+                return True, info
+            info['values'] = [max(low, x_min - max(2 * (max(xs) - x_min), tol))]
+            return False, info
+        if not pos:
+            # every value is too small, expand up
+            x_max = max(xs)
+            if high is not None and x_max >= high:
+                raise ValueError(f'Delay match search upper bound {high:.4g} is too small.')
+            x_new = x_max + max(2 * (x_max - min(xs)), tol)
+            if high is not None:
+                x_new = min(x_new, high)
+            elif x_new > max_err:
+                raise ValueError(f'Delay match search exceeds max_err = {max_err:.4g}.')
+            info['values'] = [x_new]
+            return False, info
+        info['a'], info['fa'] = max(neg)
+        info['b'], info['fb'] = min(pos)
+        info['side'] = 0
+    else:
+        x_last = xs[-1]
+        f_last = fs[-1]
+        # NOTE: Illinois modification, if the same end is replaced twice in a row, halve the
+        # error of the other end, so that it gets replaced too.
+        if f_last < 0:
+            info['a'], info['fa'] = x_last, f_last
+            if info['side'] < 0:
+                info['fb'] /= 2
+            info['side'] = -1
+        else:
+            info['b'], info['fb'] = x_last, f_last
+            if info['side'] > 0:
+                info['fa'] /= 2
+            info['side'] = 1
+
+    a: float = info['a']
+    b: float = info['b']
+    fa: float = info['fa']
+    fb: float = info['fb']
+    width = b - a
+    if width <= tol:
+        return True, info
+
+    # NOTE: safeguard, bisect if the last interpolation step did not halve the bracket
+    x_new = (a * fb - b * fa) / (fb - fa)
+    if (info['interp'] and width > info['width'] / 2) or not (a < x_new < b):
+        x_new = (a + b) / 2
+        info['interp'] = False
+    else:
+        # NOTE: stay tol / 2 away from the ends, so that the bracket closes when the
+        # interpolation converges to one end
+        x_new = min(max(x_new, a + tol / 2), b - tol / 2)
+        info['interp'] = True
+    info['width'] = width
+    info['values'] = [x_new]
+    return False, info
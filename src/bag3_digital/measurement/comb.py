@@ -13,16 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, Any, Tuple, Optional, Union, Mapping
+from typing import Dict, Any, Tuple, Optional, Union, Mapping, Sequence, List, cast
 
 from pathlib import Path
 
+import numpy as np
+
 from bag.simulation.base import get_bit_list
+from bag.concurrent.util import GatherHelper
 from bag.simulation.core import TestbenchManager
 from bag.simulation.cache import DesignInstance, SimulationDB, SimResults, MeasureResult
 from bag.simulation.measure import MeasurementManager, MeasInfo
 
+from bag3_testbenches.measurement.data.tran import EdgeType
+from bag3_testbenches.measurement.tran.digital import DigitalTranTB
 from bag3_testbenches.measurement.digital.comb import CombLogicTimingMM
+from bag3_testbenches.measurement.digital.util import setup_digital_tran
 
 from .util import get_digital_wrapper_params, get_in_buffer_pin_names
 
@@ -40,6 +46,16 @@ class BufferCombLogicTimingMM(MeasurementManager):
         input buffer parameters.
     buf_config : Mapping[str, Any]
         Used only if buf_params is not specified.  input buffer configuration parameters.
+    arcs : Sequence[Mapping[str, Any]]
+        Optional.  If given, measure all these arcs in one staggered simulation instead, and
+        in_pin/out_pin are not used.  Each arc has in_pin, out_pin, and out_invert entries.
+        Every input pulses once in its own time window of 2 * t_bit, rising half a t_bit after
+        the start of the window and falling one t_bit later.  Outputs must settle within half
+        of t_bit, before the next window starts.  Each output edge is attributed to the input
+        that toggled in the same window.  Outside its own window every stimulated input idles
+        low, so this is only valid for independent arcs, where each output responds to its
+        input with all other stimulated inputs low.  Results are returned in arc_data, a list of
+        LUT dictionaries in the order of arcs.
     """
 
     def __init__(self, *args: Any, **kwargs: Any) -> None:
@@ -48,7 +64,96 @@ class BufferCombLogicTimingMM(MeasurementManager):
     async def async_measure_performance(self, name: str, sim_dir: Path, sim_db: SimulationDB,
                                         dut: Optional[DesignInstance]) -> Dict[str, Any]:
         specs = self.specs
+        arcs: Optional[Sequence[Mapping[str, Any]]] = specs.get('arcs', None)
+        if arcs:
+            return await self._measure_staggered(name, sim_dir, sim_db, dut, arcs)
+
         in_pin: str = specs['in_pin']
+        in_pins = get_bit_list(in_pin)
+        wrapper_params = get_digital_wrapper_params(specs, dut, in_pins,
+                                                    buf_params=self._get_buf_params())
+        dut_in_pins = [get_in_buffer_pin_names(pin)[1] for pin in in_pins]
+
+        mm_specs = self.specs.copy()
+        mm_specs.pop('buf_config', None)
+        mm_specs.pop('buf_params', None)
+        mm_specs['in_pin'] = in_pin
+        if 'start_pin' not in mm_specs:
+            mm_specs['start_pin'] = dut_in_pins
+        mm_specs['wrapper_params'] = wrapper_params
+        mm = sim_db.make_mm(CombLogicTimingMM, mm_specs)
+
+        return await mm.async_measure_performance(name, sim_dir, sim_db, dut)
+
+    async def _measure_staggered(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                                 dut: Optional[DesignInstance],
+                                 arcs: Sequence[Mapping[str, Any]]) -> Dict[str, Any]:
+        in_pins: List[str] = []
+        out_pins: List[str] = []
+        for arc in arcs:
+            if arc['in_pin'] not in in_pins:
+                in_pins.append(arc['in_pin'])
+            if arc['out_pin'] not in out_pins:
+                out_pins.append(arc['out_pin'])
+
+        num_win = len(in_pins)
+        wrapper_params = get_digital_wrapper_params(self.specs, dut, in_pins,
+                                                    buf_params=self._get_buf_params())
+        pulse_list = _get_staggered_pulses(in_pins)
+        load_list = [dict(pin=pin, type='cap', value='c_load') for pin in out_pins]
+        tbm_specs, tb_params = setup_digital_tran(self.specs, dut,
+                                                  wrapper_params=wrapper_params,
+                                                  pulse_list=pulse_list, load_list=load_list)
+        dut_in_table = {pin: get_in_buffer_pin_names(pin)[1] for pin in in_pins}
+        tbm_specs['save_outputs'] = list(dut_in_table.values()) + out_pins
+        # remove stimulated pins from pin values and reset list
+        pin_values: Mapping[str, int] = tbm_specs.get('pin_values', {})
+        reset_list: Sequence[Tuple[str, bool]] = tbm_specs.get('reset_list', [])
+        tbm_specs['pin_values'] = {k: v for k, v in pin_values.items() if k not in dut_in_table}
+        tbm_specs['reset_list'] = [ele for ele in reset_list if ele[0] not in dut_in_table]
+
+        tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, tbm_specs))
+        tbm.sim_params['t_sim'] = f'{tbm.t_rst_end_expr}+{2 * num_win + 1}*t_bit'
+        sim_results = await sim_db.async_simulate_tbm_obj('staggered', sim_dir / 'staggered',
+                                                          dut, tbm, tb_params,
+                                                          tb_name=f'{name}_staggered')
+        sim_data = sim_results.data
+        t_bit: float = tbm.sim_params['t_bit']
+        t_rst_end = tbm.get_t_rst_end(sim_data)
+
+        arc_data = []
+        for arc in arcs:
+            in_pin: str = arc['in_pin']
+            out_pin: str = arc['out_pin']
+            out_invert: bool = arc['out_invert']
+
+            t_start = t_rst_end + _get_window_start(in_pins.index(in_pin), t_bit)
+            cur_data = {}
+            for in_edge, in_rise in [(EdgeType.RISE, True), (EdgeType.FALL, False)]:
+                out_rise = in_rise ^ out_invert
+                out_edge = EdgeType.RISE if out_rise else EdgeType.FALL
+                td = tbm.calc_delay(sim_data, dut_in_table[in_pin], out_pin, in_edge,
+                                    out_edge, t_start=t_start)
+                td = np.asarray(td, dtype=float)
+                # NOTE: the next window starts half a bit after the falling edge, so the output
+                # must settle within that, otherwise its edge may land in the next window.  A
+                # non-positive delay means an edge caused by another input was measured.
+                if not np.all((td > 0) & (td < t_bit / 2)):
+                    raise ValueError(f'{out_pin} does not settle within t_bit / 2 after '
+                                     f'{in_pin} toggles, increase t_bit.')
+                trf = tbm.calc_trf(sim_data, out_pin, out_rise, t_start=t_start)
+                if out_rise:
+                    cur_data['cell_rise'] = td
+                    cur_data['rise_transition'] = np.asarray(trf, dtype=float)
+                else:
+                    cur_data['cell_fall'] = td
+                    cur_data['fall_transition'] = np.asarray(trf, dtype=float)
+            arc_data.append(cur_data)
+
+        return dict(arc_data=arc_data)
+
+    def _get_buf_params(self) -> Mapping[str, Any]:
+        specs = self.specs
         buf_params: Optional[Mapping[str, Any]] = specs.get('buf_params', None)
 
         if buf_params is None:
@@ -72,21 +177,158 @@ class BufferCombLogicTimingMM(MeasurementManager):
                     dict(lch=lch, w_p=w_p, w_n=w_n, th_p=th_p, th_n=th_n, seg=seg1),
                 ],
             )
+        return buf_params
 
-        in_pins = get_bit_list(in_pin)
-        wrapper_params = get_digital_wrapper_params(specs, dut, in_pins, buf_params=buf_params)
-        dut_in_pins = [get_in_buffer_pin_names(pin)[1] for pin in in_pins]
+    def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
+        raise RuntimeError('Unused')
 
-        mm_specs = self.specs.copy()
-        mm_specs.pop('buf_config', None)
-        mm_specs.pop('buf_params', None)
-        mm_specs['in_pin'] = in_pin
-        if 'start_pin' not in mm_specs:
-            mm_specs['start_pin'] = dut_in_pins
-        mm_specs['wrapper_params'] = wrapper_params
-        mm = sim_db.make_mm(CombLogicTimingMM, mm_specs)
+    def get_sim_info(self, sim_db: SimulationDB, dut: DesignInstance, cur_info: MeasInfo
+                     ) -> Tuple[Union[Tuple[TestbenchManager, Mapping[str, Any]],
+                                      MeasurementManager], bool]:
+        raise RuntimeError('Unused')
 
-        return await mm.async_measure_performance(name, sim_dir, sim_db, dut)
+    def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
+                       ) -> Tuple[bool, MeasInfo]:
+        raise RuntimeError('Unused')
+
+
+class CombLogicCondBatchMM(MeasurementManager):
+    """Measure combinational logic delay of one arc under many side input conditions.
+
+    Side inputs walk through the conditions in sequence, one phase of 3 * t_bit per condition.
+    Side inputs change at the start of a phase, and the related pin rises t_bit later and falls
+    another t_bit later, so every condition is measured with the same stimulus.
+
+    Each side input is driven by a single pulse source, so its high phases must be cyclically
+    contiguous.  Conditions are sorted in Gray code order of side input values, then split into
+    as few consecutive simulations as needed to satisfy this.
+
+    Notes
+    -----
+    specification dictionary has the following entries:
+
+    in_pin : str
+        the related input pin.
+    out_pin : str
+        the output pin.
+    out_invert : bool
+        True if the output is inverted from the input.
+    out_rise : bool
+        True to measure rising output edges.
+    out_fall : bool
+        True to measure falling output edges.
+    cond_list : Sequence[Mapping[str, int]]
+        side input values of every condition.  Side inputs not in a condition take their
+        values in pin_values.
+    tbm_specs : Mapping[str, Any]
+        DigitalTranTB specifications, with the LUT sweep in swp_info.  t_bit must be long
+        enough for the output to settle.
+
+    Results are returned in cond_data, a list of LUT dictionaries in the order of cond_list.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+
+    async def async_measure_performance(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                                        dut: Optional[DesignInstance]) -> Dict[str, Any]:
+        cond_list: Sequence[Mapping[str, int]] = self.specs['cond_list']
+        pin_values: Mapping[str, int] = self.specs['tbm_specs'].get('pin_values', {})
+
+        side_pins = sorted(set((pin for cond in cond_list for pin in cond)))
+        val_list = [[cond.get(pin, pin_values.get(pin, 0)) for pin in side_pins]
+                    for cond in cond_list]
+        batches = _get_cond_batches(val_list)
+
+        gatherer = GatherHelper()
+        for batch_idx, idx_list in enumerate(batches):
+            sim_id = f'cond_batch_{batch_idx}'
+            gatherer.append(self._measure_batch(f'{name}_{sim_id}', sim_id, sim_dir / sim_id,
+                                                sim_db, dut, side_pins,
+                                                [val_list[idx] for idx in idx_list]))
+        batch_results = await gatherer.gather_err()
+
+        cond_data: List[Optional[Dict[str, np.ndarray]]] = [None] * len(cond_list)
+        for idx_list, data_list in zip(batches, batch_results):
+            for idx, cur_data in zip(idx_list, data_list):
+                cond_data[idx] = cur_data
+        return dict(cond_data=cond_data)
+
+    async def _measure_batch(self, tb_name: str, sim_id: str, sim_dir: Path,
+                             sim_db: SimulationDB, dut: Optional[DesignInstance],
+                             side_pins: Sequence[str], val_list: Sequence[Sequence[int]]
+                             ) -> List[Dict[str, np.ndarray]]:
+        specs = self.specs
+        in_pin: str = specs['in_pin']
+        out_pin: str = specs['out_pin']
+        out_invert: bool = specs['out_invert']
+        out_rise: bool = specs['out_rise']
+        out_fall: bool = specs['out_fall']
+
+        num_phase = len(val_list)
+        t_tot = f'{3 * num_phase}*t_bit'
+        pulse_list = [dict(pin=in_pin, tper='3*t_bit', tpw='t_bit', trf='t_rf', td='t_bit',
+                           pos=True)]
+        const_values = {}
+        for pin_idx, pin in enumerate(side_pins):
+            seq = [vals[pin_idx] for vals in val_list]
+            if all(seq) or not any(seq):
+                const_values[pin] = seq[0]
+            else:
+                # NOTE: pulse the run of ones, or the run of zeros if ones wrap around
+                pos = not (seq[0] and seq[-1])
+                start = seq.index(1 if pos else 0)
+                num = sum((val == int(pos) for val in seq))
+                pulse_list.append(dict(pin=pin, tper=t_tot, tpw=f'{3 * num}*t_bit',
+                                       trf='t_rf', td=f'{3 * start}*t_bit', pos=pos))
+
+        load_list = [dict(pin=out_pin, type='cap', value='c_load')]
+        tbm_specs, tb_params = setup_digital_tran(specs, dut, pulse_list=pulse_list,
+                                                  load_list=load_list)
+        tbm_specs['save_outputs'] = [in_pin, out_pin]
+        # NOTE: side inputs are driven by pulses or set to constants
+        pin_values = {k: v for k, v in tbm_specs.get('pin_values', {}).items()
+                      if k != in_pin and k not in side_pins}
+        pin_values.update(const_values)
+        tbm_specs['pin_values'] = pin_values
+        reset_list: Sequence[Tuple[str, bool]] = tbm_specs.get('reset_list', [])
+        tbm_specs['reset_list'] = [ele for ele in reset_list
+                                   if ele[0] != in_pin and ele[0] not in side_pins]
+
+        tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, tbm_specs))
+        tbm.sim_params['t_sim'] = f'{tbm.t_rst_end_expr}+{t_tot}'
+        sim_results = await sim_db.async_simulate_tbm_obj(sim_id, sim_dir, dut, tbm, tb_params,
+                                                          tb_name=tb_name)
+        sim_data = sim_results.data
+        t_bit: float = tbm.sim_params['t_bit']
+        t_rst_end = tbm.get_t_rst_end(sim_data)
+
+        edge_list = []
+        if out_rise:
+            edge_list.append((True, 'cell_rise', 'rise_transition'))
+        if out_fall:
+            edge_list.append((False, 'cell_fall', 'fall_transition'))
+
+        ans = []
+        for phase_idx in range(num_phase):
+            # NOTE: start after the output settles from side input changes
+            t_start = t_rst_end + (3 * phase_idx + 0.5) * t_bit
+            cur_data = {}
+            for cur_rise, delay_key, trf_key in edge_list:
+                in_edge = EdgeType.RISE if cur_rise ^ out_invert else EdgeType.FALL
+                out_edge = EdgeType.RISE if cur_rise else EdgeType.FALL
+                td = tbm.calc_delay(sim_data, in_pin, out_pin, in_edge, out_edge,
+                                    t_start=t_start)
+                td = np.asarray(td, dtype=float)
+                # NOTE: a non-positive delay means an edge caused by a side input was measured
+                if not np.all((td > 0) & (td < t_bit)):
+                    raise ValueError(f'{out_pin} does not settle within t_bit after {in_pin} '
+                                     f'toggles in phase {phase_idx}, increase t_bit.')
+                cur_data[delay_key] = td
+                cur_data[trf_key] = np.asarray(tbm.calc_trf(sim_data, out_pin, cur_rise,
+                                                            t_start=t_start), dtype=float)
+            ans.append(cur_data)
+        return ans
 
     def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
         raise RuntimeError('Unused')
@@ -99,3 +341,49 @@ class BufferCombLogicTimingMM(MeasurementManager):
     def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
                        ) -> Tuple[bool, MeasInfo]:
         raise RuntimeError('Unused')
+
+
+def _get_staggered_pulses(in_pins: Sequence[str]) -> List[Dict[str, Any]]:
+    """Returns one pulse per input, rising half a t_bit into its own window of 2 * t_bit."""
+    num_win = len(in_pins)
+    # NOTE: pulses repeat after all windows, which is past the end of simulation
+    return [dict(pin=pin, tper=f'{2 * num_win}*t_bit', tpw='t_bit', trf='t_rf',
+                 td=f'{2 * idx + 1}*t_bit', pos=True)
+            for idx, pin in enumerate(in_pins)]
+
+
+def _get_window_start(win_idx: int, t_bit: float) -> float:
+    """Returns the measurement start time of a window, half a t_bit before its rising edge."""
+    return (2 * win_idx + 0.5) * t_bit
+
+
+def _get_cond_batches(val_list: Sequence[Sequence[int]]) -> List[List[int]]:
+    """Order conditions and split them into batches that single pulses can stimulate.
+
+    Conditions are sorted in Gray code order, so consecutive conditions differ in few side
+    inputs.  A batch ends when adding the next condition makes the values of a side input
+    change more than twice around the cycle of phases.
+    """
+    def _gray_rank(vals: Sequence[int]) -> int:
+        rank = bit = 0
+        for val in vals:
+            bit ^= val
+            rank = 2 * rank + bit
+        return rank
+
+    ans: List[List[int]] = []
+    cur: List[int] = []
+    for idx in sorted(range(len(val_list)), key=lambda x: _gray_rank(val_list[x])):
+        new = cur + [idx]
+        if cur and not all((_num_cyclic_changes([val_list[i][pin_idx] for i in new]) <= 2
+                            for pin_idx in range(len(val_list[idx])))):
+            ans.append(cur)
+            new = [idx]
+        cur = new
+    if cur:
+        ans.append(cur)
+    return ans
+
+
+def _num_cyclic_changes(seq: Sequence[int]) -> int:
+    return sum((seq[idx] != seq[idx - 1] for idx in range(len(seq))))
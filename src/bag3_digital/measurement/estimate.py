@@ -0,0 +1,182 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Analytic timing estimates of digital cells, used to preview liberty files without simulation.
+"""
+
+from typing import Any, Mapping, Sequence, Tuple, List, Dict, Union
+
+import math
+
+import numpy as np
+
+
+class RCEstimator:
+    """Estimates pin capacitances and timing LUTs of a digital cell with a first order RC model.
+
+    Inputs are modeled as gate capacitance of seg_in unit segments, outputs as a driver of
+    seg_out unit segments.  With R the driver resistance and C the total output capacitance:
+
+        delay = t_intrinsic + ln(2) * R * C + k_delay_trf * t_rf
+        transition = ln((1 - thres_lo) / (1 - thres_hi)) * R * C + k_trf_trf * t_rf
+
+    Parameters
+    ----------
+    rc_table : Mapping[str, Any]
+        the technology RC table.  Every value is either a number, or a dictionary from corner
+        name to number.  Has the following entries:
+
+        c_gate : float
+            input capacitance of a unit segment.
+        c_drain : float
+            Defaults to 0.  output parasitic capacitance of a unit segment.
+        r_unit : float
+            on resistance of a unit segment.
+        r_unit_p : float
+            Defaults to r_unit.  pull-up resistance of a unit segment.
+        r_unit_n : float
+            Defaults to r_unit.  pull-down resistance of a unit segment.
+        t_intrinsic : float
+            Defaults to 0.  intrinsic delay.
+        k_delay_trf : float
+            Defaults to 0.25.  delay sensitivity to input transition time.
+        k_trf_trf : float
+            Defaults to 0.1.  output transition sensitivity to input transition time.
+    sim_env : str
+        the corner name.
+    thres_lo : float
+        low threshold of transition time measurement.
+    thres_hi : float
+        high threshold of transition time measurement.
+    """
+
+    def __init__(self, rc_table: Mapping[str, Any], sim_env: str, thres_lo: float,
+                 thres_hi: float) -> None:
+        self._c_gate = _get_value(rc_table, 'c_gate', sim_env)
+        self._c_drain = _get_value(rc_table, 'c_drain', sim_env, 0.0)
+        r_unit = _get_value(rc_table, 'r_unit', sim_env, None)
+        self._r_unit_p = _get_value(rc_table, 'r_unit_p', sim_env, r_unit)
+        self._r_unit_n = _get_value(rc_table, 'r_unit_n', sim_env, r_unit)
+        if self._r_unit_p is None or self._r_unit_n is None:
+            raise ValueError('RC table must specify r_unit, or both r_unit_p and r_unit_n.')
+        self._t_intrinsic = _get_value(rc_table, 't_intrinsic', sim_env, 0.0)
+        self._k_delay_trf = _get_value(rc_table, 'k_delay_trf', sim_env, 0.25)
+        self._k_trf_trf = _get_value(rc_table, 'k_trf_trf', sim_env, 0.1)
+        self._trf_scale = math.log((1 - thres_lo) / (1 - thres_hi))
+
+    def get_in_cap(self, seg_in: int) -> float:
+        """Returns the input capacitance."""
+        return self._c_gate * seg_in
+
+    def get_max_cap(self, seg_out: int, max_trf: float) -> float:
+        """Returns the maximum output capacitance such that transition time is below max_trf.
+
+        Raises ValueError if the driver parasitic capacitance alone violates max_trf.
+        """
+        r_drv = max(self._r_unit_p, self._r_unit_n) / seg_out
+        c_par = self._c_drain * seg_out
+        ans = max_trf / (self._trf_scale * r_drv) - c_par
+        if ans <= 0:
+            raise ValueError(f'Output transition time exceeds max_trf = {max_trf:.4g} '
+                             f'with no load.')
+        return ans
+
+    def get_delay_data(self, seg_out: int, keys: Sequence[str],
+                       swp_info: Union[Sequence[Tuple[str, Mapping[str, Any]]],
+                                       Mapping[str, Mapping[str, Any]]]
+                       ) -> Dict[str, np.ndarray]:
+        """Returns delay and transition LUTs.
+
+        Parameters
+        ----------
+        seg_out : int
+            number of driver unit segments.
+        keys : Sequence[str]
+            the LUT names, any of cell_rise, cell_fall, rise_transition, and fall_transition.
+        swp_info : Union[Sequence[Tuple[str, Mapping[str, Any]]], Mapping[str, Mapping[str, Any]]]
+            the LUT sweep information, with t_rf and c_load LIST sweeps.
+
+        Returns
+        -------
+        data : Dict[str, np.ndarray]
+            the LUTs.
+        """
+        t_rf, c_load = get_lut_grid(swp_info)
+        c_tot = c_load + self._c_drain * seg_out
+
+        ans = {}
+        for key in keys:
+            r_unit = self._r_unit_p if 'rise' in key else self._r_unit_n
+            tau = r_unit / seg_out * c_tot
+            if key.startswith('cell'):
+                ans[key] = self._t_intrinsic + math.log(2) * tau + self._k_delay_trf * t_rf
+            else:
+                ans[key] = self._trf_scale * tau + self._k_trf_trf * t_rf
+        return ans
+
+
+def get_lut_grid(swp_info: Union[Sequence[Tuple[str, Mapping[str, Any]]],
+                                 Mapping[str, Mapping[str, Any]]]
+                 ) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns t_rf and c_load values at every LUT point, in LUT sweep order."""
+    if isinstance(swp_info, Mapping):
+        swp_info = list(swp_info.items())
+
+    names = [name for name, _ in swp_info]
+    if sorted(names) != ['c_load', 't_rf']:
+        raise ValueError(f'Unsupported LUT sweep variables: {names}')
+    grid = np.meshgrid(*(np.asarray(swp_specs['values'], dtype=float)
+                         for _, swp_specs in swp_info), indexing='ij')
+    return grid[names.index('t_rf')], grid[names.index('c_load')]
+
+
+def get_seg_sizes(params: Mapping[str, Any]) -> Tuple[int, int]:
+    """Guess input and output stage sizes from generator parameters.
+
+    Collects all integers in entries whose name starts with "seg", in order.  The first one is
+    the input stage size, and the last one is the output stage size.  Returns (1, 1) if no
+    such entries exist.
+    """
+    seg_list = _collect_seg(params, False)
+    if not seg_list:
+        return 1, 1
+    return seg_list[0], seg_list[-1]
+
+
+def _collect_seg(obj: Any, is_seg: bool) -> List[int]:
+    if isinstance(obj, Mapping):
+        ans = []
+        for key, val in obj.items():
+            ans.extend(_collect_seg(val, is_seg or str(key).startswith('seg')))
+        return ans
+    if isinstance(obj, (list, tuple)):
+        ans = []
+        for val in obj:
+            ans.extend(_collect_seg(val, is_seg))
+        return ans
+    if is_seg and isinstance(obj, int) and not isinstance(obj, bool) and obj > 0:
+        return [obj]
+    return []
+
+
+def _get_value(table: Mapping[str, Any], key: str, sim_env: str, *args: Any) -> Any:
+    if key not in table:
+        if args:
+            return args[0]
+        raise ValueError(f'RC table missing entry {key}')
+    val = table[key]
+    if isinstance(val, Mapping):
+        return val[sim_env]
+    return val
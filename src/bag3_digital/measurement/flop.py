@@ -0,0 +1,407 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Dict, List, Tuple, Optional, Union, Mapping, Sequence, cast
+
+import math
+import asyncio
+from pathlib import Path
+from itertools import chain
+
+import numpy as np
+
+from pybag.enum import LogLevel
+
+from bag.concurrent.util import GatherHelper
+from bag.simulation.core import TestbenchManager
+from bag.simulation.cache import SimulationDB, DesignInstance, SimResults, MeasureResult
+from bag.simulation.measure import MeasurementManager, MeasInfo
+
+from bag3_liberty.boolean import build_timing_cond_expr
+
+from bag3_testbenches.measurement.data.tran import EdgeType
+from bag3_testbenches.measurement.tran.digital import DigitalTranTB
+from bag3_testbenches.measurement.digital.util import setup_digital_tran
+
+from .util import get_select_expr
+from .reset import async_setup_reset_state, check_tran_options
+
+
+class FlopConstraintBatchMM(MeasurementManager):
+    """Measures flop setup/hold constraint LUTs by bisection at all LUT grid points at once.
+
+    Each bisection iteration is one simulation sweeping the whole grid.  A coarse sub-grid is
+    solved first, and seeds the search windows of the remaining points.
+
+    Notes
+    -----
+    specification dictionary has the following entries:
+
+    clk_pin : str
+        the clock pin.
+    in_pin : str
+        the data pin.
+    out_pin : str
+        the output pin.
+    clk_rising : bool
+        Defaults to True.  True if the flop is rising edge triggered.
+    out_invert : bool
+        Defaults to False.  True if the output is the inverted data value.
+    constraints : Sequence[str]
+        Defaults to ['setup', 'hold'].  the constraints to measure.
+    cond : Mapping[str, int]
+        Defaults to empty.  values of other input pins.
+    delay_thres : float
+        maximum relative increase of clock-to-output delay for a passing setup test.
+    t_rf_list : Sequence[float]
+        data transition times.
+    t_clk_rf_list : Sequence[float]
+        clock transition times.
+    t_clk_rf_first : bool
+        True if clock transition time is the first LUT axis.
+    search_params : Mapping[str, Any]
+        bisection parameters, with the following entries:
+
+        low : float
+            Defaults to -high.  lower bound of the constraint values, assumed to fail.
+        high : float
+            Defaults to 200 ps.  upper bound of the constraint values, must pass.
+        tol : float
+            Defaults to 1 ps.  tolerance of the bisection.
+    c_load : float
+        Optional.  output load capacitance.  Defaults to the smallest c_load in out_swp_info.
+    out_swp_info : Union[Sequence[Tuple[str, Mapping[str, Any]]], Mapping[str, Any]]
+        the clock-to-output delay LUT sweep information, used to get the default c_load.
+    t_clk_per : float
+        Optional.  clock period.  Defaults to 4 times the sum of the largest search bound and
+        the longest transition.  Must be long enough for the output to settle in half a period.
+    fake : bool
+        Defaults to False.  True to generate fake data.
+    reset_state : Optional[Mapping[str, Any]]
+        Optional.  If given, simulate the reset window once per constraint LUT, and start every
+        bisection iteration from its final state.  See bag3_digital.measurement.reset.
+    tbm_specs : Mapping[str, Any]
+        DigitalTranTB related specifications.  The following simulation parameters are required:
+
+        t_rst :
+            reset duration.
+        t_rst_rf :
+            reset rise/fall time.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._reset_tasks: Dict[Path, asyncio.Future] = {}
+        super().__init__(*args, **kwargs)
+
+    async def async_measure_performance(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                                        dut: Optional[DesignInstance]) -> Dict[str, Any]:
+        # NOTE: constraint LUTs of this measurement share reset simulations
+        self._reset_tasks = {}
+        specs = self.specs
+        clk_pin: str = specs['clk_pin']
+        in_pin: str = specs['in_pin']
+        clk_rising: bool = specs.get('clk_rising', True)
+        constraints: Sequence[str] = specs.get('constraints', ['setup', 'hold'])
+        cond: Mapping[str, int] = specs.get('cond', {})
+        t_rf_list: Sequence[float] = specs['t_rf_list']
+        t_clk_rf_list: Sequence[float] = specs['t_clk_rf_list']
+        t_clk_rf_first: bool = specs['t_clk_rf_first']
+        fake: bool = specs.get('fake', False)
+
+        for cons in constraints:
+            if cons not in ('setup', 'hold'):
+                raise ValueError(f'Unsupported constraint: {cons}')
+
+        shape = (len(t_rf_list), len(t_clk_rf_list))
+        if fake:
+            lut_table = {(cons, data_rise): np.full(shape, 20.0e-12 if cons == 'setup' else 0.0)
+                         for cons in constraints for data_rise in (True, False)}
+        else:
+            gatherer = GatherHelper()
+            keys = []
+            for cons in constraints:
+                for data_rise in (True, False):
+                    keys.append((cons, data_rise))
+                    gatherer.append(self._search(name, sim_dir, sim_db, dut, cons, data_rise))
+            lut_table = dict(zip(keys, await gatherer.gather_err()))
+
+        edge_str = 'rising' if clk_rising else 'falling'
+        timing_list = []
+        for cons in constraints:
+            data = {}
+            for data_rise, lut_name in ((True, 'rise_constraint'), (False, 'fall_constraint')):
+                lut = lut_table[(cons, data_rise)]
+                data[lut_name] = lut.T if t_clk_rf_first else lut
+            timing_list.append(dict(related=clk_pin, timing_type=f'{cons}_{edge_str}',
+                                    cond=build_timing_cond_expr(cond), data=data))
+        return {in_pin: timing_list}
+
+    async def _search(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                      dut: Optional[DesignInstance], cons: str, data_rise: bool) -> np.ndarray:
+        """Searches one constraint LUT in lock-step.
+
+        Returns the smallest passing constraint value at every grid point, with t_rf on the
+        first axis.
+        """
+        specs = self.specs
+        search_params: Mapping[str, Any] = specs['search_params']
+        delay_thres: float = specs['delay_thres']
+        n_rf = len(specs['t_rf_list'])
+        n_clk = len(specs['t_clk_rf_list'])
+
+        g_high: float = search_params.get('high', 200.0e-12)
+        g_low: float = search_params.get('low', -g_high)
+        tol: float = search_params.get('tol', 1.0e-12)
+        if g_high <= g_low:
+            raise ValueError('Constraint search upper bound must be larger than lower bound.')
+
+        shape = (n_rf, n_clk)
+        sim_id = f'{cons}_{"rise" if data_rise else "fall"}'
+        is_setup = cons == 'setup'
+        idx_all = (list(range(n_rf)), list(range(n_clk)))
+
+        # lo is assumed/known to fail, hi is assumed/known to pass
+        lo = np.full(shape, g_low, dtype=float)
+        hi = np.full(shape, g_high, dtype=float)
+        hi_ok = np.zeros(shape, dtype=bool)
+        td_nom = np.zeros(shape)
+        if is_setup:
+            td_nom = await self._simulate(name, sim_dir, sim_db, dut, f'{sim_id}_nom', cons,
+                                          data_rise, idx_all, hi)
+            if not np.all(np.isfinite(td_nom)):
+                raise ValueError(f'{sim_id} fails at search upper bound {g_high:.4g}, '
+                                 f'increase search_params.high or t_clk_per.')
+            hi_ok[:] = True
+
+        # NOTE: number of iterations is doubled in case a seeded window misses
+        max_iter = 2 * int(math.ceil(math.log2((g_high - g_low) / tol))) + 2
+        solved = np.zeros(shape, dtype=bool)
+        num_sim = 0
+        for wave_idx, blocks in enumerate(_get_waves(n_rf, n_clk)):
+            wave_mask = np.zeros(shape, dtype=bool)
+            for idx_list in blocks:
+                wave_mask[np.ix_(*idx_list)] = True
+            w_lo, w_hi = _get_seed_windows(hi, solved, wave_mask, g_low, g_high, tol)
+            for _ in range(max_iter):
+                active = wave_mask & (hi - lo > tol)
+                if not np.any(active):
+                    break
+                probe = _get_probe(lo, hi, w_lo, w_hi, active, tol)
+
+                # NOTE: blocks of a wave are disjoint, so simulate them concurrently
+                sim_blocks = [idx_list for idx_list in blocks
+                              if np.any(active[np.ix_(*idx_list)])]
+                gatherer = GatherHelper()
+                for idx_list in sim_blocks:
+                    gatherer.append(self._simulate(name, sim_dir, sim_db, dut,
+                                                   f'{sim_id}_w{wave_idx}_{num_sim}', cons,
+                                                   data_rise, idx_list, probe))
+                    num_sim += 1
+                for idx_list, td in zip(sim_blocks, await gatherer.gather_err()):
+                    idx_grid = np.ix_(*idx_list)
+                    if is_setup:
+                        # NOTE: nan compares as False, so missing output edge fails
+                        ok = td <= (1 + delay_thres) * td_nom[idx_grid]
+                    else:
+                        # hold test passes if the output does not toggle
+                        ok = ~np.isfinite(td)
+                    cur_active = active[idx_grid]
+                    cur_probe = probe[idx_grid]
+                    hi[idx_grid] = np.where(cur_active & ok, cur_probe, hi[idx_grid])
+                    hi_ok[idx_grid] |= cur_active & ok
+                    lo[idx_grid] = np.where(cur_active & ~ok, cur_probe, lo[idx_grid])
+            solved |= wave_mask
+
+        self.log(f'{sim_id} constraint search done in {num_sim} simulations.')
+        if not np.all(hi_ok):
+            self.log(f'{sim_id} never passed at some grid points, using search upper bound '
+                     f'{g_high:.4g}.', level=LogLevel.WARN)
+        if np.any(hi - g_low <= tol):
+            self.log(f'{sim_id} passed at search lower bound {g_low:.4g} at some grid points.',
+                     level=LogLevel.WARN)
+        return hi
+
+    async def _simulate(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                        dut: Optional[DesignInstance], sim_id: str, cons: str, data_rise: bool,
+                        idx_list: Tuple[Sequence[int], Sequence[int]], t_off: np.ndarray
+                        ) -> np.ndarray:
+        """Simulates the given grid points with the given constraint values.
+
+        Returns clock-to-output delay of the second active clock edge, with shape given by
+        idx_list.  The delay is not finite if the output does not toggle.
+        """
+        specs = self.specs
+        clk_pin: str = specs['clk_pin']
+        in_pin: str = specs['in_pin']
+        out_pin: str = specs['out_pin']
+        clk_rising: bool = specs.get('clk_rising', True)
+        out_invert: bool = specs.get('out_invert', False)
+        cond: Mapping[str, int] = specs.get('cond', {})
+        t_rf_list: Sequence[float] = specs['t_rf_list']
+        t_clk_rf_list: Sequence[float] = specs['t_clk_rf_list']
+        tbm_specs: Mapping[str, Any] = specs['tbm_specs']
+
+        thres_lo: float = tbm_specs['thres_lo']
+        thres_hi: float = tbm_specs['thres_hi']
+        t_clk_per = self._get_clk_period()
+        scale = thres_hi - thres_lo
+
+        # NOTE: pulse edges start at td and cross 50% after half of their full ramp time.  The
+        # data edge is placed t_off before (setup) or after (hold) the second clock edge.
+        sign = '-' if cons == 'setup' else '+'
+        td_data = f't_clk_td+t_clk_per+(t_clk_rf-t_rf)/{2 * scale:.6g}{sign}t_off'
+        pulse_list = [dict(pin=clk_pin, tper='t_clk_per', tpw='t_clk_per/2', trf='t_clk_rf',
+                           td='t_clk_td', pos=clk_rising),
+                      dict(pin=in_pin, tper='8*t_clk_per', tpw='4*t_clk_per', trf='t_rf',
+                           td=td_data, pos=data_rise)]
+        load_list = [dict(pin=out_pin, type='cap', value=self._get_load_cap())]
+
+        cur_tbm_specs = dict(**tbm_specs)
+        if cond:
+            pin_values = dict(**cur_tbm_specs.get('pin_values', {}))
+            pin_values.update(cond)
+            cur_tbm_specs['pin_values'] = pin_values
+        tbm_specs, tb_params = setup_digital_tran(dict(tbm_specs=cur_tbm_specs), dut,
+                                                  pulse_list=pulse_list, load_list=load_list)
+        tbm_specs['save_outputs'] = [clk_pin, in_pin, out_pin]
+        reset_list: Sequence[Tuple[str, bool]] = tbm_specs.get('reset_list', [])
+        tbm_specs['reset_list'] = [ele for ele in reset_list if ele[0] not in (clk_pin, in_pin)]
+        tbm_specs['swp_info'] = [('i_rf', dict(type='LIST', values=list(idx_list[0]))),
+                                 ('i_clk', dict(type='LIST', values=list(idx_list[1])))]
+
+        # NOTE: per-point values are selected by polynomials of the swept integer indices
+        sim_params = dict(**tbm_specs.get('sim_params', {}))
+        sim_params['t_clk_per'] = t_clk_per
+        sim_params['t_clk_td'] = t_clk_per / 2
+        sim_params['t_rf'] = get_select_expr('i_rf', t_rf_list)
+        sim_params['t_clk_rf'] = get_select_expr('i_clk', t_clk_rf_list)
+        row_names = []
+        for idx, row in enumerate(t_off):
+            row_name = f't_off_{idx}'
+            sim_params[row_name] = get_select_expr('i_clk', row)
+            row_names.append(row_name)
+        sim_params['t_off'] = get_select_expr('i_rf', row_names)
+        tbm_specs['sim_params'] = sim_params
+        # NOTE: constraint offsets change every iteration, but only move the data edge
+        tbm_specs = await async_setup_reset_state(sim_db, sim_dir, dut, tbm_specs, tb_params,
+                                                  specs.get('reset_state', None),
+                                                  f'{name}_{sim_id}',
+                                                  stim_params=['t_off'] + row_names,
+                                                  tasks=self._reset_tasks)
+
+        tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, tbm_specs))
+        if tbm.num_sim_envs != 1:
+            self.error('Corner sweep is not supported.')
+        tbm.sim_params['t_sim'] = f'{tbm.t_rst_end_expr}+t_clk_td+2*t_clk_per'
+        check_tran_options(tbm)
+
+        sim_results = await sim_db.async_simulate_tbm_obj(sim_id, sim_dir / sim_id, dut, tbm,
+                                                          tb_params, tb_name=f'{name}_{sim_id}')
+        sim_data = sim_results.data
+        # start between the two active clock edges
+        t_start = tbm.get_t_rst_end(sim_data) + t_clk_per
+        clk_edge = EdgeType.RISE if clk_rising else EdgeType.FALL
+        # setup captures the new value, a hold failure also captures the new value
+        out_edge = EdgeType.RISE if data_rise ^ out_invert else EdgeType.FALL
+        td = tbm.calc_delay(sim_data, clk_pin, out_pin, clk_edge, out_edge, t_start=t_start)
+        return np.asarray(td, dtype=float).reshape(len(idx_list[0]), len(idx_list[1]))
+
+    def _get_clk_period(self) -> float:
+        specs = self.specs
+        t_clk_per: Optional[float] = specs.get('t_clk_per', None)
+        if t_clk_per is not None:
+            return t_clk_per
+
+        search_params: Mapping[str, Any] = specs['search_params']
+        tbm_specs: Mapping[str, Any] = specs['tbm_specs']
+        g_high: float = search_params.get('high', 200.0e-12)
+        g_low: float = search_params.get('low', -g_high)
+        scale = tbm_specs['thres_hi'] - tbm_specs['thres_lo']
+        t_rf_max = max(chain(specs['t_rf_list'], specs['t_clk_rf_list'])) / scale
+        return 4 * (max(abs(g_low), abs(g_high)) + t_rf_max)
+
+    def _get_load_cap(self) -> float:
+        specs = self.specs
+        c_load: Optional[float] = specs.get('c_load', None)
+        if c_load is not None:
+            return c_load
+
+        swp_info: Union[Sequence[Tuple[str, Mapping[str, Any]]], Mapping[str, Any]] = \
+            specs.get('out_swp_info', [])
+        if isinstance(swp_info, Mapping):
+            swp_info = list(swp_info.items())
+        for var_name, swp_specs in swp_info:
+            if var_name == 'c_load' and 'values' in swp_specs:
+                return min(swp_specs['values'])
+        raise ValueError('c_load must be specified if out_swp_info has no c_load LIST sweep.')
+
+    def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
+        raise RuntimeError('Unused')
+
+    def get_sim_info(self, sim_db: SimulationDB, dut: DesignInstance, cur_info: MeasInfo
+                     ) -> Tuple[Union[Tuple[TestbenchManager, Mapping[str, Any]],
+                                      MeasurementManager], bool]:
+        raise RuntimeError('Unused')
+
+    def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
+                       ) -> Tuple[bool, MeasInfo]:
+        raise RuntimeError('Unused')
+
+
+def _get_waves(n_rf: int, n_clk: int) -> List[List[Tuple[List[int], List[int]]]]:
+    """Returns the grid blocks of every search wave.
+
+    The first wave is the coarse sub-grid.  The second wave covers the remaining points with
+    two disjoint blocks: the fine rows, and the fine columns of the coarse rows.
+    """
+    rows, cols = (sorted(set(range(0, num, 2)) | {num - 1}) for num in (n_rf, n_clk))
+    all_cols = list(range(n_clk))
+    if len(rows) == n_rf and len(cols) == n_clk:
+        return [[(list(range(n_rf)), all_cols)]]
+    fine_rows = [idx for idx in range(n_rf) if idx not in rows]
+    fine_cols = [idx for idx in all_cols if idx not in cols]
+    blocks = [(fine_rows, all_cols), (rows, fine_cols)]
+    return [[(rows, cols)], [(r, c) for r, c in blocks if r and c]]
+
+
+def _get_probe(lo: np.ndarray, hi: np.ndarray, w_lo: np.ndarray, w_hi: np.ndarray,
+               active: np.ndarray, tol: float) -> np.ndarray:
+    """Returns the next bisection probe of every point, and hi at inactive points.
+
+    Probes inside the seeded window while it overlaps the bracket by more than tol, then
+    inside the full bracket, so a wrong window only costs a few extra iterations.
+    """
+    a = np.maximum(lo, w_lo)
+    b = np.minimum(hi, w_hi)
+    probe = np.where(b - a > tol, (a + b) / 2, (lo + hi) / 2)
+    return np.where(active, probe, hi)
+
+
+def _get_seed_windows(values: np.ndarray, solved: np.ndarray, mask: np.ndarray, low: float,
+                      high: float, tol: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns search windows of unsolved points in mask, seeded from solved neighbors.
+
+    Points without solved neighbors get the full search range.
+    """
+    w_lo = np.full(values.shape, low, dtype=float)
+    w_hi = np.full(values.shape, high, dtype=float)
+    n0, n1 = values.shape
+    for i0, i1 in zip(*np.nonzero(mask & ~solved)):
+        sl = (slice(max(i0 - 1, 0), min(i0 + 2, n0)), slice(max(i1 - 1, 0), min(i1 + 2, n1)))
+        nb_values = values[sl][solved[sl]]
+        if nb_values.size > 0:
+            w_lo[i0, i1] = max(np.min(nb_values) - tol, low)
+            w_hi[i0, i1] = min(np.max(nb_values) + tol, high)
+    return w_lo, w_hi
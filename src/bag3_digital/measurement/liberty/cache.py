@@ -0,0 +1,130 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Mapping, Optional, Dict, List, Sequence
+
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from bag.io.file import read_yaml, write_yaml
+
+
+class ArcCache:
+    """A persistent cache of per-arc liberty characterization results.
+
+    Each arc (a pin capacitance or a timing arc) is identified by its simulation ID.  Its
+    results are stored in a npz file named after a content hash of everything that affects
+    them: the DUT netlist, the arc specification, the corner, and the LUT axes.  A manifest
+    records the current hash of every arc, so stale result files can be removed.
+
+    Parameters
+    ----------
+    root_dir : Path
+        the cache directory.
+    netlist_path : Optional[Path]
+        the DUT netlist file.  None if there is no DUT.
+    """
+
+    manifest_name = 'manifest.yaml'
+
+    def __init__(self, root_dir: Path, netlist_path: Optional[Path] = None) -> None:
+        self._root_dir = root_dir
+        self._netlist_hash = get_file_hash(netlist_path)
+
+        self._manifest: Dict[str, str] = {}
+        self._reused: List[str] = []
+        self._characterized: List[str] = []
+
+    @property
+    def reused(self) -> List[str]:
+        """List[str]: IDs of arcs loaded from the cache."""
+        return self._reused
+
+    @property
+    def characterized(self) -> List[str]:
+        """List[str]: IDs of arcs that were characterized."""
+        return self._characterized
+
+    def get_key(self, arc_specs: Mapping[str, Any]) -> str:
+        """Returns the content hash of the given arc specification."""
+        return get_content_hash(dict(netlist=self._netlist_hash, arc=arc_specs))
+
+    def load(self, arc_id: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+        """Returns the cached results of the given arc, or None if not found."""
+        fname = self._root_dir / f'{key}.npz'
+        if not fname.is_file():
+            return None
+
+        with np.load(fname) as npz_file:
+            ans = {name: npz_file[name] for name in npz_file.files}
+        self._manifest[arc_id] = key
+        self._reused.append(arc_id)
+        return ans
+
+    def save(self, arc_id: str, key: str, data: Mapping[str, Any]) -> None:
+        """Stores the results of the given arc."""
+        self._root_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(self._root_dir / f'{key}.npz', **data)
+        self._manifest[arc_id] = key
+        self._characterized.append(arc_id)
+
+    def commit(self) -> None:
+        """Writes the manifest, and removes results of arcs that no longer exist.
+
+        Should only be called after all arcs are loaded or characterized successfully.
+        """
+        manifest_file = self._root_dir / self.manifest_name
+        old_manifest: Mapping[str, str] = {}
+        if manifest_file.is_file():
+            old_manifest = read_yaml(manifest_file) or {}
+
+        valid_keys = set(self._manifest.values())
+        for key in old_manifest.values():
+            fname = self._root_dir / f'{key}.npz'
+            if key not in valid_keys and fname.is_file():
+                fname.unlink()
+
+        self._root_dir.mkdir(parents=True, exist_ok=True)
+        write_yaml(manifest_file, dict(self._manifest))
+
+
+def get_file_hash(path: Optional[Path]) -> str:
+    """Returns the content hash of the given file, or the empty string if path is None."""
+    if path is None:
+        return ''
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def get_content_hash(obj: Any) -> str:
+    """Returns the content hash of the given specification object."""
+    content = json.dumps(obj, sort_keys=True, default=_json_default)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    if isinstance(obj, Sequence):
+        return list(obj)
+    return str(obj)
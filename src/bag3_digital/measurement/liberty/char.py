@@ -13,14 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Union, Tuple, Mapping, List, Optional, Dict, Sequence, Type, cast
+from typing import (
+    Any, Union, Tuple, Mapping, List, Optional, Dict, Sequence, Type, Iterable, Awaitable,
+    Callable, cast
+)
 
+import math
+import asyncio
 from pathlib import Path
+from dataclasses import replace
 from itertools import chain
+from fnmatch import fnmatchcase
+from functools import partial
 
 import numpy as np
 
-from pybag.enum import TermType
+from pybag.enum import TermType, LogLevel
 
 from bag.util.immutable import update_recursive
 from bag.concurrent.util import GatherHelper
@@ -35,17 +43,118 @@ from bag3_liberty.boolean import build_timing_cond_expr
 from bag3_testbenches.measurement.digital.comb import CombLogicTimingMM
 from bag3_testbenches.measurement.digital.flop.char import FlopTimingCharMM
 
+from ..cap.ac import CapACAdmittance
+from ..comb import CombLogicCondBatchMM
 from ..cap.delay_match import CapDelayMatch
 from ..cap.max_trf import CapMaxRiseFallTime
+from ..flop import FlopConstraintBatchMM
+from ..estimate import RCEstimator
+from .cache import ArcCache, get_content_hash, get_file_hash
+from .journal import MeasJournal
+from .telemetry import MeasTelemetry
+from .sched import MeasScheduler
+from .store import ArcDataStore, ArcDataRef
+from .sparse import SparseLUTSampler
+from .cone import NetlistCone
+from .warm_start import CapBoundCache, get_warm_search_params, hit_warm_bound
+
+
+class _DelayArcGroup:
+    """Delay arcs that share the same related pin and condition.
+
+    The group is simulated lazily, the first time one of its arcs needs simulation data.  If
+    sparse LUT sampling is enabled, the group is simulated again with the full sweep the first
+    time one of its arcs needs the full LUT.
+    """
+
+    def __init__(self) -> None:
+        self.out_pins: List[str] = []
+        self.out_inverts: List[bool] = []
+        self.out_rise = False
+        self.out_fall = False
+        self._sim_fun: Optional[Callable[[bool], Awaitable[Mapping[str, Any]]]] = None
+        self._tasks: Dict[bool, asyncio.Future] = {}
+
+    def add_arc(self, out_pin: str, out_invert: bool, ttype: TimingType) -> None:
+        if out_pin in self.out_pins:
+            if self.out_inverts[self.out_pins.index(out_pin)] != out_invert:
+                raise ValueError(f'Output {out_pin} has conflicting timing sense in a group.')
+        else:
+            self.out_pins.append(out_pin)
+            self.out_inverts.append(out_invert)
+        self.out_rise = self.out_rise or ttype.is_rising
+        self.out_fall = self.out_fall or ttype.is_falling
+
+    def set_sim_fun(self, sim_fun: Callable[[bool], Awaitable[Mapping[str, Any]]]) -> None:
+        """Sets the simulation function, which takes a flag to simulate the full LUT sweep."""
+        self._sim_fun = sim_fun
+
+    async def get_timing_data(self, full: bool = False) -> Mapping[str, Any]:
+        task = self._tasks.get(full, None)
+        if task is None:
+            self._tasks[full] = task = asyncio.ensure_future(self._sim_fun(full))
+        return await task
+
+
+class _CondArcBatch:
+    """Delay arcs of the same output and related pin that differ only in condition.
+
+    The batch is simulated lazily, the first time one of its arcs needs simulation data.  If
+    sparse LUT sampling is enabled, the batch is simulated again with the full sweep the first
+    time one of its arcs needs the full LUT.
+    """
+
+    def __init__(self, out_invert: bool) -> None:
+        self.out_invert = out_invert
+        self.cond_list: List[Mapping[str, int]] = []
+        self.out_rise = False
+        self.out_fall = False
+        self._sim_fun: Optional[Callable[[bool], Awaitable[Sequence[Mapping[str, Any]]]]] = None
+        self._tasks: Dict[bool, asyncio.Future] = {}
+
+    def add_arc(self, cond: Mapping[str, int], ttype: TimingType) -> int:
+        """Adds an arc, and returns its index in the batch."""
+        self.cond_list.append(cond)
+        self.out_rise = self.out_rise or ttype.is_rising
+        self.out_fall = self.out_fall or ttype.is_falling
+        return len(self.cond_list) - 1
+
+    def set_sim_fun(self, sim_fun: Callable[[bool], Awaitable[Sequence[Mapping[str, Any]]]]
+                    ) -> None:
+        """Sets the simulation function, which takes a flag to simulate the full LUT sweep."""
+        self._sim_fun = sim_fun
+
+    async def get_cond_data(self, full: bool = False) -> Sequence[Mapping[str, Any]]:
+        task = self._tasks.get(full, None)
+        if task is None:
+            self._tasks[full] = task = asyncio.ensure_future(self._sim_fun(full))
+        return await task
 
 
 class LibertyCharMM(MeasurementManager):
     def __init__(self, *args: Any, **kwargs: Any) -> None:
         self._tran_specs: Mapping[str, Any] = {}
         self._cin_specs: Dict[str, Any] = {}
+        self._cin_ac_specs: Dict[str, Any] = {}
+        self._cin_ac_pins: List[str] = []
+        self._cin_ac_task: Optional[asyncio.Future] = None
+        self._ref_curve_tasks: Dict[Path, asyncio.Future] = {}
         self._cout_specs: Dict[str, Any] = {}
         self._delay_specs: Dict[str, Any] = {}
         self._seq_mm_table: Dict[str, MeasurementManager] = {}
+        self._arc_cache: Optional[ArcCache] = None
+        self._arc_store: Optional[ArcDataStore] = None
+        self._lut_sampler: Optional[SparseLUTSampler] = None
+        self._sparse_max_err = 0.0
+        self._estimator: Optional[RCEstimator] = None
+        self._journal: Optional[MeasJournal] = None
+        self._telemetry: Optional[MeasTelemetry] = None
+        self._scheduler: Optional[MeasScheduler] = None
+        self._shared_scheduler: Optional[MeasScheduler] = None
+        self._job_name = ''
+        self._cap_bounds: Optional[CapBoundCache] = None
+        self._cap_bound_scale = 1.0
+        self._cone: Optional[NetlistCone] = None
 
         super().__init__(*args, **kwargs)
 
@@ -53,9 +162,46 @@ class LibertyCharMM(MeasurementManager):
     def fake(self) -> bool:
         return self.specs.get('fake', False)
 
+    @property
+    def estimate(self) -> bool:
+        return bool(self.specs.get('estimate', None))
+
+    @property
+    def simulate(self) -> bool:
+        """bool: True if measurements are simulated, instead of faked or estimated."""
+        return not self.fake and not self.estimate
+
+    @property
+    def incremental(self) -> bool:
+        return self.specs.get('incremental', False)
+
+    @property
+    def stream(self) -> bool:
+        return self.specs.get('stream', False)
+
+    @property
+    def resume(self) -> bool:
+        return self.specs.get('resume', False)
+
+    @property
+    def telemetry(self) -> bool:
+        return self.specs.get('telemetry', False)
+
+    def set_shared_scheduler(self, scheduler: Optional[MeasScheduler], job_name: str) -> None:
+        """Schedule measurements with the given scheduler, shared by many characterization jobs.
+
+        The shared scheduler replaces the one built from the scheduler specification, so that
+        the concurrency cap holds across all jobs.  Priorities in the scheduler specification
+        still apply to this job.  The caller saves the run time history of the scheduler.
+        """
+        self._shared_scheduler = scheduler
+        self._job_name = job_name
+
     def commit(self) -> None:
         specs = self.specs
-        fake = self.fake
+        # NOTE: sequential and custom measurements have no analytic model, fake them when
+        # estimating
+        fake = self.fake or self.estimate
 
         sim_env_name: str = specs['sim_env_name']
         sim_envs: Sequence[str] = specs['sim_envs']
@@ -75,6 +221,10 @@ class LibertyCharMM(MeasurementManager):
 
         delay_swp_info: Sequence[Any] = specs['delay_swp_info']
         seq_swp_info: Sequence[Any] = specs['seq_swp_info']
+        sparse_lut: Mapping[str, Any] = specs.get('sparse_lut', {})
+        # NOTE: only measurements that simulate the same testbench many times reuse the
+        # post-reset state
+        reset_state: Mapping[str, Any] = specs.get('reset_state', {}) if self.simulate else {}
 
         cap_tbm_specs = dict(**tran_tbm_specs)
         cap_tbm_specs['sim_envs'] = sim_envs
@@ -86,7 +236,14 @@ class LibertyCharMM(MeasurementManager):
             in_pin='',
             buf_params=buf_params,
             search_params=in_cap_search_params,
+            concurrent_edges=specs.get('in_cap_concurrent', False),
+            ref_curve=specs.get('in_cap_ref_curve', None),
         )
+        if reset_state:
+            self._cin_specs['reset_state'] = reset_state
+        in_cap_ac: Mapping[str, Any] = specs.get('in_cap_ac', {})
+        self._cin_ac_specs = {k: v for k, v in in_cap_ac.items() if k != 'pins'}
+        self._cin_ac_specs['tbm_specs'] = cap_tbm_specs
 
         self._cout_specs = dict(
             tbm_specs=cap_tbm_specs,
@@ -95,7 +252,10 @@ class LibertyCharMM(MeasurementManager):
             max_trf=0,
             buf_params=buf_params,
             search_params=out_cap_search_params,
+            sweep=specs.get('out_cap_sweep', None),
         )
+        if reset_state:
+            self._cout_specs['reset_state'] = reset_state
 
         delay_tbm_specs = cap_tbm_specs.copy()
         delay_tbm_specs['swp_info'] = delay_swp_info
@@ -107,11 +267,27 @@ class LibertyCharMM(MeasurementManager):
             out_invert=False,
             fake=fake,
         )
+        if sparse_lut and self.simulate:
+            self._lut_sampler = SparseLUTSampler(delay_swp_info,
+                                                 num_fit=sparse_lut.get('num_fit', 3),
+                                                 num_check=sparse_lut.get('num_check', 1))
+            self._sparse_max_err = sparse_lut.get('max_err', 0.02)
+        else:
+            self._lut_sampler = None
+
+        estimate: Optional[Mapping[str, Any]] = specs.get('estimate', None)
+        if estimate:
+            self._estimator = RCEstimator(estimate['rc_table'], sim_envs[0], thres_lo, thres_hi)
+        else:
+            self._estimator = None
 
         self._seq_mm_table.clear()
         for name, seq_timing_specs in seq_timing.items():
+            # NOTE: batched mode searches constraints of all LUT points in lock-step
+            default_cls = (FlopConstraintBatchMM if seq_timing_specs.get('batched', False)
+                           else FlopTimingCharMM)
             mm_cls: Union[Type[MeasurementManager], str] = seq_timing_specs.get('mm_cls',
-                                                                                FlopTimingCharMM)
+                                                                                default_cls)
             seq_specs = dict(
                 delay_thres=seq_delay_thres,
                 sim_env_name=sim_env_name,
@@ -123,6 +299,8 @@ class LibertyCharMM(MeasurementManager):
                 search_params=seq_search_params,
                 fake=fake,
             )
+            if reset_state:
+                seq_specs['reset_state'] = reset_state
             seq_specs.update(seq_timing_specs)
             self._seq_mm_table[name] = cast(MeasurementManager, self.make_mm(mm_cls, seq_specs))
 
@@ -135,6 +313,60 @@ class LibertyCharMM(MeasurementManager):
         in_cap_table: Mapping[str, float] = specs['in_cap_table']
         out_io_info_table: Mapping[str, Mapping[str, Any]] = specs['out_io_info_table']
         custom_meas: Mapping[str, Mapping[str, Any]] = specs['custom_meas']
+        out_cap_from_lut: bool = specs.get('out_cap_from_lut', False) and self.simulate
+
+        if self.incremental and self.simulate:
+            netlist_path = None if dut is None else dut.netlist_path
+            self._arc_cache = ArcCache(sim_dir / 'arc_cache', netlist_path)
+        else:
+            self._arc_cache = None
+        self._arc_store = ArcDataStore(sim_dir / 'arc_data') if self.stream else None
+        if self.simulate:
+            netlist_path = None if dut is None else dut.netlist_path
+            # NOTE: these options do not affect measurement results
+            run_specs = {k: v for k, v in specs.items()
+                         if k not in {'incremental', 'stream', 'resume', 'telemetry',
+                                      'scheduler'}}
+            journal_key = get_content_hash(dict(netlist=get_file_hash(netlist_path),
+                                                specs=run_specs))
+            self._journal = MeasJournal(sim_dir / 'journal.pkl', journal_key, self.resume)
+            if self._journal.num_loaded:
+                self.log(f'Resuming with {self._journal.num_loaded} completed measurements.')
+        else:
+            self._journal = None
+        if self.telemetry:
+            self._telemetry = MeasTelemetry(f'{name}_{specs["sim_env_name"]}')
+        else:
+            self._telemetry = None
+
+        # NOTE: without a concurrency cap, all measurements start at once
+        sched_specs: Mapping[str, Any] = specs.get('scheduler', {})
+        max_meas_jobs: int = sched_specs.get('max_jobs', 0)
+        if self._shared_scheduler is not None and self.simulate:
+            self._scheduler = self._shared_scheduler
+        elif max_meas_jobs > 0 and self.simulate:
+            self._scheduler = MeasScheduler(max_meas_jobs, sim_dir / 'meas_cost.yaml',
+                                            costs=sched_specs.get('costs', None),
+                                            priorities=sched_specs.get('priorities', None))
+        else:
+            self._scheduler = None
+        warm_start: Mapping[str, Any] = specs.get('cap_warm_start', {})
+        if warm_start and self.simulate:
+            self._cap_bounds = CapBoundCache(Path(warm_start['path']), specs['sim_env_name'],
+                                             guess_range=warm_start.get('guess_range', 0.1))
+            self._cap_bound_scale = warm_start.get('bound_scale', 2.0)
+        else:
+            self._cap_bounds = None
+
+        cone_prune: Union[bool, Mapping[str, Any]] = specs.get('cone_prune', False)
+        if cone_prune and self.simulate and dut is not None:
+            mos_models = cone_prune.get('mos_models', None) if isinstance(cone_prune,
+                                                                          Mapping) else None
+            self._cone = NetlistCone(dut.netlist_path, dut.cell_name,
+                                     specs['dut_info']['sup_values'].keys(),
+                                     mos_models=mos_models)
+        else:
+            self._cone = None
 
         # setup input capacitance measurements
         ans = {}
@@ -142,42 +374,104 @@ class LibertyCharMM(MeasurementManager):
             in_pin_list: Sequence[Mapping[str, Any]] = specs['in_pin_list']
             out_pin_list: Sequence[Mapping[str, Any]] = specs['out_pin_list']
             io_pin_list: Sequence[Mapping[str, Any]] = specs['io_pin_list']
-            in_bit_names = [info['name'] for info in in_pin_list]
-            out_io_pins = [info['name'] for info in chain(out_pin_list, io_pin_list)]
+            pin_iter = chain(((info['name'], TermType.input) for info in in_pin_list),
+                             ((info['name'], TermType.output) for info in out_pin_list),
+                             ((info['name'], TermType.inout) for info in io_pin_list))
         else:
-            in_bit_names = []
-            out_io_pins = []
-            for pin_name, term_type in dut.sch_master.pins.items():
-                basename, bus_range = parse_cdba_name(pin_name)
-                if bus_range is None:
+            pin_iter = dut.sch_master.pins.items()
+
+        # NOTE: expand buses, so that every bit is characterized individually
+        in_bit_names = []
+        out_io_pins = []
+        for pin_name, term_type in pin_iter:
+            basename, bus_range = parse_cdba_name(pin_name)
+            if bus_range is None:
+                if term_type is TermType.input:
+                    in_bit_names.append(pin_name)
+                else:
+                    out_io_pins.append(pin_name)
+            else:
+                for bus_idx in bus_range:
+                    bit_name = get_bus_bit_name(basename, bus_idx, cdba=True)
                     if term_type is TermType.input:
-                        in_bit_names.append(pin_name)
+                        in_bit_names.append(bit_name)
                     else:
-                        out_io_pins.append(pin_name)
-                else:
-                    for bus_idx in bus_range:
-                        bit_name = get_bus_bit_name(basename, bus_idx, cdba=True)
-                        if term_type is TermType.input:
-                            in_bit_names.append(bit_name)
-                        else:
-                            out_io_pins.append(bit_name)
+                        out_io_pins.append(bit_name)
 
-        gatherer = GatherHelper()
-        for bit_name in in_bit_names:
-            ans[bit_name] = pin_info = {}
-            gatherer.append(self._measure_in_cap(name, sim_dir, sim_db, dut, bit_name,
-                                                 in_cap_table, pin_info))
+        # find input bits measured with a single AC simulation
+        in_cap_ac: Mapping[str, Any] = specs.get('in_cap_ac', {})
+        if in_cap_ac and self.simulate:
+            ac_pats: Sequence[str] = in_cap_ac.get('pins', ['*'])
+            self._cin_ac_pins = [bit_name for bit_name in in_bit_names
+                                 if any((fnmatchcase(bit_name, pat) or
+                                         fnmatchcase(parse_cdba_name(bit_name)[0], pat)
+                                         for pat in ac_pats))]
+            if 'states' not in in_cap_ac:
+                # NOTE: measure at every timing condition, as these are the states that matter
+                states = [{}]
+                for pin_info in out_io_info_table.values():
+                    for tinfo in pin_info.get('timing_info', None) or []:
+                        cond: Mapping[str, int] = tinfo.get('cond', {})
+                        if cond and cond not in states:
+                            states.append(dict(cond))
+                self._cin_ac_specs['states'] = states
+        else:
+            self._cin_ac_pins = []
+        self._cin_ac_task = None
+        self._ref_curve_tasks = {}
 
-        # record input capacitances
-        if gatherer:
-            in_cap_min = min((val for val in await gatherer.gather_err() if val is not None))
+        # find bus bits that reuse results of representative bits
+        bus_sym: Mapping[str, Any] = specs.get('bus_symmetry', {})
+        if bus_sym:
+            num_rep: int = bus_sym.get('num_rep', 2)
+            sym_tol: float = bus_sym.get('tol', 0.02)
+            if num_rep < 1:
+                raise ValueError('bus_symmetry num_rep must be at least 1.')
+            in_rep_table = _get_bus_rep_table(in_bit_names, num_rep)
+            out_rep_table = _get_out_rep_table(out_io_pins, out_io_info_table, num_rep)
+        else:
+            sym_tol = 0
+            in_rep_table = out_rep_table = {}
 
-        # get parameters needed for output pin measurement
-        out_cap_min = in_cap_min * out_min_fanout
+        # group delay arcs that share related pin and condition into single simulations
+        if specs.get('group_delay_arcs', False) and self.simulate:
+            arc_groups = self._get_delay_arc_groups(name, sim_dir, sim_db, dut, out_io_pins,
+                                                    out_io_info_table)
+        else:
+            arc_groups = {}
+        # batch delay arcs that differ only in condition into multi-phase simulations
+        if specs.get('batch_cond_arcs', False) and self.simulate:
+            cond_batches = self._get_cond_arc_batches(name, sim_dir, sim_db, dut, out_io_pins,
+                                                      out_io_info_table, arc_groups)
+        else:
+            cond_batches = {}
+
+        # NOTE: the only output quantity that depends on input capacitance is cap_min of
+        # output pins, which is not used by any simulation.  Therefore, launch all measurements
+        # at once, and compute cap_min after the minimum input capacitance is known.
+        # NOTE: representative bits are measured first, so other bits can wait on their tasks.
+        gatherer = GatherHelper()
+        in_tasks = {}
+        for bit_name in chain((b for b in in_bit_names if b not in in_rep_table), in_rep_table):
+            ans[bit_name] = pin_info = {}
+            # NOTE: AC input pins only wait on the shared AC simulation, which is scheduled
+            meas = self._track(f'cap_in_{cdba_to_unusal(bit_name)}', 'in_cap',
+                               partial(self._measure_in_cap, name, sim_dir, sim_db, dut,
+                                       bit_name, in_cap_table, pin_info),
+                               schedule=bit_name not in self._cin_ac_pins)
+            rep_bits = in_rep_table.get(bit_name, None)
+            if rep_bits is None:
+                in_tasks[bit_name] = task = asyncio.ensure_future(meas())
+                gatherer.append(task)
+            else:
+                gatherer.append(self._replicate_bit(bit_name, [in_tasks[b] for b in rep_bits],
+                                                    ['cap_rise', 'cap_fall'], sym_tol, meas,
+                                                    self._copy_cap_dict, pin_info))
 
         # compute inout and output pin cap/timing information
-        gatherer.clear()
-        for bit_name in out_io_pins:
+        out_cap_bits = []
+        out_tasks = {}
+        for bit_name in chain((b for b in out_io_pins if b not in out_rep_table), out_rep_table):
             ans[bit_name] = pin_info = {}
             pin_info = out_io_info_table.get(bit_name, None)
             if pin_info is None:
@@ -185,18 +479,11 @@ class LibertyCharMM(MeasurementManager):
 
             cap_info: Mapping[str, Any] = pin_info.get('cap_info', None)
             tinfo_list: Optional[Sequence[Mapping[str, Any]]] = pin_info.get('timing_info', None)
+            rep_bits = out_rep_table.get(bit_name, None)
 
             output_table = ans[bit_name]
-            if cap_info is not None:
-                related: str = cap_info.get('related', '')
-                max_cap: Optional[float] = cap_info.get('max_cap', None)
-                max_trf: float = cap_info.get('max_trf', out_max_trf)
-                cond: Mapping[str, int] = cap_info.get('cond', {})
-
-                gatherer.append(self._measure_out_cap(name, sim_dir, sim_db, dut, bit_name, related,
-                                                      max_cap, max_trf, cond, out_cap_min,
-                                                      output_table))
-
+            lut_tasks = []
+            # NOTE: measure timing first, so max output cap can use the transition LUTs
             if tinfo_list is not None:
                 output_table['timing'] = timing_output = []
                 for idx, tinfo in enumerate(tinfo_list):
@@ -210,63 +497,241 @@ class LibertyCharMM(MeasurementManager):
                     related_str = cdba_to_unusal(related)
                     out_str = cdba_to_unusal(bit_name)
                     sim_id = f'comb_delay_{related_str}_{out_str}_{idx}'
-                    gatherer.append(self._measure_delay(name, sim_id, sim_dir, sim_db, dut,
-                                                        bit_name, related, sense_str, cond,
-                                                        timing_type, zero_delay, data,
-                                                        timing_output))
+                    arc_group = arc_groups.get((bit_name, idx), None)
+                    cond_batch = cond_batches.get((bit_name, idx), None)
+                    # NOTE: grouped and batched arcs only wait on their shared simulation,
+                    # which is scheduled instead
+                    meas = self._track(sim_id, 'delay',
+                                       partial(self._measure_delay, name, sim_id, sim_dir, sim_db,
+                                               dut, bit_name, related, sense_str, cond,
+                                               timing_type, zero_delay, data, timing_output,
+                                               arc_group, cond_batch),
+                                       schedule=arc_group is None and cond_batch is None)
+                    if rep_bits is None:
+                        out_tasks[(bit_name, idx)] = task = asyncio.ensure_future(meas())
+                        gatherer.append(task)
+                        if data is None and not zero_delay:
+                            lut_tasks.append(task)
+                    else:
+                        timing = dict(related=related, timing_type=TimingType[timing_type].name,
+                                      cond=build_timing_cond_expr(cond), sense=sense_str)
+                        gatherer.append(self._replicate_bit(
+                            f'{bit_name} timing {idx}', [out_tasks[(b, idx)] for b in rep_bits],
+                            None, sym_tol, meas, self._copy_timing, timing, timing_output))
+
+            if cap_info is not None:
+                related: str = cap_info.get('related', '')
+                max_cap: Optional[float] = cap_info.get('max_cap', None)
+                max_trf: float = cap_info.get('max_trf', out_max_trf)
+                cond: Mapping[str, int] = cap_info.get('cond', {})
+
+                out_cap_bits.append(bit_name)
+                meas = self._track(f'cap_out_{cdba_to_unusal(bit_name)}', 'out_cap',
+                                   partial(self._measure_out_cap, name, sim_dir, sim_db, dut,
+                                           bit_name, related, max_cap, max_trf, cond,
+                                           output_table))
+                if rep_bits is None:
+                    if max_cap is None and lut_tasks and out_cap_from_lut:
+                        # NOTE: wait for delay arcs outside of the scheduler, so no slot is
+                        # held while waiting.
+                        meas = partial(self._measure_out_cap_from_lut, bit_name, max_trf,
+                                       lut_tasks, meas, output_table)
+                    out_tasks[bit_name] = task = asyncio.ensure_future(meas())
+                    gatherer.append(task)
+                else:
+                    gatherer.append(self._replicate_bit(bit_name,
+                                                        [out_tasks[b] for b in rep_bits],
+                                                        ['cap_max'], sym_tol, meas,
+                                                        self._copy_cap_dict, output_table))
+
         # add custom and flop measurements
         for meas_name, meas_params in custom_meas.items():
             meas_cls: str = meas_params['meas_class']
             meas_specs: Mapping[str, Any] = meas_params['meas_specs']
-            gatherer.append(self._measure_custom(name, sim_dir, sim_db, dut, meas_name,
-                                                 meas_cls, meas_specs, ans))
+            meas = self._track(f'custom_{meas_name}', 'custom',
+                               partial(self._measure_custom, name, sim_dir, sim_db, dut,
+                                       meas_name, meas_cls, meas_specs, ans))
+            gatherer.append(meas())
 
         for seq_name, seq_mm in self._seq_mm_table.items():
-            gatherer.append(self._measure_flop(name, sim_dir, sim_db, dut, seq_name, seq_mm, ans))
+            meas = self._track(f'seq_timing_{seq_name}', 'seq',
+                               partial(self._measure_flop, name, sim_dir, sim_db, dut, seq_name,
+                                       seq_mm, ans))
+            gatherer.append(meas())
 
         # run all simulation in parallel
-        await gatherer.run()
+        try:
+            await gatherer.run()
+        finally:
+            if self._journal is not None:
+                self._journal.close()
+            if self._telemetry is not None:
+                self._write_telemetry(sim_dir)
+            if self._scheduler is not None and self._scheduler is not self._shared_scheduler:
+                self._scheduler.save_history()
+
+        # record minimum output capacitances
+        if in_bit_names:
+            in_cap_min = min((ans[bit_name]['cap_dict']['cap'] for bit_name in in_bit_names))
+        out_cap_min = in_cap_min * out_min_fanout
+        for bit_name in out_cap_bits:
+            cap_dict = ans[bit_name]['cap_dict']
+            cap_dict['cap_min'] = min(cap_dict['cap_max'], out_cap_min)
+
+        if self._arc_cache is not None:
+            self._arc_cache.commit()
+            for arc_id in self._arc_cache.reused:
+                self.log(f'Reused arc {arc_id}')
+            self.log(f'Arc cache: reused {len(self._arc_cache.reused)} arcs, characterized '
+                     f'{len(self._arc_cache.characterized)} arcs.')
         return ans
 
+    def _get_delay_arc_groups(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                              dut: Optional[DesignInstance], out_io_pins: Sequence[str],
+                              out_io_info_table: Mapping[str, Mapping[str, Any]]
+                              ) -> Dict[Tuple[str, int], _DelayArcGroup]:
+        """Group simulated delay arcs with the same related pin and condition.
+
+        Returns a dictionary from (output pin, timing index) to the group of that arc.  Only
+        groups with more than one output are returned.
+        """
+        group_table: Dict[Tuple[str, Tuple[Tuple[str, int], ...]], _DelayArcGroup] = {}
+        ans = {}
+        for bit_name in out_io_pins:
+            pin_info = out_io_info_table.get(bit_name, None)
+            if pin_info is None:
+                continue
+            tinfo_list: Sequence[Mapping[str, Any]] = pin_info.get('timing_info', None) or []
+            for idx, tinfo in enumerate(tinfo_list):
+                sense = TimingSenseType[tinfo['sense']]
+                if (sense is TimingSenseType.non_unate or tinfo.get('zero_delay', False) or
+                        tinfo.get('data', None) is not None):
+                    continue
+
+                related: str = tinfo['related']
+                cond: Mapping[str, int] = tinfo.get('cond', {})
+                key = (related, tuple(sorted(cond.items())))
+                arc_group = group_table.get(key, None)
+                if arc_group is None:
+                    group_table[key] = arc_group = _DelayArcGroup()
+                arc_group.add_arc(bit_name, sense is TimingSenseType.negative_unate,
+                                  TimingType[tinfo.get('timing_type', 'combinational')])
+                ans[(bit_name, idx)] = arc_group
+
+        for group_idx, ((related, cond_items), arc_group) in enumerate(group_table.items()):
+            sim_id = f'comb_delay_group_{cdba_to_unusal(related)}_{group_idx}'
+            arc_group.set_sim_fun(partial(self._track_group_sim, sim_id, partial(
+                self._simulate_delay_group, name, sim_id, sim_dir, sim_db, dut, related,
+                dict(cond_items), arc_group)))
+
+        return {key: arc_group for key, arc_group in ans.items()
+                if len(arc_group.out_pins) > 1}
+
+    def _get_cond_arc_batches(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                              dut: Optional[DesignInstance], out_io_pins: Sequence[str],
+                              out_io_info_table: Mapping[str, Mapping[str, Any]],
+                              arc_groups: Mapping[Tuple[str, int], _DelayArcGroup]
+                              ) -> Dict[Tuple[str, int], Tuple[_CondArcBatch, int]]:
+        """Batch simulated delay arcs with the same output, related pin, and timing sense.
+
+        Returns a dictionary from (output pin, timing index) to the batch of that arc and the
+        index of the arc in the batch.  Arcs in delay arc groups are skipped, and only batches
+        with more than one condition are returned.
+        """
+        batch_table: Dict[Tuple[str, str, str], _CondArcBatch] = {}
+        ans = {}
+        for bit_name in out_io_pins:
+            pin_info = out_io_info_table.get(bit_name, None)
+            if pin_info is None:
+                continue
+            tinfo_list: Sequence[Mapping[str, Any]] = pin_info.get('timing_info', None) or []
+            for idx, tinfo in enumerate(tinfo_list):
+                sense = TimingSenseType[tinfo['sense']]
+                if (sense is TimingSenseType.non_unate or tinfo.get('zero_delay', False) or
+                        tinfo.get('data', None) is not None or (bit_name, idx) in arc_groups):
+                    continue
+
+                key = (bit_name, tinfo['related'], sense.name)
+                cond_batch = batch_table.get(key, None)
+                if cond_batch is None:
+                    batch_table[key] = cond_batch = _CondArcBatch(
+                        sense is TimingSenseType.negative_unate)
+                ans[(bit_name, idx)] = (cond_batch, cond_batch.add_arc(
+                    tinfo.get('cond', {}), TimingType[tinfo.get('timing_type', 'combinational')]))
+
+        for batch_idx, ((bit_name, related, _), cond_batch) in enumerate(batch_table.items()):
+            sim_id = f'comb_delay_cond_{cdba_to_unusal(related)}_{batch_idx}'
+            cond_batch.set_sim_fun(partial(self._track_group_sim, sim_id, partial(
+                self._simulate_cond_batch, name, sim_id, sim_dir, sim_db, dut, related,
+                bit_name, cond_batch)))
+
+        return {key: val for key, val in ans.items() if len(val[0].cond_list) > 1}
+
     async def _measure_in_cap(self, name: str, sim_dir: Path, sim_db: SimulationDB,
                               dut: Optional[DesignInstance], pin_name: str,
                               in_cap_table: Mapping[str, float], output_table: Dict[str, Any]
-                              ) -> float:
+                              ) -> Dict[str, Any]:
         cap_range: float = self.specs['in_cap_range_scale']
-        if self.fake:
+        if self._estimator is not None:
+            cap_rise = cap_fall = self._estimator.get_in_cap(self._get_estimate_seg(pin_name,
+                                                                                    True))
+        elif self.fake:
             cap_rise = cap_fall = in_cap_table[pin_name]
+        elif pin_name in self._cin_ac_pins:
+            sim_id = f'cap_in_{cdba_to_unusal(pin_name)}'
+
+            cache_key, mm_data = self._load_arc(sim_id, dict(self._cin_ac_specs,
+                                                             in_pin=pin_name))
+            if mm_data is None:
+                if self._cin_ac_task is None:
+                    # NOTE: all AC input pins share the same simulation
+                    sim_fun = self._track('cap_in_ac', 'in_cap',
+                                          partial(self._simulate_cin_ac, name, sim_dir, sim_db,
+                                                  dut))
+                    self._cin_ac_task = asyncio.ensure_future(sim_fun())
+                mm_data = (await self._cin_ac_task)[pin_name]
+                self._save_arc(sim_id, cache_key, dict(cap_rise=mm_data['cap_rise'],
+                                                       cap_fall=mm_data['cap_fall']))
+            cap_rise = float(mm_data['cap_rise'])
+            cap_fall = float(mm_data['cap_fall'])
         else:
             sim_id = f'cap_in_{cdba_to_unusal(pin_name)}'
 
             cur_specs = self._cin_specs.copy()
             cur_specs['in_pin'] = pin_name
 
-            mm = sim_db.make_mm(CapDelayMatch, cur_specs)
-            mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
-                                                           dut, mm)
-            mm_data = mm_result.data
-            cap_rise = mm_data['cap_rise']
-            cap_fall = mm_data['cap_fall']
+            cache_key, mm_data = self._load_arc(sim_id, cur_specs)
+            if mm_data is None:
+                bound_keys = {key: f'{sim_id}/{key}' for key in ['cap_rise', 'cap_fall']}
+                mm_data = await self._simulate_cap_mm(name, sim_id, sim_dir, sim_db, dut,
+                                                      CapDelayMatch, cur_specs, bound_keys)
+                self._save_arc(sim_id, cache_key, dict(cap_rise=mm_data['cap_rise'],
+                                                       cap_fall=mm_data['cap_fall']))
+            cap_rise = float(mm_data['cap_rise'])
+            cap_fall = float(mm_data['cap_fall'])
 
         cap = (cap_rise + cap_fall) / 2
         cap_rise_range = [cap_rise * (1 - cap_range), cap_rise * (1 + cap_range)]
         cap_fall_range = [cap_fall * (1 - cap_range), cap_fall * (1 + cap_range)]
-        output_table['cap_dict'] = dict(cap=cap, cap_rise=cap_rise, cap_fall=cap_fall,
-                                        cap_rise_range=cap_rise_range,
-                                        cap_fall_range=cap_fall_range)
-        return cap
+        output_table['cap_dict'] = cap_dict = dict(cap=cap, cap_rise=cap_rise, cap_fall=cap_fall,
+                                                   cap_rise_range=cap_rise_range,
+                                                   cap_fall_range=cap_fall_range)
+        return cap_dict
 
     async def _measure_out_cap(self, name: str, sim_dir: Path, sim_db: SimulationDB,
                                dut: Optional[DesignInstance], pin_name: str, related: str,
                                max_cap: Optional[float], max_trf: float, cond: Mapping[str, int],
-                               out_cap_min: float, output_table: Dict[str, Any]) -> None:
+                               output_table: Dict[str, Any]) -> Dict[str, Any]:
         out_cap_num_freq: int = self.specs['out_cap_num_freq']
 
         if max_cap is None:
             if not related:
                 raise ValueError('No related pin specified for max output cap measurement.')
 
-            if self.fake:
+            if self._estimator is not None:
+                max_cap = self._estimator.get_max_cap(self._get_estimate_seg(pin_name, False),
+                                                      max_trf)
+            elif self.fake:
                 max_cap = 200.0e-15
             else:
                 sim_id = f'cap_out_{cdba_to_unusal(pin_name)}'
@@ -280,23 +745,62 @@ class LibertyCharMM(MeasurementManager):
                     pin_values.update(cond)
                     update_recursive(cur_specs, pin_values, 'tbm_specs', 'pin_values')
 
-                mm = sim_db.make_mm(CapMaxRiseFallTime, cur_specs)
-                mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
-                                                               dut, mm)
-                mm_data = mm_result.data
-                max_cap = mm_data['cap']
+                cache_key, mm_data = self._load_arc(sim_id, cur_specs)
+                if mm_data is None:
+                    # NOTE: maximum output cap scales with maximum transition time
+                    arc_dut = self._get_cone_dut(dut, sim_dir, sim_id, [pin_name])
+                    mm_data = await self._simulate_cap_mm(name, sim_id, sim_dir, sim_db,
+                                                          arc_dut, CapMaxRiseFallTime, cur_specs,
+                                                          dict(cap=sim_id), scale=max_trf)
+                    self._save_arc(sim_id, cache_key, dict(cap=mm_data['cap']))
+                max_cap = float(mm_data['cap'])
 
-        output_table['cap_dict'] = dict(
-            cap_min=min(max_cap, out_cap_min),
+        # NOTE: cap_min is filled in after all input capacitances are measured
+        output_table['cap_dict'] = cap_dict = dict(
             cap_max=max_cap,
             cap_max_table=[max_cap] * out_cap_num_freq,
         )
+        return cap_dict
+
+    async def _measure_out_cap_from_lut(self, pin_name: str, max_trf: float,
+                                        lut_tasks: Sequence[Awaitable[Dict[str, Any]]],
+                                        meas_fun: Callable[[], Awaitable[Dict[str, Any]]],
+                                        output_table: Dict[str, Any]) -> Dict[str, Any]:
+        """Measure max output cap by interpolating transition LUTs of the given delay arcs.
+
+        The given measurement coroutine, which searches for the max output cap, is run only if
+        max_trf is outside the transition range of any LUT.
+        """
+        out_cap_num_freq: int = self.specs['out_cap_num_freq']
+        delay_swp_info: Sequence[Any] = self.specs['delay_swp_info']
+
+        max_cap = math.inf
+        for task in lut_tasks:
+            data = (await task)['data']
+            if isinstance(data, ArcDataRef):
+                data = data.load()
+            cur_cap = _get_lut_max_cap(data, delay_swp_info, max_trf)
+            if cur_cap is None:
+                self.log(f'Cannot interpolate transition LUTs of {pin_name} at max_trf, '
+                         f'searching for max output cap.')
+                return await meas_fun()
+            max_cap = min(max_cap, cur_cap)
+
+        # NOTE: cap_min is filled in after all input capacitances are measured
+        output_table['cap_dict'] = cap_dict = dict(
+            cap_max=max_cap,
+            cap_max_table=[max_cap] * out_cap_num_freq,
+        )
+        return cap_dict
 
     async def _measure_delay(self, name: str, sim_id: str, sim_dir: Path, sim_db: SimulationDB,
                              dut: Optional[DesignInstance], pin_name: str, related: str,
                              sense_str: str, cond: Mapping[str, int], timing_type_str: str,
                              zero_delay: bool, user_data: Optional[Mapping[str, Any]],
-                             output_list: List[Dict[str, Any]]) -> None:
+                             output_list: List[Dict[str, Any]],
+                             arc_group: Optional[_DelayArcGroup] = None,
+                             cond_batch: Optional[Tuple[_CondArcBatch, int]] = None
+                             ) -> Dict[str, Any]:
         specs = self.specs
         sim_env_name: str = specs['sim_env_name']
         delay_shape: Tuple[int, ...] = specs['delay_shape']
@@ -327,71 +831,403 @@ class LibertyCharMM(MeasurementManager):
         elif zero_delay:
             for name in keys:
                 data[name] = np.zeros(delay_shape)
+        elif self._estimator is not None:
+            data.update(self._estimator.get_delay_data(self._get_estimate_seg(pin_name, False),
+                                                       keys, specs['delay_swp_info']))
         elif self.fake:
             for name in keys:
                 val = 50.0e-12 if name.startswith('cell') else 20.0e-12
                 data[name] = np.full(delay_shape, val)
         else:
-            cur_specs = self._delay_specs.copy()
-            cur_specs['in_pin'] = related
-            cur_specs['out_pin'] = pin_name
-            cur_specs['out_invert'] = out_invert
-            cur_specs['out_rise'] = ttype.is_rising
-            cur_specs['out_fall'] = ttype.is_falling
-            if cond:
-                pin_values = cur_specs['tbm_specs']['pin_values'].copy()
-                pin_values.update(cond)
-                update_recursive(cur_specs, pin_values, 'tbm_specs', 'pin_values')
-
-            mm = sim_db.make_mm(CombLogicTimingMM, cur_specs)
-            mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
-                                                           dut, mm)
-            delay_data = mm_result.data['timing_data'][pin_name]
+            cur_specs = self._get_delay_specs(related, pin_name, out_invert, ttype.is_rising,
+                                              ttype.is_falling, cond)
+            if arc_group is not None:
+                # NOTE: loads on other outputs of the group affect the results
+                cache_specs = dict(group_out_pins=arc_group.out_pins, **cur_specs)
+            elif cond_batch is not None:
+                # NOTE: previous phases of the batch may affect the results
+                cache_specs = dict(batch_conds=cond_batch[0].cond_list, **cur_specs)
+            else:
+                cache_specs = cur_specs
 
-            for name in keys:
-                # NOTE: remove corners
-                data[name] = delay_data[name][0, ...]
+            cache_key, cache_data = self._load_arc(sim_id, cache_specs)
+            if cache_data is None:
+                if arc_group is not None:
+                    delay_data = (await arc_group.get_timing_data())[pin_name]
+                elif cond_batch is not None:
+                    delay_data = (await cond_batch[0].get_cond_data())[cond_batch[1]]
+                else:
+                    mm = sim_db.make_mm(CombLogicTimingMM, cur_specs)
+                    arc_dut = self._get_cone_dut(dut, sim_dir, sim_id, [pin_name])
+                    MeasTelemetry.count_sim()
+                    mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}',
+                                                                   sim_dir / sim_id, arc_dut, mm)
+                    delay_data = mm_result.data['timing_data'][pin_name]
+
+                for key in keys:
+                    # NOTE: remove corners
+                    data[key] = delay_data[key][0, ...]
+                if self._lut_sampler is not None and not self._fill_sparse_lut(sim_id, data):
+                    # model fit is not accurate enough, simulate the full LUT.
+                    # NOTE: grouped and batched arcs re-run their group or batch, so the full
+                    # LUT has the same loading as the sparse points
+                    if arc_group is not None:
+                        delay_data = (await arc_group.get_timing_data(full=True))[pin_name]
+                    elif cond_batch is not None:
+                        delay_data = (await cond_batch[0].get_cond_data(full=True))[
+                            cond_batch[1]]
+                    else:
+                        full_specs = self._get_delay_specs(related, pin_name, out_invert,
+                                                           ttype.is_rising, ttype.is_falling,
+                                                           cond, sparse=False)
+                        mm = sim_db.make_mm(CombLogicTimingMM, full_specs)
+                        arc_dut = self._get_cone_dut(dut, sim_dir, sim_id, [pin_name])
+                        MeasTelemetry.count_sim()
+                        mm_result = await sim_db.async_simulate_mm_obj(
+                            f'{name}_{sim_id}_full', sim_dir / f'{sim_id}_full', arc_dut, mm)
+                        delay_data = mm_result.data['timing_data'][pin_name]
+                    for key in keys:
+                        data[key] = delay_data[key][0, ...]
+                self._save_arc(sim_id, cache_key, data)
+            else:
+                data.update(cache_data)
 
         ans = dict(
             related=related,
             timing_type=ttype.name,
             cond=build_timing_cond_expr(cond),
             sense=sense_str,
-            data=data,
+            data=self._stream_data(sim_id, data),
         )
         output_list.append(ans)
+        return ans
+
+    def _get_delay_specs(self, in_pin: str, out_pin: Union[str, Sequence[str]],
+                         out_invert: Union[bool, Sequence[bool]], out_rise: bool, out_fall: bool,
+                         cond: Mapping[str, int], sparse: bool = True) -> Dict[str, Any]:
+        cur_specs = self._delay_specs.copy()
+        if sparse and self._lut_sampler is not None:
+            cur_specs['tbm_specs'] = dict(cur_specs['tbm_specs'],
+                                          swp_info=self._lut_sampler.swp_info)
+        cur_specs['in_pin'] = in_pin
+        cur_specs['out_pin'] = out_pin
+        cur_specs['out_invert'] = out_invert
+        cur_specs['out_rise'] = out_rise
+        cur_specs['out_fall'] = out_fall
+        if cond:
+            pin_values = cur_specs['tbm_specs']['pin_values'].copy()
+            pin_values.update(cond)
+            update_recursive(cur_specs, pin_values, 'tbm_specs', 'pin_values')
+        return cur_specs
+
+    def _get_estimate_seg(self, pin_name: str, is_input: bool) -> int:
+        """Returns number of unit segments connected to the given pin, used for estimation."""
+        estimate: Mapping[str, Any] = self.specs['estimate']
+        seg_table: Mapping[str, int] = estimate.get('seg_table', {})
+        seg = seg_table.get(pin_name, None)
+        if seg is None:
+            seg = seg_table.get(parse_cdba_name(pin_name)[0], None)
+        if seg is None:
+            seg = estimate['seg_in'] if is_input else estimate['seg_out']
+        return seg
+
+    def _fill_sparse_lut(self, arc_id: str, data: Dict[str, np.ndarray]) -> bool:
+        """Fill full LUTs from sparsely simulated data in place.
+
+        Returns False, leaving data untouched, if the model error at held-out points of any
+        LUT exceeds the tolerance.
+        """
+        lut_table = {}
+        for key, sim_data in data.items():
+            lut, err = self._lut_sampler.fill(sim_data)
+            if err > self._sparse_max_err:
+                self.log(f'Sparse LUT fit error of {arc_id} ({key}) is {err:.4g}, '
+                         f'simulating the full LUT.', level=LogLevel.WARN)
+                return False
+            lut_table[key] = lut
+
+        data.update(lut_table)
+        return True
+
+    async def _simulate_cin_ac(self, name: str, sim_dir: Path, sim_db: SimulationDB,
+                               dut: Optional[DesignInstance]) -> Mapping[str, Any]:
+        """Measure capacitance of all AC input pins in a single simulation."""
+        mm = sim_db.make_mm(CapACAdmittance, dict(self._cin_ac_specs, in_pins=self._cin_ac_pins))
+        MeasTelemetry.count_sim()
+        mm_result = await sim_db.async_simulate_mm_obj(f'{name}_cap_in_ac', sim_dir / 'cap_in_ac',
+                                                       dut, mm)
+        return mm_result.data
+
+    async def _simulate_delay_group(self, name: str, sim_id: str, sim_dir: Path,
+                                    sim_db: SimulationDB, dut: Optional[DesignInstance],
+                                    related: str, cond: Mapping[str, int],
+                                    arc_group: _DelayArcGroup, full: bool = False
+                                    ) -> Mapping[str, Any]:
+        """Measure delay from one related pin to many outputs in a single simulation.
+
+        Every output is loaded with the swept c_load, so the LUTs of all outputs come out of
+        the same transient sweep.  If full is True, sweep the full LUT even with sparse LUT
+        sampling.
+        """
+        cur_specs = self._get_delay_specs(related, arc_group.out_pins, arc_group.out_inverts,
+                                          arc_group.out_rise, arc_group.out_fall, cond,
+                                          sparse=not full)
+        if full:
+            sim_id = f'{sim_id}_full'
+        mm = sim_db.make_mm(CombLogicTimingMM, cur_specs)
+        arc_dut = self._get_cone_dut(dut, sim_dir, sim_id, arc_group.out_pins)
+        MeasTelemetry.count_sim()
+        mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
+                                                       arc_dut, mm)
+        return mm_result.data['timing_data']
+
+    async def _simulate_cond_batch(self, name: str, sim_id: str, sim_dir: Path,
+                                   sim_db: SimulationDB, dut: Optional[DesignInstance],
+                                   related: str, out_pin: str, cond_batch: _CondArcBatch,
+                                   full: bool = False) -> Sequence[Mapping[str, Any]]:
+        """Measure delay of one arc under many conditions in multi-phase simulations.
+
+        If full is True, sweep the full LUT even with sparse LUT sampling.
+        """
+        cur_specs = self._get_delay_specs(related, out_pin, cond_batch.out_invert,
+                                          cond_batch.out_rise, cond_batch.out_fall, {},
+                                          sparse=not full)
+        if full:
+            sim_id = f'{sim_id}_full'
+        cur_specs['cond_list'] = cond_batch.cond_list
+        mm = sim_db.make_mm(CombLogicCondBatchMM, cur_specs)
+        arc_dut = self._get_cone_dut(dut, sim_dir, sim_id, [out_pin])
+        MeasTelemetry.count_sim()
+        mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
+                                                       arc_dut, mm)
+        return mm_result.data['cond_data']
+
+    def _get_cone_dut(self, dut: Optional[DesignInstance], sim_dir: Path, sim_id: str,
+                      out_pins: Sequence[str]) -> Optional[DesignInstance]:
+        """Returns the DUT pruned to the logic cone of the given outputs, if enabled."""
+        if self._cone is None or dut is None:
+            return dut
+
+        netlist_path = sim_dir / 'cone' / f'{sim_id}{dut.netlist_path.suffix}'
+        num_removed = self._cone.write_pruned(netlist_path, out_pins)
+        self.log(f'{sim_id}: pruned {num_removed} instances outside of the logic cone.')
+        return replace(dut, netlist_path=netlist_path)
+
+    def _track_group_sim(self, sim_id: str, sim_fun: Callable[..., Awaitable[Any]], full: bool
+                         ) -> Awaitable[Any]:
+        """Runs a delay arc group or batch simulation as a scheduled measurement."""
+        meas_id = f'{sim_id}_full' if full else sim_id
+        return self._track(meas_id, 'delay', partial(sim_fun, full=full))()
+
+    def _track(self, meas_id: str, kind: str, meas_fun: Callable[[], Awaitable[Any]],
+               schedule: bool = True) -> Callable[[], Awaitable[Any]]:
+        """Returns the given measurement function, scheduled and recording telemetry if enabled.
+
+        Telemetry start time is when the scheduler starts the measurement, so its queue time
+        includes waiting for a scheduler slot.  Measurements that only wait on a shared
+        simulation should not be scheduled, so that they do not hold a slot while waiting.
+        """
+        if self._telemetry is not None:
+            meas_fun = self._telemetry.track(meas_id, kind, meas_fun)
+        if schedule and self._scheduler is not None:
+            if self._scheduler is self._shared_scheduler:
+                priorities = self.specs.get('scheduler', {}).get('priorities', None)
+                meas_fun = self._scheduler.schedule(meas_id, kind, meas_fun,
+                                                    job_name=self._job_name,
+                                                    priorities=priorities)
+            else:
+                meas_fun = self._scheduler.schedule(meas_id, kind, meas_fun)
+        return meas_fun
+
+    def _write_telemetry(self, sim_dir: Path) -> None:
+        records = self._telemetry.records
+        self._telemetry.write_jsonl(sim_dir / 'telemetry.jsonl')
+        self._telemetry.write_chrome_trace(sim_dir / 'telemetry_trace.json')
+        if records:
+            longest = max(records, key=lambda x: x['t_end'] - x['t_start'])
+            self.log(f'Telemetry: {len(records)} measurements, '
+                     f'{sum((r["num_sims"] for r in records))} simulations, longest is '
+                     f'{longest["id"]} ({longest["t_end"] - longest["t_start"]:.4g} s).')
+
+    async def _simulate_cap_mm(self, name: str, sim_id: str, sim_dir: Path,
+                               sim_db: SimulationDB, dut: Optional[DesignInstance],
+                               mm_cls: Type[MeasurementManager], mm_specs: Mapping[str, Any],
+                               bound_keys: Mapping[str, str], scale: float = 1.0
+                               ) -> Mapping[str, Any]:
+        """Simulates a capacitance search, warm started from previous results if enabled.
+
+        bound_keys maps result names to warm start cache keys.  Cached values are divided by
+        scale.  If the result hits a tightened search bound, the search is repeated with the
+        original bounds.
+        """
+        cap_bounds = self._cap_bounds
+        if cap_bounds is not None:
+            search_params: Mapping[str, Any] = mm_specs['search_params']
+            guess_list = [cap_bounds.get_guess(key, scale) for key in bound_keys.values()]
+            if all((guess is not None for guess in guess_list)):
+                guess = (min((val[0] for val in guess_list)),
+                         max((val[1] for val in guess_list)))
+                warm_params = get_warm_search_params(search_params, guess,
+                                                     self._cap_bound_scale)
+                mm = self._make_cap_mm(sim_db, mm_cls, dict(mm_specs, search_params=warm_params))
+                MeasTelemetry.count_sim()
+                mm_data = (await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
+                                                              dut, mm)).data
+                if not any((hit_warm_bound(search_params, warm_params, mm_data[key])
+                            for key in bound_keys)):
+                    for key, cache_key in bound_keys.items():
+                        cap_bounds.update(cache_key, mm_data[key] / scale)
+                    return mm_data
+                self.log(f'{sim_id} hit warm start search bound, searching with original '
+                         f'bounds.', level=LogLevel.WARN)
+                sim_id = f'{sim_id}_full'
+
+        mm = self._make_cap_mm(sim_db, mm_cls, mm_specs)
+        MeasTelemetry.count_sim()
+        mm_data = (await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id, dut,
+                                                      mm)).data
+        if cap_bounds is not None:
+            for key, cache_key in bound_keys.items():
+                cap_bounds.update(cache_key, mm_data[key] / scale)
+        return mm_data
+
+    def _make_cap_mm(self, sim_db: SimulationDB, mm_cls: Type[MeasurementManager],
+                     mm_specs: Mapping[str, Any]) -> MeasurementManager:
+        mm = sim_db.make_mm(mm_cls, mm_specs)
+        if isinstance(mm, CapDelayMatch):
+            # NOTE: input pins of this job share reference curve simulations
+            mm.set_ref_curve_tasks(self._ref_curve_tasks)
+        return mm
+
+    async def _replicate_bit(self, bit_name: str, rep_tasks: Sequence[Awaitable[Dict[str, Any]]],
+                             keys: Optional[Sequence[str]], tol: float,
+                             meas_fun: Callable[[], Awaitable[Dict[str, Any]]],
+                             copy_fun: Callable[..., None], *args: Any) -> None:
+        """Copy results of representative bus bits, or measure if they do not match.
+
+        rep_tasks are sorted so that the nearest representative bit comes first.  If the
+        results of all representative bits match within the given relative tolerance, results
+        of the nearest one are passed to copy_fun.  Otherwise, the given measurement coroutine
+        is run.
+        """
+        rep_results = [await task for task in rep_tasks]
+        if keys is None:
+            # timing arc, compare all LUTs
+            data_list = [result['data'] for result in rep_results]
+            data_list = [data.load() if isinstance(data, ArcDataRef) else data
+                         for data in data_list]
+        else:
+            data_list = [{k: result[k] for k in keys} for result in rep_results]
+
+        ref_data = data_list[0]
+        for data in data_list[1:]:
+            for key, val in ref_data.items():
+                if not np.allclose(data[key], val, rtol=tol, atol=0):
+                    self.log(f'Bus bits are not symmetric for {bit_name} ({key}), '
+                             f'characterizing it individually.', level=LogLevel.WARN)
+                    await meas_fun()
+                    return
+
+        copy_fun(rep_results[0], *args)
 
     @staticmethod
-    async def _measure_flop(name: str, sim_dir: Path, sim_db: SimulationDB,
+    def _copy_cap_dict(rep_result: Mapping[str, Any], output_table: Dict[str, Any]) -> None:
+        output_table['cap_dict'] = dict(rep_result)
+
+    @staticmethod
+    def _copy_timing(rep_result: Mapping[str, Any], timing: Dict[str, Any],
+                     output_list: List[Dict[str, Any]]) -> None:
+        timing['data'] = rep_result['data']
+        output_list.append(timing)
+
+    def _load_arc(self, arc_id: str, arc_specs: Mapping[str, Any]
+                  ) -> Tuple[str, Optional[Dict[str, np.ndarray]]]:
+        """Returns the arc cache key and the results of the given arc, if any.
+
+        Results are looked up in the arc cache first, then in the journal of a resumed run.
+        """
+        cache_key = ''
+        if self._arc_cache is not None:
+            # NOTE: measurement specs include corner, supplies, pin values and LUT axes.
+            key_specs = dict(sim_env_name=self.specs['sim_env_name'], specs=arc_specs)
+            if self._cone is not None:
+                # NOTE: pruned netlists give slightly different results
+                key_specs['cone_prune'] = True
+            cache_key = self._arc_cache.get_key(key_specs)
+            data = self._arc_cache.load(arc_id, cache_key)
+            if data is not None:
+                return cache_key, data
+
+        data = self._get_journal(arc_id)
+        if data is not None and self._arc_cache is not None:
+            self._arc_cache.save(arc_id, cache_key, data)
+        return cache_key, data
+
+    def _save_arc(self, arc_id: str, cache_key: str, data: Mapping[str, Any]) -> None:
+        self._add_journal(arc_id, data)
+        if self._arc_cache is not None:
+            self._arc_cache.save(arc_id, cache_key, data)
+
+    def _get_journal(self, meas_id: str) -> Optional[Any]:
+        """Returns results of the given measurement completed by a previous run, if any."""
+        return None if self._journal is None else self._journal.get(meas_id)
+
+    def _add_journal(self, meas_id: str, result: Any) -> None:
+        if self._journal is not None:
+            self._journal.add(meas_id, result)
+
+    def _stream_data(self, arc_id: str, data: Mapping[str, Any]
+                     ) -> Union[Mapping[str, Any], ArcDataRef]:
+        """In streaming mode, write LUT data to disk and return a reference to it."""
+        if self._arc_store is None:
+            return data
+        return self._arc_store.save(arc_id, data)
+
+    def _stream_timing_list(self, sim_id: str, pin: str, timing_list: List[Dict[str, Any]]
+                            ) -> List[Dict[str, Any]]:
+        if self._arc_store is None:
+            return timing_list
+
+        pin_str = cdba_to_unusal(pin)
+        ans = []
+        for idx, timing in enumerate(timing_list):
+            if 'data' in timing:
+                timing = dict(timing)
+                timing['data'] = self._stream_data(f'{sim_id}_{pin_str}_{idx}', timing['data'])
+            ans.append(timing)
+        return ans
+
+    async def _measure_flop(self, name: str, sim_dir: Path, sim_db: SimulationDB,
                             dut: Optional[DesignInstance], seq_name: str, mm: MeasurementManager,
                             ans: Dict[str, Any]) -> None:
         sim_id = f'seq_timing_{seq_name}'
-        result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id, dut, mm)
-        for pin, timing_data in result.data.items():
-            cur_info = ans[pin]
-            timing_list = cur_info.get('timing', None)
-            if timing_list is None:
-                cur_info['timing'] = timing_data
-            else:
-                timing_list.extend(timing_data)
+        timing_table = self._get_journal(sim_id)
+        if timing_table is None:
+            MeasTelemetry.count_sim()
+            result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
+                                                        dut, mm)
+            timing_table = {pin: self._stream_timing_list(sim_id, pin, timing_data)
+                            for pin, timing_data in result.data.items()}
+            self._add_journal(sim_id, timing_table)
+        _add_timing_table(ans, timing_table)
 
     async def _measure_custom(self, name: str, sim_dir: Path, sim_db: SimulationDB,
                               dut: Optional[DesignInstance], meas_name: str, meas_cls: str,
                               meas_specs: Mapping[str, Any], ans: Dict[str, Any]) -> None:
         sim_env_name: str = self.specs['sim_env_name']
-        mm_specs = dict(tbm_specs=self._tran_specs, fake=self.fake, sim_env_name=sim_env_name,
-                        **meas_specs)
-        mm = sim_db.make_mm(meas_cls, mm_specs)
+        mm_specs = dict(tbm_specs=self._tran_specs, fake=not self.simulate,
+                        sim_env_name=sim_env_name, **meas_specs)
         sim_id = f'custom_{meas_name}'
-        mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
-                                                       dut, mm)
-        for pin, timing_data in mm_result.data.items():
-            cur_info = ans[pin]
-            timing_list = cur_info.get('timing', None)
-            if timing_list is None:
-                cur_info['timing'] = timing_data
-            else:
-                timing_list.extend(timing_data)
+        timing_table = self._get_journal(sim_id)
+        if timing_table is None:
+            mm = sim_db.make_mm(meas_cls, mm_specs)
+            MeasTelemetry.count_sim()
+            mm_result = await sim_db.async_simulate_mm_obj(f'{name}_{sim_id}', sim_dir / sim_id,
+                                                           dut, mm)
+            timing_table = {pin: self._stream_timing_list(sim_id, pin, timing_data)
+                            for pin, timing_data in mm_result.data.items()}
+            self._add_journal(sim_id, timing_table)
+        _add_timing_table(ans, timing_table)
 
     def initialize(self, sim_db: SimulationDB, dut: DesignInstance) -> Tuple[bool, MeasInfo]:
         raise RuntimeError('Unused')
@@ -404,3 +1240,112 @@ class LibertyCharMM(MeasurementManager):
     def process_output(self, cur_info: MeasInfo, sim_results: Union[SimResults, MeasureResult]
                        ) -> Tuple[bool, MeasInfo]:
         raise RuntimeError('Unused')
+
+
+def _add_timing_table(ans: Dict[str, Any], timing_table: Mapping[str, List[Dict[str, Any]]]
+                      ) -> None:
+    for pin, timing_data in timing_table.items():
+        cur_info = ans[pin]
+        timing_list = cur_info.get('timing', None)
+        if timing_list is None:
+            cur_info['timing'] = timing_data
+        else:
+            timing_list.extend(timing_data)
+
+
+def _get_lut_max_cap(data: Mapping[str, np.ndarray],
+                     swp_info: Union[Sequence[Tuple[str, Mapping[str, Any]]],
+                                     Mapping[str, Mapping[str, Any]]],
+                     max_trf: float) -> Optional[float]:
+    """Returns the largest load capacitance with transition time at most max_trf.
+
+    Transition times are linearly interpolated in c_load, and the smallest capacitance over
+    all input transition times and both output edges is returned.  Returns None if max_trf is
+    outside the transition range of any LUT row, or if a row is not increasing in c_load.
+    """
+    if isinstance(swp_info, Mapping):
+        swp_info = list(swp_info.items())
+    names = [var_name for var_name, _ in swp_info]
+    c_axis = names.index('c_load')
+    c_load = np.asarray(swp_info[c_axis][1]['values'], dtype=float)
+    c_order = np.argsort(c_load)
+    c_load = c_load[c_order]
+
+    ans = None
+    for key in ['rise_transition', 'fall_transition']:
+        lut = data.get(key, None)
+        if lut is None:
+            continue
+        lut = np.moveaxis(np.asarray(lut, dtype=float), c_axis, -1)
+        for trf in lut.reshape(-1, c_load.size)[:, c_order]:
+            if not (trf[0] <= max_trf <= trf[-1]) or np.any(np.diff(trf) <= 0):
+                return None
+            cur_cap = float(np.interp(max_trf, trf, c_load))
+            ans = cur_cap if ans is None else min(ans, cur_cap)
+    return ans
+
+
+def _get_bus_bit_index(bit_name: str) -> Optional[int]:
+    bus_range = parse_cdba_name(bit_name)[1]
+    return None if bus_range is None else next(iter(bus_range))
+
+
+def _get_bus_rep_table(bit_names: Iterable[str], num_rep: int) -> Dict[str, List[str]]:
+    """Returns the representative bits of all non-representative bus bits.
+
+    Representative bits are spread evenly across each bus, always including the first and last
+    bits.  The representative bits of each bus bit are sorted from nearest to farthest.
+    """
+    bus_table: Dict[str, List[Tuple[int, str]]] = {}
+    for bit_name in bit_names:
+        basename, bus_range = parse_cdba_name(bit_name)
+        if bus_range is not None:
+            bus_table.setdefault(basename, []).append((next(iter(bus_range)), bit_name))
+
+    ans = {}
+    for bit_list in bus_table.values():
+        num_bits = len(bit_list)
+        if num_bits <= num_rep:
+            continue
+        rep_pos = set((int(round(val)) for val in np.linspace(0, num_bits - 1, num_rep)))
+        rep_list = [bit_list[pos] for pos in sorted(rep_pos)]
+        for pos, (bus_idx, bit_name) in enumerate(bit_list):
+            if pos not in rep_pos:
+                ans[bit_name] = [rep_name for _, rep_name in
+                                 sorted(rep_list, key=lambda x: abs(x[0] - bus_idx))]
+    return ans
+
+
+def _get_out_rep_table(bit_names: Iterable[str], info_table: Mapping[str, Mapping[str, Any]],
+                       num_rep: int) -> Dict[str, List[str]]:
+    """Returns representative bits of output bus bits.
+
+    A representative bit is only used if its cap/timing specification is the same as that
+    of the bus bit, after references to each bit's own bus index are replaced.
+    """
+    ans = {}
+    for bit_name, rep_bits in _get_bus_rep_table(bit_names, num_rep).items():
+        info = info_table.get(bit_name, None)
+        if info is None:
+            continue
+        template = repr(_get_bus_bit_template(info, _get_bus_bit_index(bit_name)))
+        rep_list = [rep_name for rep_name in rep_bits
+                    if rep_name in info_table and
+                    repr(_get_bus_bit_template(info_table[rep_name],
+                                               _get_bus_bit_index(rep_name))) == template]
+        if rep_list:
+            ans[bit_name] = rep_list
+    return ans
+
+
+def _get_bus_bit_template(obj: Any, bus_idx: int) -> Any:
+    """Replace all references to bits with the given bus index by a placeholder."""
+    if isinstance(obj, str):
+        suffix = f'<{bus_idx}>'
+        return obj[:-len(suffix)] + '<*>' if obj.endswith(suffix) else obj
+    if isinstance(obj, Mapping):
+        return {_get_bus_bit_template(k, bus_idx): _get_bus_bit_template(v, bus_idx)
+                for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_get_bus_bit_template(v, bus_idx) for v in obj]
+    return obj
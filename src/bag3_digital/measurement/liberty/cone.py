@@ -0,0 +1,282 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Iterable, Optional, Dict, List, Set, Tuple, FrozenSet
+
+from pathlib import Path
+from fnmatch import fnmatchcase
+
+# pin directions
+_IN = frozenset(['i'])
+_INOUT = frozenset(['i', 'o'])
+
+# default glob patterns of spectre transistor model names, matched in lower case
+default_mos_models = ['*nch*', '*pch*', '*nmos*', '*pmos*', '*nfet*', '*pfet*']
+
+
+class _Inst:
+    __slots__ = ['name', 'nets', 'cell', 'lines', 'is_mos']
+
+    def __init__(self, name: str, nets: List[str], cell: str, lines: List[int],
+                 is_mos: bool = False) -> None:
+        self.name = name
+        self.nets = nets
+        self.cell = cell
+        self.lines = lines
+        self.is_mos = is_mos
+
+
+class _Subckt:
+    __slots__ = ['name', 'ports', 'insts']
+
+    def __init__(self, name: str, ports: List[str]) -> None:
+        self.name = name
+        self.ports = ports
+        self.insts: List[_Inst] = []
+
+
+class NetlistCone:
+    """Prunes a DUT netlist to the logic cone of some outputs.
+
+    The netlist, in spectre or CDL format, is parsed into subcircuits.  Pin directions of every
+    subcircuit are derived bottom-up from the hierarchy: transistor gates are inputs, transistor
+    channels are bidirectional, and a subcircuit pin has the union of the directions of
+    everything it connects to.  Transistors are M elements in CDL, and instances of models
+    matching mos_models in spectre.  Other primitives are bidirectional.
+
+    The cone of some outputs is every instance of the top cell in their fan-in, found by
+    walking backwards from the outputs, with supply nets ignored.  Instances with an input on
+    a net of the cone are also kept as loads at the cone boundary, so every kept net sees its
+    original loading.  The fan-in of the other inputs of those loads is kept as well, so that
+    no kept input is left floating.  All other instances are removed.
+
+    Parameters
+    ----------
+    netlist_path : Path
+        the DUT netlist.
+    top_cell : str
+        the DUT cell name.
+    sup_nets : Iterable[str]
+        supply nets of the top cell.
+    mos_models : Optional[Iterable[str]]
+        glob patterns of spectre transistor model names.  Defaults to default_mos_models.
+    """
+
+    def __init__(self, netlist_path: Path, top_cell: str, sup_nets: Iterable[str],
+                 mos_models: Optional[Iterable[str]] = None) -> None:
+        self._lines = netlist_path.read_text().splitlines(keepends=True)
+        self._subckts = _parse_netlist(self._lines)
+        self._top = self._subckts.get(top_cell, None)
+        if self._top is None:
+            raise ValueError(f'Cell {top_cell} is not defined in {netlist_path}')
+        self._sup_nets = frozenset(sup_nets)
+        self._mos_models = [pat.lower() for pat in (default_mos_models if mos_models is None
+                                                    else mos_models)]
+        self._dir_table: Dict[str, List[FrozenSet[str]]] = {}
+
+        # NOTE: index drivers and loads of every net once, so each walk is linear in size
+        self._inst_pins = [self._get_inst_pins(inst) for inst in self._top.insts]
+        self._drivers: Dict[str, List[int]] = {}
+        self._loads: Dict[str, List[int]] = {}
+        for idx, pins in enumerate(self._inst_pins):
+            for net, net_dir in pins:
+                if net in self._sup_nets:
+                    continue
+                if 'o' in net_dir:
+                    _append_once(self._drivers.setdefault(net, []), idx)
+                if 'i' in net_dir:
+                    _append_once(self._loads.setdefault(net, []), idx)
+
+    def get_cone(self, out_pins: Iterable[str]) -> Set[str]:
+        """Returns names of top cell instances to keep for the given outputs.
+
+        Raises ValueError if an output is not driven by any instance, which usually means the
+        output name does not match the netlist.
+        """
+        out_pins = [net for net in out_pins if net not in self._sup_nets]
+        for net in out_pins:
+            if not self._drivers.get(net, None):
+                raise ValueError(f'Output {net} has no driver in the netlist of '
+                                 f'{self._top.name}, cannot prune to its logic cone.')
+
+        keep: Set[int] = set()
+        self._add_fan_in(out_pins, keep)
+
+        # add loads at the cone boundary
+        cone_nets = set((n for idx in keep for n, _ in self._inst_pins[idx]))
+        cone_nets.update(out_pins)
+        cone_nets.difference_update(self._sup_nets)
+        boundary = set((idx for net in cone_nets for idx in self._loads.get(net, [])
+                        if idx not in keep))
+        keep.update(boundary)
+        # NOTE: keep the fan-in of other inputs of boundary loads, so they are not floating
+        self._add_fan_in([n for idx in boundary for n, d in self._inst_pins[idx]
+                          if 'i' in d and n not in cone_nets and n not in self._sup_nets],
+                         keep)
+        return {self._top.insts[idx].name for idx in keep}
+
+    def write_pruned(self, path: Path, out_pins: Iterable[str]) -> int:
+        """Writes the netlist pruned to the cone of the given outputs.
+
+        Returns the number of removed instances.
+        """
+        keep = self.get_cone(out_pins)
+        skip_lines = set()
+        num_removed = 0
+        for inst in self._top.insts:
+            if inst.name not in keep:
+                skip_lines.update(inst.lines)
+                num_removed += 1
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w') as f:
+            for idx, line in enumerate(self._lines):
+                if idx not in skip_lines:
+                    f.write(line)
+        return num_removed
+
+    def _add_fan_in(self, nets: Iterable[str], keep: Set[int]) -> None:
+        """Adds instances in the fan-in of the given nets to keep, never walking through supplies.
+        """
+        net_queue = list(nets)
+        visited = set(net_queue)
+        visited.update(self._sup_nets)
+        while net_queue:
+            net = net_queue.pop()
+            for idx in self._drivers.get(net, []):
+                if idx in keep:
+                    continue
+                keep.add(idx)
+                for n, d in self._inst_pins[idx]:
+                    if 'i' in d and n not in visited:
+                        visited.add(n)
+                        net_queue.append(n)
+
+    def _get_inst_pins(self, inst: _Inst) -> List[Tuple[str, FrozenSet[str]]]:
+        return list(zip(inst.nets, self._get_dirs(inst)))
+
+    def _get_dirs(self, inst: _Inst) -> List[FrozenSet[str]]:
+        subckt = self._subckts.get(inst.cell, None)
+        if subckt is not None:
+            return self._get_port_dirs(subckt)
+        if inst.is_mos or any((fnmatchcase(inst.cell.lower(), pat)
+                               for pat in self._mos_models)):
+            if len(inst.nets) != 4:
+                raise ValueError(f'Transistor {inst.name} does not have 4 terminals.')
+            # NOTE: drain/gate/source/bulk
+            return [_INOUT, _IN, _INOUT, _IN]
+        return [_INOUT] * len(inst.nets)
+
+    def _get_port_dirs(self, subckt: _Subckt) -> List[FrozenSet[str]]:
+        ans = self._dir_table.get(subckt.name, None)
+        if ans is not None:
+            return ans
+
+        # NOTE: mark as bidirectional first, in case of recursive definitions
+        self._dir_table[subckt.name] = [_INOUT] * len(subckt.ports)
+        net_dirs: Dict[str, Set[str]] = {}
+        for inst in subckt.insts:
+            for net, cur_dir in zip(inst.nets, self._get_dirs(inst)):
+                net_dirs.setdefault(net, set()).update(cur_dir)
+        # NOTE: unconnected ports are inputs
+        ans = [frozenset(net_dirs.get(port, _IN)) for port in subckt.ports]
+        self._dir_table[subckt.name] = ans
+        return ans
+
+
+def _append_once(idx_list: List[int], idx: int) -> None:
+    if not idx_list or idx_list[-1] != idx:
+        idx_list.append(idx)
+
+
+def _parse_netlist(lines: List[str]) -> Dict[str, _Subckt]:
+    """Parses subcircuits of a spectre or CDL netlist."""
+    ans = {}
+    cur: Optional[_Subckt] = None
+    for tokens, line_list in _iter_statements(lines):
+        key = tokens[0].lower()
+        if key in ('subckt', '.subckt', 'inline'):
+            if key == 'inline':
+                tokens = tokens[1:]
+            cur = _Subckt(tokens[1], [t for t in tokens[2:] if '=' not in t and t not in '()'])
+            ans[cur.name] = cur
+        elif key in ('ends', '.ends'):
+            cur = None
+        elif cur is not None and not key.startswith('.') and key not in ('parameters',
+                                                                          'simulator'):
+            inst = _parse_inst(tokens, line_list)
+            if inst is not None:
+                cur.insts.append(inst)
+    return ans
+
+
+def _parse_inst(tokens: List[str], line_list: List[int]) -> Optional[_Inst]:
+    name = tokens[0]
+    if '(' in tokens:
+        # spectre: name ( nets ) cell params
+        start = tokens.index('(')
+        stop = tokens.index(')', start)
+        nets = tokens[start + 1:stop]
+        rest = tokens[stop + 1:]
+    else:
+        # CDL: name nets [/] cell params
+        body = [t for t in tokens[1:] if '=' not in t]
+        if '/' in body:
+            sep = body.index('/')
+            nets = body[:sep]
+            rest = body[sep + 1:]
+        elif len(body) >= 2:
+            nets = body[:-1]
+            rest = body[-1:]
+        else:
+            return None
+        if name[0] in 'Mm':
+            # NOTE: CDL transistors, drain/gate/source/bulk, then model
+            return None if len(body) < 5 else _Inst(name, body[:4], body[4], line_list,
+                                                    is_mos=True)
+    if not rest:
+        return None
+    return _Inst(name, nets, rest[0], line_list)
+
+
+def _iter_statements(lines: List[str]) -> Iterable[Tuple[List[str], List[int]]]:
+    """Yields tokens and line indices of every statement, joining continuation lines."""
+    text = ''
+    line_list: List[int] = []
+    for idx, line in enumerate(lines):
+        stripped = line.strip()
+        if line_list and stripped.startswith('+'):
+            # CDL continuation
+            text += ' ' + stripped[1:]
+        elif line_list and text.endswith('\\'):
+            # spectre continuation
+            text = text[:-1] + ' ' + stripped
+        else:
+            if line_list:
+                yield from _tokenize(text, line_list)
+            text = stripped
+            line_list = []
+        line_list.append(idx)
+    if line_list:
+        yield from _tokenize(text, line_list)
+
+
+def _tokenize(text: str, line_list: List[int]) -> Iterable[Tuple[List[str], List[int]]]:
+    if not text or text[0] in '*/':
+        return
+    text = text.split('//', 1)[0]
+    tokens = text.replace('(', ' ( ').replace(')', ' ) ').split()
+    if tokens:
+        yield tokens, line_list
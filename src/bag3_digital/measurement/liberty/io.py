@@ -13,9 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Dict, Any, List, Tuple, Optional, Iterable, Mapping, Sequence
+from typing import Dict, Any, List, Tuple, Optional, Iterable, Mapping, Sequence, Union
 
 import asyncio
+from copy import deepcopy
 from pathlib import Path
 from itertools import chain
 
@@ -23,12 +24,17 @@ from pybag.enum import LogLevel
 
 from bag.io.file import read_yaml
 from bag.simulation.base import get_corner_temp
+from bag.simulation.cache import SimulationDB, DesignInstance
 from bag.core import BagProject
+from bag.concurrent.util import GatherHelper
 
 from bag3_liberty.enum import LogicType, TermType, LUTType
 from bag3_liberty.data import Library, Cell, parse_cdba_name, get_bus_bit_name
 
+from ..estimate import get_seg_sizes
 from .char import LibertyCharMM
+from .sched import MeasScheduler
+from .store import CharResultStore, load_timing
 
 
 def generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
@@ -36,12 +42,40 @@ def generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
                      fake: bool = False, extract: bool = False,
                      force_sim: bool = False, force_extract: bool = False,
                      gen_all_env: bool = False, gen_sch: bool = False, export_lay: bool = False,
-                     log_level: LogLevel = LogLevel.DEBUG) -> None:
+                     log_level: LogLevel = LogLevel.DEBUG, max_env_jobs: int = 0,
+                     incremental: bool = False, stream: bool = False,
+                     estimate: bool = False, resume: bool = False,
+                     telemetry: bool = False) -> None:
     asyncio.run(async_generate_liberty(prj, lib_config, sim_config, specs, fake=fake,
+                                       estimate=estimate, resume=resume, telemetry=telemetry,
                                        extract=extract, force_sim=force_sim,
                                        force_extract=force_extract, gen_sch=gen_sch,
                                        gen_all_env=gen_all_env, export_lay=export_lay,
-                                       log_level=log_level))
+                                       log_level=log_level, max_env_jobs=max_env_jobs,
+                                       incremental=incremental, stream=stream))
+
+
+def generate_liberty_library(prj: BagProject, lib_config: Mapping[str, Any],
+                             sim_config: Mapping[str, Any],
+                             cell_specs_list: Sequence[Mapping[str, Any]], lib_name: str = '',
+                             root_dir: Optional[Path] = None, impl_lib: str = '',
+                             fake: bool = False, extract: bool = False,
+                             force_sim: bool = False, force_extract: bool = False,
+                             gen_all_env: bool = False, gen_sch: bool = False,
+                             export_lay: bool = False, log_level: LogLevel = LogLevel.DEBUG,
+                             max_jobs: int = 0, incremental: bool = False,
+                             stream: bool = False, estimate: bool = False,
+                             resume: bool = False, telemetry: bool = False) -> None:
+    asyncio.run(async_generate_liberty_library(prj, lib_config, sim_config, cell_specs_list,
+                                               lib_name=lib_name, root_dir=root_dir,
+                                               impl_lib=impl_lib, fake=fake, estimate=estimate,
+                                               resume=resume, telemetry=telemetry,
+                                               extract=extract,
+                                               force_sim=force_sim, force_extract=force_extract,
+                                               gen_sch=gen_sch, gen_all_env=gen_all_env,
+                                               export_lay=export_lay, log_level=log_level,
+                                               max_jobs=max_jobs, incremental=incremental,
+                                               stream=stream))
 
 
 async def async_generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
@@ -49,8 +83,10 @@ async def async_generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
                                  fake: bool = False, extract: bool = False,
                                  force_sim: bool = False, force_extract: bool = False,
                                  gen_all_env: bool = False, gen_sch: bool = False,
-                                 export_lay: bool = False, log_level: LogLevel = LogLevel.DEBUG
-                                 ) -> None:
+                                 export_lay: bool = False, log_level: LogLevel = LogLevel.DEBUG,
+                                 max_env_jobs: int = 0, incremental: bool = False,
+                                 stream: bool = False, estimate: bool = False,
+                                 resume: bool = False, telemetry: bool = False) -> None:
     """Generate liberty file for the given cells.
 
     Parameters
@@ -79,24 +115,128 @@ async def async_generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
         Use CAD tool to export layout.
     log_level : LogLevel
         stdout logging level.
+    max_env_jobs : int
+        maximum number of corners to characterize concurrently.  0 for no limit.  Each corner
+        writes its liberty file as soon as it finishes, and a failed corner does not stop the
+        others; an error listing all failed corners is raised at the end.
+    incremental : bool
+        True to reuse results of arcs whose netlist, specification, corner and LUT axes are
+        unchanged since the last run.
+    stream : bool
+        True to write LUT data of timing arcs to disk as soon as they are characterized, and
+        only load them back when writing liberty files.  This bounds memory usage of large runs.
+    estimate : bool
+        True to generate a preview liberty file without simulation or extraction.  Pin
+        capacitances and timing LUTs are estimated from device sizes in the generator
+        parameters and the technology RC table estimate_rc_table in sim_config.  Sequential
+        and custom measurements are faked.
+    resume : bool
+        True to resume an interrupted run.  Every cell/corner job journals each measurement as
+        soon as it completes, and a resumed job only runs measurements missing from the journal.
+        The journal is discarded if the netlist or the measurement specification changed.
+    telemetry : bool
+        True to record start, end and queue time and number of simulation requests of every
+        measurement.  Each cell/corner job writes telemetry.jsonl and a Chrome trace timeline,
+        telemetry_trace.json, to its working directory.
     """
-    gen_specs_file: str = cell_specs['gen_specs_file']
-    scenario: str = cell_specs.get('scenario', '')
+    await async_generate_liberty_library(prj, lib_config, sim_config, [cell_specs], fake=fake,
+                                         estimate=estimate, resume=resume, telemetry=telemetry,
+                                         extract=extract, force_sim=force_sim,
+                                         force_extract=force_extract, gen_all_env=gen_all_env,
+                                         gen_sch=gen_sch, export_lay=export_lay,
+                                         log_level=log_level, max_jobs=max_env_jobs,
+                                         incremental=incremental, stream=stream)
+
+
+async def async_generate_liberty_library(prj: BagProject, lib_config: Mapping[str, Any],
+                                         sim_config: Mapping[str, Any],
+                                         cell_specs_list: Sequence[Mapping[str, Any]],
+                                         lib_name: str = '', root_dir: Optional[Path] = None,
+                                         impl_lib: str = '', fake: bool = False,
+                                         extract: bool = False, force_sim: bool = False,
+                                         force_extract: bool = False, gen_all_env: bool = False,
+                                         gen_sch: bool = False, export_lay: bool = False,
+                                         log_level: LogLevel = LogLevel.DEBUG, max_jobs: int = 0,
+                                         incremental: bool = False, stream: bool = False,
+                                         estimate: bool = False, resume: bool = False,
+                                         telemetry: bool = False) -> None:
+    """Generate liberty files for many cells, sharing a single simulation database.
+
+    All cell/corner characterization jobs are scheduled through one bounded pool.  Each job
+    writes the liberty file of its cell as soon as it finishes, and a failed job does not stop
+    the others; an error listing all failed jobs is raised at the end.
 
-    gen_specs: Mapping[str, Any] = read_yaml(gen_specs_file)
-    impl_lib: str = gen_specs['impl_lib']
-    impl_cell: str = gen_specs['impl_cell']
-    lay_cls: str = gen_specs.get('lay_class', '')
-    dut_params: Optional[Mapping[str, Any]] = gen_specs.get('params', None)
-    name_prefix: str = gen_specs.get('name_prefix', '')
-    name_suffix: str = gen_specs.get('name_suffix', '')
-    gen_root_dir: Path = Path(gen_specs['root_dir'])
-    lib_root_dir = gen_root_dir / 'lib_gen'
+    Parameters
+    ----------
+    prj: BagProject
+        BagProject object to be able to generate things
+    lib_config : Mapping[str, Any]
+        library configuration dictionary.
+    sim_config : Mapping[str, Any]
+        simulation configuration dictionary.
+    cell_specs_list : Sequence[Mapping[str, Any]]
+        list of cell specification dictionaries.
+    lib_name : str
+        If not empty, also write a merged liberty file containing all cells for each corner.
+    root_dir : Optional[Path]
+        root directory of the shared simulation database and the merged liberty files.  Defaults
+        to the root directory of the first cell.
+    impl_lib : str
+        implementation library of the shared simulation database.  Defaults to the
+        implementation library of the first cell.
+    fake : bool
+        True to generate fake liberty file.
+    extract : bool
+        True to run extraction.
+    force_sim : bool
+        True to force simulation runs.
+    force_extract : bool
+        True to force extraction runs.
+    gen_all_env : bool
+        True to generate liberty files for all environments.
+    gen_sch : bool
+        True to generate schematics.
+    export_lay : bool
+        Use CAD tool to export layout.
+    log_level : LogLevel
+        stdout logging level.
+    max_jobs : int
+        maximum number of cell/corner jobs to run concurrently.  0 for no limit.
+    incremental : bool
+        True to reuse results of arcs whose netlist, specification, corner and LUT axes are
+        unchanged since the last run.
+    stream : bool
+        True to write LUT data of timing arcs to disk as soon as they are characterized, and
+        only load them back when writing liberty files.  This bounds memory usage of large runs.
+    estimate : bool
+        True to generate a preview liberty file without simulation or extraction.  Pin
+        capacitances and timing LUTs are estimated from device sizes in the generator
+        parameters and the technology RC table estimate_rc_table in sim_config.  Sequential
+        and custom measurements are faked.
+    resume : bool
+        True to resume an interrupted run.  Every cell/corner job journals each measurement as
+        soon as it completes, and a resumed job only runs measurements missing from the journal.
+        The journal is discarded if the netlist or the measurement specification changed.
+    telemetry : bool
+        True to record start, end and queue time and number of simulation requests of every
+        measurement.  Each cell/corner job writes telemetry.jsonl and a Chrome trace timeline,
+        telemetry_trace.json, to its working directory.
+    """
+    if not cell_specs_list:
+        raise ValueError('No cell specifications given.')
+
+    gen_specs_list: List[Mapping[str, Any]] = [read_yaml(cell_specs['gen_specs_file'])
+                                               for cell_specs in cell_specs_list]
+    if root_dir is None:
+        root_dir = Path(gen_specs_list[0]['root_dir'])
+    if not impl_lib:
+        impl_lib = gen_specs_list[0]['impl_lib']
+    lib_root_dir = root_dir / 'lib_gen'
 
     sim_precision: int = sim_config['precision']
 
     dsn_options = dict(
-        extract=extract,
+        extract=extract and not estimate,
         force_extract=force_extract,
         gen_sch=gen_sch,
         log_level=log_level,
@@ -104,12 +244,104 @@ async def async_generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
     log_file = str(lib_root_dir / 'lib_gen.log')
     sim_db = prj.make_sim_db(lib_root_dir / 'dsn', log_file, impl_lib, dsn_options=dsn_options,
                              force_sim=force_sim, precision=sim_precision, log_level=log_level)
-    if lay_cls and dut_params is not None:
-        dut = await sim_db.async_new_design(impl_cell, lay_cls, dut_params, export_lay=export_lay,
-                                            name_prefix=name_prefix, name_suffix=name_suffix)
+
+    # generate all DUTs
+    if estimate:
+        # NOTE: estimation only needs generator parameters
+        dut_list: List[Optional[DesignInstance]] = [None] * len(gen_specs_list)
+    else:
+        gatherer = GatherHelper()
+        for gen_specs in gen_specs_list:
+            gatherer.append(_new_dut(sim_db, gen_specs, export_lay))
+        dut_list = await gatherer.gather_err()
+
+    voltage_fmt, env_list = _get_env_list(lib_config, gen_all_env)
+
+    # characterize all cells at all corners concurrently, limiting number of jobs in flight
+    char_options = dict(fake=fake, incremental=incremental, stream=stream, estimate=estimate,
+                        resume=resume, telemetry=telemetry)
+    ref_curve: Union[bool, Mapping[str, Any]] = sim_config.get('in_cap_ref_curve', False)
+    if ref_curve:
+        # NOTE: reference curves do not depend on the DUT, so they are shared by all cells
+        char_options['in_cap_ref_curve'] = dict(
+            ref_curve if isinstance(ref_curve, Mapping) else {},
+            path=str(lib_root_dir / 'ref_curves'))
+    num_jobs = len(cell_specs_list) * len(env_list)
+    job_sem = asyncio.Semaphore(max_jobs if max_jobs > 0 else num_jobs)
+    # NOTE: one measurement scheduler for all jobs, so that its cap bounds the total number of
+    # measurements in flight
+    sched_specs: Mapping[str, Any] = sim_config.get('scheduler', {})
+    max_meas_jobs: int = sched_specs.get('max_jobs', 0)
+    if max_meas_jobs > 0 and not fake and not estimate:
+        scheduler: Optional[MeasScheduler] = MeasScheduler(
+            max_meas_jobs, lib_root_dir / 'meas_cost.yaml', costs=sched_specs.get('costs', None),
+            priorities=sched_specs.get('priorities', None))
     else:
-        dut = None
+        scheduler = None
+    job_list = []
+    coro_list = []
+    for cell_specs, gen_specs, dut in zip(cell_specs_list, gen_specs_list, dut_list):
+        impl_cell: str = gen_specs['impl_cell']
+        for env_info in env_list:
+            job_list.append((impl_cell, env_info[0]))
+            coro_list.append(_char_env(sim_db, dut, job_sem, sim_config, cell_specs, gen_specs,
+                                       env_info, voltage_fmt, char_options, bool(lib_name),
+                                       scheduler))
+    try:
+        results = await asyncio.gather(*coro_list, return_exceptions=True)
+    finally:
+        if scheduler is not None:
+            scheduler.save_history()
+
+    # report failed jobs only after all other jobs are done
+    err_list = []
+    failed_envs = set()
+    for (impl_cell, sim_env_name), val in zip(job_list, results):
+        if isinstance(val, Exception):
+            sim_db.log(f'Liberty characterization of {impl_cell} failed for corner '
+                       f'{sim_env_name}: {val!r}', level=LogLevel.ERROR)
+            err_list.append((f'{impl_cell}_{sim_env_name}', val))
+            failed_envs.add(sim_env_name)
+
+    if lib_name:
+        # write merged liberty files
+        for sim_env_name, cur_lib_config in env_list:
+            if sim_env_name in failed_envs:
+                sim_db.log(f'Skipping merged liberty file for corner {sim_env_name}',
+                           level=LogLevel.WARN)
+                continue
+
+            lib = Library(f'{lib_name}_{sim_env_name}', cur_lib_config)
+            for (_, cur_env_name), val in zip(job_list, results):
+                if cur_env_name == sim_env_name:
+                    _add_cell(lib, val[0], val[1])
+            out_file = root_dir / f'{lib_name}_{sim_env_name}.lib'
+            lib.generate(out_file)
+            sim_db.log(f'Finished writing {out_file}')
+
+    if err_list:
+        raise RuntimeError(f'Liberty characterization failed for: '
+                           f'{[name for name, _ in err_list]}') from err_list[0][1]
+
+
+async def _new_dut(sim_db: SimulationDB, gen_specs: Mapping[str, Any], export_lay: bool
+                   ) -> Optional[DesignInstance]:
+    impl_cell: str = gen_specs['impl_cell']
+    lay_cls: str = gen_specs.get('lay_class', '')
+    dut_params: Optional[Mapping[str, Any]] = gen_specs.get('params', None)
+    name_prefix: str = gen_specs.get('name_prefix', '')
+    name_suffix: str = gen_specs.get('name_suffix', '')
 
+    if lay_cls and dut_params is not None:
+        return await sim_db.async_new_design(impl_cell, lay_cls, dut_params,
+                                             export_lay=export_lay, name_prefix=name_prefix,
+                                             name_suffix=name_suffix)
+    return None
+
+
+def _get_env_list(lib_config: Mapping[str, Any], gen_all_env: bool
+                  ) -> Tuple[str, List[Tuple[str, Dict[str, Any]]]]:
+    """Returns the voltage format and the (name, liberty configuration) of every corner."""
     environments: Mapping[str, Any] = lib_config['environments']
     nom_voltage_type: str = environments['nom_voltage_type']
     name_format: str = environments['name_format']
@@ -119,14 +351,13 @@ async def async_generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
         sim_env_list = [sim_env_list[0]]
 
     voltage_fmt = '{:.%df}' % voltage_precision
-    lib_file_base_name = f'{impl_cell}_{scenario}' if scenario else impl_cell
+    env_list = []
     for sim_env_config in sim_env_list:
         sim_env: str = sim_env_config['sim_env']
         voltages: Mapping[str, float] = sim_env_config['voltages']
 
         vstr_table = {k: voltage_fmt.format(v).replace('.', 'p') for k, v in voltages.items()}
         sim_env_name = name_format.format(sim_env=sim_env, **vstr_table)
-        lib_file_name = f'{lib_file_base_name}_{sim_env_name}'
 
         cur_lib_config = dict(**lib_config)
         cur_lib_config.pop('environments')
@@ -143,25 +374,179 @@ async def async_generate_liberty(prj: BagProject, lib_config: Mapping[str, Any],
 
         cur_lib_config['voltages'] = voltages
         cur_lib_config['sim_envs'] = [env_config]
+        env_list.append((sim_env_name, cur_lib_config))
+
+    return voltage_fmt, env_list
+
+
+async def _char_env(sim_db: SimulationDB, dut: Optional[DesignInstance],
+                    job_sem: asyncio.Semaphore, sim_config: Mapping[str, Any],
+                    cell_specs: Mapping[str, Any], gen_specs: Mapping[str, Any],
+                    env_info: Tuple[str, Mapping[str, Any]], voltage_fmt: str,
+                    char_options: Mapping[str, Any], keep_data: bool,
+                    scheduler: Optional[MeasScheduler] = None
+                    ) -> Optional[Tuple[Mapping[str, Any], Mapping[str, Any]]]:
+    """Characterize the given cell at a single corner, and write the liberty file.
+
+    Returns the cell information and characterization results, used for merged libraries, or
+    None if keep_data is False, so that results of finished jobs are not held in memory.
+    """
+    impl_cell: str = gen_specs['impl_cell']
+    gen_root_dir = Path(gen_specs['root_dir'])
+    lib_root_dir = gen_root_dir / 'lib_gen'
+
+    sim_env_name, cur_lib_config = env_info
+    lib_file_name = _get_lib_file_name(cell_specs, gen_specs, sim_env_name)
+
+    async with job_sem:
         lib = Library(f'{impl_cell}_{sim_env_name}', cur_lib_config)
 
         out_file = gen_root_dir / f'{lib_file_name}.lib'
         lib_data, mm_specs, cur_work_dir = get_cell_info(lib, impl_cell, cell_specs,
                                                          lib_root_dir, voltage_fmt)
 
-        mm_specs['fake'] = fake
+        mm_specs.update(char_options)
+        if char_options['estimate']:
+            mm_specs['estimate'] = _get_estimate_specs(sim_config, cell_specs, gen_specs)
         mm_specs['sim_env_name'] = sim_env_name
         for key in ['tran_tbm_specs', 'buf_params', 'in_cap_search_params', 'out_cap_search_params',
                     'seq_search_params', 'seq_delay_thres']:
             mm_specs[key] = sim_config[key]
+        mm_specs['in_cap_concurrent'] = sim_config.get('in_cap_concurrent', False)
+        mm_specs['out_cap_sweep'] = sim_config.get('out_cap_sweep', None)
+        mm_specs['out_cap_from_lut'] = sim_config.get('out_cap_from_lut', False)
+        # NOTE: cell specific AC input cap settings override those in sim_config, so pins can be
+        # selected per cell
+        mm_specs['in_cap_ac'] = dict(sim_config.get('in_cap_ac', {}),
+                                     **cell_specs.get('in_cap_ac', {}))
+        # NOTE: cell specific scheduler settings override those in sim_config.  With the shared
+        # scheduler, only priorities can be set per cell.
+        mm_specs['scheduler'] = dict(sim_config.get('scheduler', {}),
+                                     **cell_specs.get('scheduler', {}))
+        warm_start: Union[bool, Mapping[str, Any]] = sim_config.get('cap_warm_start', False)
+        if warm_start:
+            # NOTE: the cache file is shared by all corners of this cell
+            mm_specs['cap_warm_start'] = dict(
+                warm_start if isinstance(warm_start, Mapping) else {},
+                path=str(lib_root_dir / 'cap_bounds' / f'{impl_cell}.yaml'))
+        reset_state: Union[bool, Mapping[str, Any]] = sim_config.get('reset_state', False)
+        if reset_state:
+            # NOTE: states are keyed by netlist and testbench, so all cells share one directory
+            mm_specs['reset_state'] = dict(
+                reset_state if isinstance(reset_state, Mapping) else {},
+                root_dir=str(lib_root_dir / 'reset_states'))
         mm = sim_db.make_mm(LibertyCharMM, mm_specs)
+        mm.set_shared_scheduler(scheduler, lib_file_name)
 
         sim_db.log(f'Characterizing {lib_file_name}.lib')
         char_results = await sim_db.async_simulate_mm_obj('lib_char', cur_work_dir, dut, mm)
         pin_data = char_results.data
+        CharResultStore.save(_get_result_path(cell_specs, gen_specs, sim_env_name),
+                             sim_env_name, lib_data, pin_data)
 
-        _add_cell(lib, lib_data, pin_data)
+        # NOTE: _add_cell() modifies the pin information, so keep a copy for merged libraries
+        cell_data = deepcopy(lib_data) if keep_data else lib_data
+        _add_cell(lib, cell_data, pin_data)
         lib.generate(out_file)
+        sim_db.log(f'Finished writing {out_file}')
+        return (lib_data, pin_data) if keep_data else None
+
+
+def regenerate_liberty_library(lib_config: Mapping[str, Any],
+                               cell_specs_list: Sequence[Mapping[str, Any]], lib_name: str = '',
+                               root_dir: Optional[Path] = None, gen_all_env: bool = False
+                               ) -> None:
+    """Regenerate liberty files from stored characterization results, without simulation.
+
+    Every characterization run stores its results in a CharResultStore.  This function
+    rewrites the same liberty files from those results, so library settings in lib_config,
+    such as units or attributes, can be changed without characterizing again.  The corners
+    and LUT axes must match the characterized ones.
+
+    Parameters
+    ----------
+    lib_config : Mapping[str, Any]
+        library configuration dictionary.
+    cell_specs_list : Sequence[Mapping[str, Any]]
+        list of cell specification dictionaries.
+    lib_name : str
+        If not empty, also write a merged liberty file containing all cells for each corner.
+    root_dir : Optional[Path]
+        root directory of the merged liberty files.  Defaults to the root directory of the
+        first cell.
+    gen_all_env : bool
+        True to generate liberty files for all environments.
+    """
+    if not cell_specs_list:
+        raise ValueError('No cell specifications given.')
+
+    gen_specs_list: List[Mapping[str, Any]] = [read_yaml(cell_specs['gen_specs_file'])
+                                               for cell_specs in cell_specs_list]
+    if root_dir is None:
+        root_dir = Path(gen_specs_list[0]['root_dir'])
+
+    for sim_env_name, cur_lib_config in _get_env_list(lib_config, gen_all_env)[1]:
+        merged_lib = Library(f'{lib_name}_{sim_env_name}', cur_lib_config) if lib_name else None
+        for cell_specs, gen_specs in zip(cell_specs_list, gen_specs_list):
+            impl_cell: str = gen_specs['impl_cell']
+            path = _get_result_path(cell_specs, gen_specs, sim_env_name)
+            lib_data, pin_data = CharResultStore.load(path)[1:]
+            _restore_bus_range(lib_data)
+
+            lib = Library(f'{impl_cell}_{sim_env_name}', cur_lib_config)
+            if merged_lib is not None:
+                _add_cell(merged_lib, deepcopy(lib_data), pin_data)
+            _add_cell(lib, lib_data, pin_data)
+            lib_file_name = _get_lib_file_name(cell_specs, gen_specs, sim_env_name)
+            lib.generate(Path(gen_specs['root_dir']) / f'{lib_file_name}.lib')
+
+        if merged_lib is not None:
+            merged_lib.generate(root_dir / f'{lib_name}_{sim_env_name}.lib')
+
+
+def _get_lib_file_name(cell_specs: Mapping[str, Any], gen_specs: Mapping[str, Any],
+                       sim_env_name: str) -> str:
+    return f'{_get_lib_base_name(cell_specs, gen_specs["impl_cell"])}_{sim_env_name}'
+
+
+def _get_lib_base_name(cell_specs: Mapping[str, Any], impl_cell: str) -> str:
+    scenario: str = cell_specs.get('scenario', '')
+    return f'{impl_cell}_{scenario}' if scenario else impl_cell
+
+
+def _get_result_path(cell_specs: Mapping[str, Any], gen_specs: Mapping[str, Any],
+                     sim_env_name: str) -> Path:
+    lib_file_name = _get_lib_file_name(cell_specs, gen_specs, sim_env_name)
+    return Path(gen_specs['root_dir']) / 'lib_gen' / 'results' / lib_file_name
+
+
+def _restore_bus_range(lib_data: Mapping[str, Any]) -> None:
+    for key in ['input_pins', 'output_pins', 'inout_pins']:
+        for pin_info in lib_data.get(key, []):
+            if pin_info.get('basename', ''):
+                pin_info['bus_range'] = parse_cdba_name(pin_info['name'])[1]
+
+
+def _get_estimate_specs(sim_config: Mapping[str, Any], cell_specs: Mapping[str, Any],
+                        gen_specs: Mapping[str, Any]) -> Dict[str, Any]:
+    """Returns the estimation specification of the given cell.
+
+    Input and output stage sizes are guessed from the generator parameters.  The cell
+    specification may override them with the estimate_seg dictionary, which has optional
+    entries seg_in, seg_out, and seg_table, a dictionary from pin name to segments.
+    """
+    rc_table: Optional[Mapping[str, Any]] = sim_config.get('estimate_rc_table', None)
+    if rc_table is None:
+        raise ValueError('sim_config must specify estimate_rc_table for estimation.')
+
+    seg_specs: Mapping[str, Any] = cell_specs.get('estimate_seg', {})
+    seg_in, seg_out = get_seg_sizes(gen_specs.get('params', None) or {})
+    return dict(
+        rc_table=rc_table,
+        seg_in=seg_specs.get('seg_in', seg_in),
+        seg_out=seg_specs.get('seg_out', seg_out),
+        seg_table=seg_specs.get('seg_table', {}),
+    )
 
 
 def get_cell_info(lib: Library, impl_cell: str, cell_specs: Mapping[str, Any], lib_root_dir: Path,
@@ -194,6 +579,11 @@ def get_cell_info(lib: Library, impl_cell: str, cell_specs: Mapping[str, Any], l
     diff_list: Sequence[Tuple[Sequence[str], Sequence[str]]] = cell_props.get('pin_opposite', [])
 
     custom_meas: Mapping[str, Mapping[str, Any]] = cell_specs.get('custom_measurements', {})
+    bus_symmetry: Mapping[str, Any] = cell_specs.get('bus_symmetry', {})
+    group_delay_arcs: bool = cell_specs.get('group_delay_arcs', False)
+    batch_cond_arcs: bool = cell_specs.get('batch_cond_arcs', False)
+    cone_prune: Union[bool, Mapping[str, Any]] = cell_specs.get('cone_prune', False)
+    sparse_lut: Mapping[str, Any] = cell_specs.get('sparse_lut', {})
 
     # get supply values
     sup_values: Dict[str, float] = {}
@@ -234,6 +624,11 @@ def get_cell_info(lib: Library, impl_cell: str, cell_specs: Mapping[str, Any], l
         out_io_info_table=out_io_info_table,
         seq_timing=seq_timing,
         custom_meas=custom_meas,
+        bus_symmetry=bus_symmetry,
+        group_delay_arcs=group_delay_arcs,
+        batch_cond_arcs=batch_cond_arcs,
+        cone_prune=cone_prune,
+        sparse_lut=sparse_lut,
         in_pin_list=in_pin_list,
         out_pin_list=out_pin_list,
         io_pin_list=io_pin_list,
@@ -258,7 +653,10 @@ def get_cell_info(lib: Library, impl_cell: str, cell_specs: Mapping[str, Any], l
     # get working directory
     vstr_table = {k: voltage_fmt.format(v).replace('.', 'p') for k, v in sup_values.items()}
     voltage_string = '_'.join((f'{k}_{vstr_table[k]}' for k in sorted(vstr_table.keys())))
-    work_dir = lib_root_dir / sim_envs[0] / voltage_string
+    # NOTE: every cell and scenario gets its own directory, since many cells are characterized
+    # concurrently under the same root directory
+    work_dir = (lib_root_dir / 'char' / _get_lib_base_name(cell_specs, impl_cell) / sim_envs[0] /
+                voltage_string)
 
     # construct result dictionary
     lib_data = {k: cell_specs[k] for k in ['props', 'pwr_pins', 'gnd_pins']}
@@ -340,11 +738,7 @@ def _get_pin_info_list(src_list: Sequence[Mapping[str, Any]], defaults: Mapping[
             elif len(values) != num_bits:
                 raise ValueError(f'values list of bus {pin_name} length mismatch')
             else:
-                values = []
-                for val_ in values:
-                    val_ = val_.copy()
-                    val_.update(cur_defaults)
-                    values.append(val_)
+                values = [dict(cur_defaults, **val_) for val_ in values]
 
             # record power domain and reset values
             for bus_idx, bit_info in zip(bus_range, values):
@@ -420,7 +814,7 @@ def _add_pins(cell: Cell, pin_type: TermType, pin_list: List[Dict[str, Any]],
                 pin = bus.create_pin(idx, pin_type, cur_info)
                 if timing_list is not None:
                     for timing in timing_list:
-                        pin.add_timing(**timing)
+                        pin.add_timing(**load_timing(timing))
         else:
             # scalar pin
             pin_name = pin_info['name']
@@ -433,4 +827,4 @@ def _add_pins(cell: Cell, pin_type: TermType, pin_list: List[Dict[str, Any]],
             pin = cell.create_pin(pin_type, pin_info)
             if timing_list is not None:
                 for timing in timing_list:
-                    pin.add_timing(**timing)
+                    pin.add_timing(**load_timing(timing))
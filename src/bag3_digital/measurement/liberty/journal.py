@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Optional, Dict, BinaryIO
+
+import os
+import pickle
+from pathlib import Path
+
+
+class MeasJournal:
+    """An append-only journal of completed measurements of a characterization run.
+
+    Each record is written and flushed to disk as soon as a measurement completes, so a run
+    that dies can be resumed without repeating finished measurements.  The journal starts
+    with the content hash of the run configuration.  A journal with a different hash is
+    discarded.  A truncated record at the end, left by a killed run, is ignored.
+
+    Parameters
+    ----------
+    path : Path
+        the journal file.
+    key : str
+        content hash of the run configuration.
+    resume : bool
+        True to load records of a previous run with the same configuration.  Otherwise, start
+        a new journal.
+    """
+
+    def __init__(self, path: Path, key: str, resume: bool) -> None:
+        self._path = path
+        self._table: Dict[str, Any] = {}
+
+        valid_size = self._read(key) if resume else 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if valid_size > 0:
+            self._file: Optional[BinaryIO] = path.open('r+b')
+            self._file.truncate(valid_size)
+            self._file.seek(valid_size)
+        else:
+            self._table.clear()
+            self._file = path.open('wb')
+            self._write(key)
+
+    @property
+    def num_loaded(self) -> int:
+        """int: number of measurements loaded from a previous run."""
+        return len(self._table)
+
+    def get(self, meas_id: str) -> Optional[Any]:
+        """Returns results of the given measurement from a previous run, or None if not found."""
+        return self._table.get(meas_id, None)
+
+    def add(self, meas_id: str, result: Any) -> None:
+        """Records results of a completed measurement."""
+        if self._file is not None:
+            self._write((meas_id, result))
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read(self, key: str) -> int:
+        """Loads records of a previous run, and returns the size of its valid part in bytes."""
+        if not self._path.is_file():
+            return 0
+
+        valid_size = 0
+        with self._path.open('rb') as f:
+            try:
+                if pickle.load(f) != key:
+                    return 0
+                valid_size = f.tell()
+                while True:
+                    meas_id, result = pickle.load(f)
+                    self._table[meas_id] = result
+                    valid_size = f.tell()
+            except (EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+                pass
+        return valid_size
+
+    def _write(self, obj: Any) -> None:
+        pickle.dump(obj, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        os.fsync(self._file.fileno())
@@ -0,0 +1,179 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Mapping, Optional, Dict, List, Tuple, Callable, Awaitable, TypeVar
+
+import time
+import heapq
+import asyncio
+from pathlib import Path
+from fnmatch import fnmatchcase
+
+from bag.io.file import read_yaml, write_yaml
+
+T = TypeVar('T')
+
+# default estimated run time of each measurement type, in seconds
+default_costs = dict(
+    in_cap=60.0,
+    out_cap=60.0,
+    delay=30.0,
+    custom=120.0,
+    seq=600.0,
+)
+
+
+class MeasScheduler:
+    """Runs measurements with bounded concurrency, highest priority and longest job first.
+
+    The cost of a measurement is its run time in the history file, otherwise the average run
+    time of its type, otherwise the default cost of its type.  A scheduler shared by many jobs
+    bounds their total number of measurements in flight.
+
+    Parameters
+    ----------
+    max_jobs : int
+        maximum number of measurements running concurrently.
+    history_file : Path
+        the run time history file.
+    costs : Mapping[str, float]
+        overrides of default_costs.
+    priorities : Mapping[str, int]
+        priority of measurements, keyed by glob patterns of measurement IDs.  Defaults to 0.
+        If many patterns match, the highest priority is used.
+    """
+
+    def __init__(self, max_jobs: int, history_file: Path,
+                 costs: Optional[Mapping[str, float]] = None,
+                 priorities: Optional[Mapping[str, int]] = None) -> None:
+        if max_jobs < 1:
+            raise ValueError('max_jobs must be positive.')
+
+        self._max_jobs = max_jobs
+        self._history_file = history_file
+        self._costs = dict(default_costs)
+        if costs:
+            self._costs.update(costs)
+        self._priorities = priorities or {}
+
+        self._history: Mapping[str, Mapping[str, float]] = {}
+        if history_file.is_file():
+            self._history = read_yaml(history_file) or {}
+        self._kind_costs: Dict[str, float] = {}
+        kind_times: Dict[str, List[float]] = {}
+        for info in self._history.values():
+            kind_times.setdefault(info['kind'], []).append(info['run_time'])
+        for kind, time_list in kind_times.items():
+            self._kind_costs[kind] = sum(time_list) / len(time_list)
+
+        self._num_running = 0
+        self._waiting: List[Tuple[int, float, int, asyncio.Future]] = []
+        self._counter = 0
+        self._dispatch_pending = False
+        self._run_times: Dict[str, Dict[str, Any]] = {}
+
+    def get_cost(self, meas_id: str, kind: str, job_name: str = '') -> float:
+        info = self._history.get(_get_history_key(meas_id, job_name), None)
+        if info is not None:
+            return info['run_time']
+        cost = self._kind_costs.get(kind, None)
+        return self._costs.get(kind, 0.0) if cost is None else cost
+
+    def get_priority(self, meas_id: str, priorities: Optional[Mapping[str, int]] = None) -> int:
+        if priorities is None:
+            priorities = self._priorities
+        return max((val for pat, val in priorities.items() if fnmatchcase(meas_id, pat)),
+                   default=0)
+
+    def schedule(self, meas_id: str, kind: str, meas_fun: Callable[[], Awaitable[T]],
+                 job_name: str = '', priorities: Optional[Mapping[str, int]] = None
+                 ) -> Callable[[], Awaitable[T]]:
+        """Returns a measurement function that waits for a slot before running the given one.
+
+        Parameters
+        ----------
+        meas_id : str
+            the measurement ID.
+        kind : str
+            the measurement type.
+        meas_fun : Callable[[], Awaitable[T]]
+            the measurement function.
+        job_name : str
+            the characterization job name, if this scheduler is shared by many jobs.
+        priorities : Optional[Mapping[str, int]]
+            If given, overrides the priorities of this scheduler.
+
+        Returns
+        -------
+        sched_fun : Callable[[], Awaitable[T]]
+            the scheduled measurement function.
+        """
+        hist_key = _get_history_key(meas_id, job_name)
+
+        async def _run() -> T:
+            await self._acquire(self.get_priority(meas_id, priorities),
+                                self.get_cost(meas_id, kind, job_name))
+            t_start = time.time()
+            try:
+                ans = await meas_fun()
+            finally:
+                self._release()
+            self._run_times[hist_key] = dict(kind=kind, run_time=time.time() - t_start)
+            return ans
+
+        return _run
+
+    def save_history(self) -> None:
+        """Saves run times of measurements in this run, keeping old ones not run this time."""
+        history = dict(self._history)
+        history.update(self._run_times)
+        self._history_file.parent.mkdir(parents=True, exist_ok=True)
+        write_yaml(self._history_file, history)
+
+    async def _acquire(self, priority: int, cost: float) -> None:
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiting, (-priority, -cost, self._counter, future))
+        self._counter += 1
+        # NOTE: dispatch in a later event loop iteration, so that all measurements launched
+        # together are ordered before any of them starts.
+        self._schedule_dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # slot was granted before cancellation, give it back
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        self._num_running -= 1
+        self._schedule_dispatch()
+
+    def _schedule_dispatch(self) -> None:
+        if not self._dispatch_pending:
+            self._dispatch_pending = True
+            asyncio.get_event_loop().call_soon(self._dispatch)
+
+    def _dispatch(self) -> None:
+        self._dispatch_pending = False
+        while self._waiting and self._num_running < self._max_jobs:
+            future = heapq.heappop(self._waiting)[3]
+            if not future.cancelled():
+                self._num_running += 1
+                future.set_result(None)
+
+
+def _get_history_key(meas_id: str, job_name: str) -> str:
+    return f'{job_name}/{meas_id}' if job_name else meas_id
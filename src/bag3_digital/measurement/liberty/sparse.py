@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Mapping, Sequence, Tuple, List, Union
+
+import numpy as np
+
+
+class SparseLUTSampler:
+    """Samples a 2D NLDM LUT sparsely, and fills the rest of the LUT with a fitted model.
+
+    Along each axis, num_fit indices (always including both ends) are used to fit the model,
+    and num_check other indices are held out to validate the fit.  The simulated sub-grid is
+    the cartesian product of the union of those indices.  Delay and transition are fitted
+    with the polynomial
+
+        f(x, y) = a0 + a1 * x + a2 * y + a3 * x * y + a4 * x**2 + a5 * y**2
+
+    in normalized coordinates.  The quadratic terms are dropped if num_fit < 3.
+
+    Parameters
+    ----------
+    swp_info : Union[Sequence[Tuple[str, Mapping[str, Any]]], Mapping[str, Mapping[str, Any]]]
+        the full LUT sweep information.  Both axes must be LIST sweeps.
+    num_fit : int
+        number of fitting indices per axis.
+    num_check : int
+        number of held-out validation indices per axis.
+    """
+
+    def __init__(self, swp_info: Union[Sequence[Tuple[str, Mapping[str, Any]]],
+                                       Mapping[str, Mapping[str, Any]]],
+                 num_fit: int = 3, num_check: int = 1) -> None:
+        if isinstance(swp_info, Mapping):
+            swp_info = list(swp_info.items())
+        if len(swp_info) != 2:
+            raise ValueError('Sparse LUT sampling only supports 2D LUTs.')
+        if num_fit < 2:
+            raise ValueError('Sparse LUT sampling needs at least 2 fitting points per axis.')
+
+        self._names: List[str] = []
+        self._values: List[np.ndarray] = []
+        self._fit_idx: List[np.ndarray] = []
+        self._sim_idx: List[np.ndarray] = []
+        for var_name, swp_specs in swp_info:
+            if swp_specs.get('type', 'LIST') != 'LIST' or 'values' not in swp_specs:
+                raise ValueError(f'Sparse LUT sampling requires LIST sweep of {var_name}.')
+            values = np.asarray(swp_specs['values'], dtype=float)
+            num = len(values)
+            fit_idx = np.unique(np.rint(np.linspace(0, num - 1, min(num_fit, num))).astype(int))
+            rest_idx = np.setdiff1d(np.arange(num), fit_idx)
+            if num_check > 0 and rest_idx.size > 0:
+                # pick held-out points evenly among the remaining ones
+                pos = np.rint(np.linspace(0, rest_idx.size - 1, min(num_check, rest_idx.size)))
+                check_idx = rest_idx[np.unique(pos.astype(int))]
+            else:
+                check_idx = np.empty(0, dtype=int)
+
+            self._names.append(var_name)
+            self._values.append(values)
+            self._fit_idx.append(fit_idx)
+            self._sim_idx.append(np.union1d(fit_idx, check_idx))
+
+        self._use_quad = num_fit >= 3
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return tuple((len(values) for values in self._values))
+
+    @property
+    def num_sim_points(self) -> int:
+        return int(np.prod([idx.size for idx in self._sim_idx]))
+
+    @property
+    def swp_info(self) -> List[Tuple[str, Mapping[str, Any]]]:
+        """List[Tuple[str, Mapping[str, Any]]]: the sparse sweep information to simulate."""
+        return [(name, dict(type='LIST', values=values[idx].tolist()))
+                for name, values, idx in zip(self._names, self._values, self._sim_idx)]
+
+    def fill(self, sim_data: np.ndarray) -> Tuple[np.ndarray, float]:
+        """Fill the full LUT from data simulated on the sparse sub-grid.
+
+        Parameters
+        ----------
+        sim_data : np.ndarray
+            the simulated data, with shape given by the sparse sweep.
+
+        Returns
+        -------
+        lut : np.ndarray
+            the full LUT.  Simulated points are kept as is, others come from the fitted model.
+        err : float
+            maximum fit error at the held-out points, relative to the maximum magnitude of the
+            simulated data.  0 if there are no held-out points.
+        """
+        idx0, idx1 = self._sim_idx
+        if sim_data.shape != (idx0.size, idx1.size):
+            raise ValueError(f'Sparse LUT data shape {sim_data.shape} mismatch.')
+
+        # normalize coordinates for numerical conditioning
+        x_full, y_full = [values / np.max(np.abs(values)) for values in self._values]
+        xx, yy = np.meshgrid(x_full[idx0], y_full[idx1], indexing='ij')
+        fit_mask = np.logical_and.outer(np.isin(idx0, self._fit_idx[0]),
+                                        np.isin(idx1, self._fit_idx[1]))
+
+        mat = self._get_terms(xx[fit_mask], yy[fit_mask])
+        coeffs = np.linalg.lstsq(mat, sim_data[fit_mask], rcond=None)[0]
+
+        check_mask = ~fit_mask
+        if np.any(check_mask):
+            pred = self._get_terms(xx[check_mask], yy[check_mask]) @ coeffs
+            scale = max(np.max(np.abs(sim_data)), np.finfo(float).tiny)
+            err = float(np.max(np.abs(pred - sim_data[check_mask])) / scale)
+        else:
+            err = 0.0
+
+        xx_full, yy_full = np.meshgrid(x_full, y_full, indexing='ij')
+        lut = (self._get_terms(xx_full.ravel(), yy_full.ravel()) @ coeffs).reshape(self.shape)
+        lut[np.ix_(idx0, idx1)] = sim_data
+        return lut, err
+
+    def _get_terms(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        terms = [np.ones_like(x), x, y, x * y]
+        if self._use_quad:
+            terms.append(x * x)
+            terms.append(y * y)
+        return np.stack(terms, axis=-1)
@@ -0,0 +1,216 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Mapping, Dict, Union, Tuple, BinaryIO
+
+import os
+import pickle
+from uuid import uuid4
+from pathlib import Path
+from itertools import chain
+
+import numpy as np
+
+
+class ArcDataRef:
+    """A reference to the LUT data of a timing arc stored on disk.
+
+    Parameters
+    ----------
+    path : Path
+        the npz file containing the LUT data.
+    """
+
+    __slots__ = ['_path']
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def load(self) -> Dict[str, np.ndarray]:
+        with np.load(self._path) as npz_file:
+            return {name: npz_file[name] for name in npz_file.files}
+
+
+class ArcDataStore:
+    """Stores LUT data of timing arcs on disk as soon as they are characterized.
+
+    This lets characterization results hold only references to the data, so memory usage
+    does not grow with the number of arcs.  The data is loaded back one pin at a time when
+    the liberty file is written.
+
+    Parameters
+    ----------
+    root_dir : Path
+        the data directory.
+    """
+
+    def __init__(self, root_dir: Path) -> None:
+        self._root_dir = root_dir
+
+    def save(self, arc_id: str, data: Mapping[str, Any]) -> ArcDataRef:
+        """Writes LUT data of the given arc to disk, and returns a reference to it."""
+        self._root_dir.mkdir(parents=True, exist_ok=True)
+        path = self._root_dir / f'{arc_id}.npz'
+        np.savez(path, **data)
+        return ArcDataRef(path)
+
+
+def load_timing(timing: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Returns the given timing arc, with LUT data loaded from disk if necessary."""
+    data: Union[Mapping[str, Any], ArcDataRef] = timing['data']
+    if isinstance(data, ArcDataRef):
+        ans = dict(timing)
+        ans['data'] = data.load()
+        return ans
+    return timing
+
+
+class _LUTRef:
+    """Location of an array in the data file of a characterization result store."""
+
+    __slots__ = ['offset', 'shape']
+
+    def __init__(self, offset: int, shape: Tuple[int, ...]) -> None:
+        self.offset = offset
+        self.shape = shape
+
+
+class CharResultStore:
+    """A compact binary store of the characterization results of one cell at one corner.
+
+    The store is a directory with two files.  The data file holds every floating point array of
+    the results back to back as little-endian float64, and is memory-mapped on load.  index.pkl
+    holds the cell information, the result structure, with arrays replaced by their location
+    in the data file, and the name of the data file.  Loading a store therefore only reads the
+    small index, and liberty files can be regenerated from it without re-entering the
+    characterization pipeline.
+
+    Every save writes a new, uniquely named data file first, then replaces the index
+    atomically.  So a crash or a concurrent load never pairs an index with the wrong data.
+    """
+
+    version = 2
+    index_name = 'index.pkl'
+    data_name = 'data.bin'
+    dtype = np.dtype('<f8')
+
+    @classmethod
+    def save(cls, path: Path, sim_env_name: str, lib_data: Mapping[str, Any],
+             pin_data: Mapping[str, Any]) -> None:
+        """Saves characterization results.
+
+        Parameters
+        ----------
+        path : Path
+            the store directory.
+        sim_env_name : str
+            the corner name.
+        lib_data : Mapping[str, Any]
+            the cell information.
+        pin_data : Mapping[str, Any]
+            the characterization results.  LUT data may be references to streamed data.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        data_name = f'data_{uuid4().hex}.bin'
+        with (path / data_name).open('wb') as f:
+            index = dict(
+                version=cls.version,
+                sim_env_name=sim_env_name,
+                data_name=data_name,
+                lib_data=_encode(_strip_bus_range(lib_data), f),
+                pin_data=_encode(pin_data, f),
+            )
+        # NOTE: replacing the index is the commit point of the save
+        index_tmp = path / f'{cls.index_name}.{uuid4().hex}.tmp'
+        with index_tmp.open('wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(index_tmp, path / cls.index_name)
+
+        # remove data files of previous saves
+        for data_file in chain(path.glob('data_*.bin'), [path / cls.data_name]):
+            if data_file.name != data_name and data_file.is_file():
+                data_file.unlink()
+
+    @classmethod
+    def load(cls, path: Path) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """Loads characterization results.
+
+        Returns
+        -------
+        sim_env_name : str
+            the corner name.
+        lib_data : Dict[str, Any]
+            the cell information.
+        pin_data : Dict[str, Any]
+            the characterization results.  Arrays are read-only views of the memory-mapped
+            data file.
+        """
+        with (path / cls.index_name).open('rb') as f:
+            index = pickle.load(f)
+        version: int = index['version']
+        if version not in (1, cls.version):
+            raise ValueError(f'Unsupported characterization result store version in {path}')
+
+        # NOTE: version 1 stores always use the same data file name
+        data_file = path / index.get('data_name', cls.data_name)
+        if data_file.stat().st_size > 0:
+            data = np.memmap(data_file, dtype=cls.dtype, mode='r')
+        else:
+            data = np.empty(0, dtype=cls.dtype)
+        return (index['sim_env_name'], _decode(index['lib_data'], data),
+                _decode(index['pin_data'], data))
+
+
+def _strip_bus_range(lib_data: Mapping[str, Any]) -> Dict[str, Any]:
+    # NOTE: bus ranges are recomputed from pin names on load
+    ans = dict(lib_data)
+    for key in ['input_pins', 'output_pins', 'inout_pins']:
+        if key in ans:
+            ans[key] = [{k: v for k, v in pin_info.items() if k != 'bus_range'}
+                        for pin_info in ans[key]]
+    return ans
+
+
+def _encode(obj: Any, f: BinaryIO) -> Any:
+    if isinstance(obj, ArcDataRef):
+        return _encode(obj.load(), f)
+    if isinstance(obj, np.ndarray) and np.issubdtype(obj.dtype, np.floating):
+        offset = f.tell() // CharResultStore.dtype.itemsize
+        f.write(np.ascontiguousarray(obj, dtype=CharResultStore.dtype).tobytes())
+        return _LUTRef(offset, obj.shape)
+    if isinstance(obj, Mapping):
+        return {key: _encode(val, f) for key, val in obj.items()}
+    if isinstance(obj, list):
+        return [_encode(val, f) for val in obj]
+    if isinstance(obj, tuple):
+        return tuple((_encode(val, f) for val in obj))
+    return obj
+
+
+def _decode(obj: Any, data: np.ndarray) -> Any:
+    if isinstance(obj, _LUTRef):
+        size = int(np.prod(obj.shape, dtype=int))
+        return data[obj.offset:obj.offset + size].reshape(obj.shape)
+    if isinstance(obj, dict):
+        return {key: _decode(val, data) for key, val in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(val, data) for val in obj]
+    if isinstance(obj, tuple):
+        return tuple((_decode(val, data) for val in obj))
+    return obj
@@ -0,0 +1,133 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Optional, Dict, List, Callable, Awaitable, TypeVar
+
+import json
+import time
+from pathlib import Path
+from contextvars import ContextVar
+
+T = TypeVar('T')
+
+_cur_record: ContextVar[Optional[Dict[str, Any]]] = ContextVar('_cur_record', default=None)
+
+
+class MeasTelemetry:
+    """Records timing of every measurement of a characterization run.
+
+    For each measurement, records the time it was submitted, started and finished, and the
+    number of simulation requests it sent to the simulation database.  A nested search counts as
+    one request.  Times are in seconds since the epoch.  Results can be exported as JSON lines,
+    or as a Chrome trace timeline (viewable in chrome://tracing or Perfetto).
+
+    Parameters
+    ----------
+    run_name : str
+        name of this run, used as the process name in the trace.
+    """
+
+    def __init__(self, run_name: str) -> None:
+        self._run_name = run_name
+        self._records: List[Dict[str, Any]] = []
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        return self._records
+
+    def track(self, meas_id: str, kind: str, meas_fun: Callable[[], Awaitable[T]]
+              ) -> Callable[[], Awaitable[T]]:
+        """Returns a measurement function that records telemetry of the given one.
+
+        The submit time is the time this method is called.
+        """
+        t_submit = time.time()
+
+        async def _run() -> T:
+            record = dict(id=meas_id, kind=kind, t_submit=t_submit, t_start=time.time(),
+                          t_end=0.0, num_sims=0, status='running')
+            self._records.append(record)
+            token = _cur_record.set(record)
+            try:
+                ans = await meas_fun()
+                record['status'] = 'done'
+                return ans
+            except BaseException:
+                record['status'] = 'error'
+                raise
+            finally:
+                _cur_record.reset(token)
+                record['t_end'] = time.time()
+
+        return _run
+
+    @staticmethod
+    def count_sim() -> None:
+        """Count one simulation request towards the measurement running in this context."""
+        record = _cur_record.get()
+        if record is not None:
+            record['num_sims'] += 1
+
+    def write_jsonl(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w') as f:
+            for record in self._records:
+                info = dict(record)
+                info['queue_time'] = record['t_start'] - record['t_submit']
+                info['run_time'] = record['t_end'] - record['t_start']
+                f.write(json.dumps(info))
+                f.write('\n')
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Writes a Chrome trace timeline.
+
+        Measurements are packed into as few rows as possible, so the number of rows shows the
+        peak concurrency.  A counter track shows the number of running measurements over time.
+        """
+        events: List[Dict[str, Any]] = [dict(name='process_name', ph='M', pid=0, tid=0,
+                                             args=dict(name=self._run_name))]
+        lane_ends: List[float] = []
+        edges = []
+        for record in sorted(self._records, key=lambda x: x['t_start']):
+            t_start = record['t_start']
+            t_end = record['t_end'] or t_start
+            for lane, lane_end in enumerate(lane_ends):
+                if lane_end <= t_start:
+                    lane_ends[lane] = t_end
+                    break
+            else:
+                lane = len(lane_ends)
+                lane_ends.append(t_end)
+
+            events.append(dict(name=record['id'], cat=record['kind'], ph='X', pid=0, tid=lane,
+                               ts=_to_us(t_start), dur=_to_us(t_end - t_start),
+                               args=dict(num_sims=record['num_sims'], status=record['status'],
+                                         queue_time=t_start - record['t_submit'])))
+            edges.append((t_start, 1))
+            edges.append((t_end, -1))
+
+        num_running = 0
+        for t, delta in sorted(edges):
+            num_running += delta
+            events.append(dict(name='running', ph='C', pid=0, ts=_to_us(t),
+                               args=dict(running=num_running)))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w') as f:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), f)
+
+
+def _to_us(t: float) -> int:
+    return int(round(t * 1e6))
@@ -0,0 +1,130 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Any, Mapping, Optional, Dict, Tuple
+
+from pathlib import Path
+
+from bag.io.file import read_yaml, write_yaml
+
+
+class CapBoundCache:
+    """A persistent cache of measured capacitances, used to warm start capacitance searches.
+
+    Values are stored per measurement key (for example, the rising input capacitance of a pin)
+    and per corner.  A guess for a corner comes from the value of that corner in a previous
+    run, otherwise from the range of values of other corners.
+
+    The file is read and written on every access, so that concurrent corners of the same cell
+    see each other's results as soon as they are measured.
+
+    Parameters
+    ----------
+    path : Path
+        the cache file.
+    sim_env : str
+        the current corner name.
+    guess_range : float
+        relative range of the guess around the cached value.
+    """
+
+    def __init__(self, path: Path, sim_env: str, guess_range: float = 0.1) -> None:
+        self._path = path
+        self._sim_env = sim_env
+        self._guess_range = guess_range
+
+    def get_guess(self, key: str, scale: float = 1.0) -> Optional[Tuple[float, float]]:
+        """Returns the search guess of the given measurement, or None if not found.
+
+        Parameters
+        ----------
+        key : str
+            the measurement key.
+        scale : float
+            cached values are multiplied by this factor.
+
+        Returns
+        -------
+        guess : Optional[Tuple[float, float]]
+            the lower and upper guess.
+        """
+        env_table: Mapping[str, float] = self._read().get(key, {})
+        val = env_table.get(self._sim_env, None)
+        if val is not None:
+            val_min = val_max = val
+        elif env_table:
+            # NOTE: use the range of other corners as the guess
+            val_min = min(env_table.values())
+            val_max = max(env_table.values())
+        else:
+            return None
+        return (val_min * scale * (1 - self._guess_range),
+                val_max * scale * (1 + self._guess_range))
+
+    def update(self, key: str, value: float) -> None:
+        """Records the measured value of the given measurement at the current corner."""
+        table = self._read()
+        env_table = dict(table.get(key, {}))
+        env_table[self._sim_env] = float(value)
+        table[key] = env_table
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        write_yaml(self._path, table)
+
+    def _read(self) -> Dict[str, Any]:
+        if not self._path.is_file():
+            return {}
+        return dict(read_yaml(self._path) or {})
+
+
+def get_warm_search_params(search_params: Mapping[str, Any], guess: Tuple[float, float],
+                           bound_scale: float) -> Dict[str, Any]:
+    """Returns search parameters tightened around the given guess.
+
+    The search interval is tightened to [guess[0] / bound_scale, guess[1] * bound_scale],
+    but never beyond the original interval.  An unbounded search becomes bounded.
+    """
+    low: float = search_params['low']
+    high: Optional[float] = search_params.get('high', None)
+
+    new_low = max(low, guess[0] / bound_scale)
+    new_high = guess[1] * bound_scale
+    if high is not None:
+        new_high = min(high, new_high)
+    if new_high <= new_low:
+        # NOTE: guess is outside the original interval, ignore it
+        return dict(search_params)
+
+    ans = dict(search_params)
+    ans['low'] = new_low
+    ans['high'] = new_high
+    ans['guess'] = (max(guess[0], new_low), min(guess[1], new_high))
+    return ans
+
+
+def hit_warm_bound(search_params: Mapping[str, Any], warm_params: Mapping[str, Any],
+                   value: float) -> bool:
+    """Returns True if the search result is at a tightened bound.
+
+    If so, the answer may be outside of the tightened interval, and the search should be
+    repeated with the original parameters.
+    """
+    tol: float = search_params['tol']
+    low: float = search_params['low']
+    high: Optional[float] = search_params.get('high', None)
+    new_low: float = warm_params['low']
+    new_high: float = warm_params['high']
+    if new_low > low and value - new_low <= tol:
+        return True
+    return (high is None or new_high < high) and new_high - value <= tol
@@ -0,0 +1,228 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reuse of the post-reset state across digital transient simulations.
+
+The reset window is simulated once per testbench at the first sweep point, and later
+simulations start from its final state with reset pins deasserted.
+
+The reset specification dictionary has the following entries:
+
+root_dir : str
+    directory of the saved states.  Must be visible to the simulator.
+mode : str
+    Defaults to 'ic'.  'ic' to force the saved state, or 'nodeset' to only steer the DC
+    solution towards it.
+"""
+
+from typing import Any, Mapping, Optional, Dict, List, Tuple, Iterable, Sequence, cast
+
+import os
+import asyncio
+from pathlib import Path
+from uuid import uuid4
+
+from pybag.core import get_cdba_name_bits
+
+from bag.simulation.data import AnalysisTran
+from bag.simulation.core import TestbenchManager
+from bag.simulation.cache import SimulationDB, DesignInstance
+
+from bag3_testbenches.measurement.tran.digital import DigitalTranTB
+
+from .liberty.cache import get_content_hash, get_file_hash
+
+
+def get_reset_state_file(reset_specs: Mapping[str, Any], dut: Optional[DesignInstance],
+                         tbm_specs: Mapping[str, Any], tb_params: Mapping[str, Any],
+                         stim_params: Iterable[str] = ()) -> Optional[Path]:
+    """Returns the saved post-reset state file of the given testbench.
+
+    Returns None if the state cannot be reused, which is the case with corner sweeps.
+
+    Parameters
+    ----------
+    reset_specs : Mapping[str, Any]
+        the reset specification dictionary.
+    dut : Optional[DesignInstance]
+        the DUT.
+    tbm_specs : Mapping[str, Any]
+        the DigitalTranTB specifications.
+    tb_params : Mapping[str, Any]
+        the testbench schematic parameters.
+    stim_params : Iterable[str]
+        simulation parameters that only affect stimuli after reset.  They are not part of the
+        key, so simulations that differ only in these parameters share the same state.
+
+    Returns
+    -------
+    state_file : Optional[Path]
+        the saved state file, which may not exist yet.
+    """
+    if len(tbm_specs['sim_envs']) != 1:
+        return None
+
+    swp_vars = [var for var, _ in _get_swp_list(tbm_specs)]
+    key_specs = {k: v for k, v in tbm_specs.items() if k not in {'swp_info', 'save_outputs'}}
+    stim_params = set(stim_params)
+    key_specs['sim_params'] = {k: v for k, v in tbm_specs.get('sim_params', {}).items()
+                               if k not in stim_params}
+    netlist_path = None if dut is None else dut.netlist_path
+    key = get_content_hash(dict(netlist=get_file_hash(netlist_path), tbm_specs=key_specs,
+                                swp_vars=swp_vars, tb_params=tb_params))
+    return Path(reset_specs['root_dir']).resolve() / f'{key}.ic'
+
+
+def get_reset_tmp_file(state_file: Path) -> Path:
+    """Returns a unique temporary file for a reset simulation to write the given state to."""
+    return state_file.with_name(f'{state_file.stem}_{uuid4().hex}.tmp')
+
+
+def make_reset_tbm(sim_db: SimulationDB, tbm_specs: Mapping[str, Any], tmp_file: Path
+                   ) -> DigitalTranTB:
+    """Creates the testbench that simulates the reset window only, and saves the final state.
+
+    Swept parameters are fixed at their first values.
+    """
+    specs = dict(tbm_specs)
+    sim_params = dict(specs.get('sim_params', {}))
+    for var, swp_specs in _get_swp_list(tbm_specs):
+        sim_params[var] = _get_first_value(swp_specs)
+    specs['sim_params'] = sim_params
+    specs['swp_info'] = []
+    specs['tran_options'] = dict(specs.get('tran_options', {}), writefinal=str(tmp_file))
+
+    tmp_file.parent.mkdir(parents=True, exist_ok=True)
+    tbm = cast(DigitalTranTB, sim_db.make_tbm(DigitalTranTB, specs))
+    tbm.sim_params['t_sim'] = tbm.t_rst_end_expr
+    check_tran_options(tbm)
+    return tbm
+
+
+def commit_reset_state(tmp_file: Path, state_file: Path) -> None:
+    """Moves the state written by a reset simulation to the saved state file."""
+    if not tmp_file.is_file():
+        raise ValueError(f'Reset simulation did not write the final state to {tmp_file}')
+    # NOTE: atomic, so concurrent readers never see a partial file
+    os.replace(tmp_file, state_file)
+
+
+def check_tran_options(tbm: TestbenchManager) -> None:
+    """Raises ValueError if the netlist of the given testbench misses any transient options.
+
+    Saved states are written and read through transient options, so a testbench that drops
+    them would silently start from an arbitrary operating point.
+    """
+    tran_options: Mapping[str, Any] = tbm.specs.get('tran_options', {})
+    if not tran_options:
+        return
+    for ana in tbm.get_netlist_info().analyses:
+        if isinstance(ana, AnalysisTran):
+            options = getattr(ana, 'options', None) or {}
+            missing = [key for key in tran_options if key not in options]
+            if missing:
+                raise ValueError(f'{type(tbm).__name__} does not netlist transient options '
+                                 f'{missing}, cannot reuse post-reset states.')
+            return
+    raise ValueError(f'{type(tbm).__name__} has no transient analysis.')
+
+
+def apply_reset_state(reset_specs: Mapping[str, Any], tbm_specs: Mapping[str, Any],
+                      state_file: Path) -> Dict[str, Any]:
+    """Returns testbench specifications that skip reset and start from the saved state."""
+    mode: str = reset_specs.get('mode', 'ic')
+
+    if mode == 'nodeset':
+        tran_options = dict(readns=str(state_file))
+    elif mode == 'ic':
+        tran_options = dict(readic=str(state_file), skipdc='yes')
+    else:
+        raise ValueError(f'Unknown reset state mode: {mode}')
+
+    ans = dict(tbm_specs)
+    ans['tran_options'] = dict(ans.get('tran_options', {}), **tran_options)
+    # NOTE: drive reset pins at their deasserted values from time zero, so that the sources
+    # agree with the saved state
+    pin_values = dict(ans.get('pin_values', {}))
+    reset_list: Sequence[Tuple[str, bool]] = ans.get('reset_list', [])
+    for pin, active_high in reset_list:
+        num_bits = len(get_cdba_name_bits(pin))
+        pin_values[pin] = 0 if active_high else (1 << num_bits) - 1
+    ans['pin_values'] = pin_values
+    ans['reset_list'] = []
+    sim_params = dict(ans.get('sim_params', {}))
+    sim_params['t_rst'] = 0
+    ans['sim_params'] = sim_params
+    return ans
+
+
+async def async_setup_reset_state(sim_db: SimulationDB, sim_dir: Path,
+                                  dut: Optional[DesignInstance], tbm_specs: Mapping[str, Any],
+                                  tb_params: Mapping[str, Any],
+                                  reset_specs: Optional[Mapping[str, Any]], tb_name: str,
+                                  stim_params: Iterable[str] = (),
+                                  tasks: Optional[Dict[Path, asyncio.Future]] = None
+                                  ) -> Dict[str, Any]:
+    """Returns testbench specifications that skip reset and start from the saved state.
+
+    The reset window is simulated first if its final state is not saved yet.  Returns a copy
+    of the given specifications if reset_specs is empty, or if the state cannot be reused.
+    See get_reset_state_file() for stim_params.  If given, tasks holds the reset simulations
+    in progress, so that concurrent callers sharing it simulate each state once.
+    """
+    if not reset_specs:
+        return dict(tbm_specs)
+    state_file = get_reset_state_file(reset_specs, dut, tbm_specs, tb_params,
+                                      stim_params=stim_params)
+    if state_file is None:
+        return dict(tbm_specs)
+
+    if not state_file.is_file():
+        if tasks is None:
+            tasks = {}
+        task = tasks.get(state_file, None)
+        if task is None:
+            tasks[state_file] = task = asyncio.ensure_future(
+                _async_simulate_reset(sim_db, sim_dir, dut, tbm_specs, tb_params, state_file,
+                                      tb_name))
+            task.add_done_callback(lambda _: tasks.pop(state_file, None))
+        await task
+    return apply_reset_state(reset_specs, tbm_specs, state_file)
+
+
+async def _async_simulate_reset(sim_db: SimulationDB, sim_dir: Path,
+                                dut: Optional[DesignInstance], tbm_specs: Mapping[str, Any],
+                                tb_params: Mapping[str, Any], state_file: Path, tb_name: str
+                                ) -> None:
+    tmp_file = get_reset_tmp_file(state_file)
+    tbm = make_reset_tbm(sim_db, tbm_specs, tmp_file)
+    # NOTE: testbenches of the same measurement may have different states
+    await sim_db.async_simulate_tbm_obj('reset', sim_dir / f'reset_{state_file.stem[:8]}', dut,
+                                        tbm, tb_params, tb_name=f'{tb_name}_reset')
+    commit_reset_state(tmp_file, state_file)
+
+
+def _get_swp_list(tbm_specs: Mapping[str, Any]) -> List[Tuple[str, Mapping[str, Any]]]:
+    swp_info = tbm_specs.get('swp_info', [])
+    if isinstance(swp_info, Mapping):
+        return list(swp_info.items())
+    return [(var, swp_specs) for var, swp_specs in swp_info]
+
+
+def _get_first_value(swp_specs: Mapping[str, Any]) -> Any:
+    swp_type: str = swp_specs['type']
+    if swp_type == 'LIST':
+        return swp_specs['values'][0]
+    return swp_specs['start']
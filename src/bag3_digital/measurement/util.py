@@ -13,7 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Mapping, Any, Tuple, Sequence, Dict, Iterable, Optional
+from typing import Mapping, Any, Tuple, Sequence, Dict, Iterable, Optional, Union
+
+import math
 
 from pybag.enum import TermType
 from pybag.core import get_cdba_name_bits
@@ -120,3 +122,27 @@ def get_digital_wrapper_params(specs: Mapping[str, Any], dut: DesignInstance,
         pwr_domain=pwr_domain,
     )
     return wrapper_params
+
+
+def get_select_expr(var: str, values: Sequence[Union[float, str]]) -> str:
+    """Returns an expression of integer variable var that evaluates to values[var].
+
+    Uses the Lagrange polynomial through all indices, which is exact at integer indices since
+    all other basis polynomials have a zero factor there.  Values can be numbers or parameter
+    names.
+    """
+    num = len(values)
+    terms = []
+    for idx, val in enumerate(values):
+        if isinstance(val, str):
+            val_str = val
+        elif val == 0:
+            continue
+        else:
+            val_str = f'({float(val):.9g})'
+        denom = math.prod(idx - k for k in range(num) if k != idx)
+        factors = [val_str]
+        factors.extend(f'({var}-{k})' for k in range(num) if k != idx)
+        term = '*'.join(factors)
+        terms.append(term if denom == 1 else f'{term}/({denom})')
+    return '+'.join(terms) if terms else '0'
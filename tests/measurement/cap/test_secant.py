@@ -0,0 +1,92 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+import pytest
+
+pytest.importorskip('bag')
+pytest.importorskip('bag3_testbenches')
+
+from bag3_digital.measurement.cap.secant import _update_search
+
+TOL = 1.0e-3
+
+
+def _search(fun, x0, x1, root=None, **kwargs):
+    search_params = dict(low=0.0, tol=TOL)
+    search_params.update(kwargs)
+    info = dict(values=[x0, x1], xs=[], fs=[], tds=[], interp=False, width=math.inf)
+    while True:
+        for x in info['values']:
+            info['xs'] = info['xs'] + [x]
+            info['fs'] = info['fs'] + [fun(x)]
+        done, info = _update_search(info, search_params)
+        if info.get('a', None) is not None and root is not None:
+            # the bracket always contains the answer
+            assert info['a'] <= root <= info['b']
+            assert info['fa'] < 0 < info['fb']
+        if done:
+            return info
+
+
+def _get_best(info):
+    idx = min(range(len(info['xs'])), key=lambda i: abs(info['fs'][i]))
+    return info['xs'][idx]
+
+
+def test_linear_converges_in_one_step():
+    info = _search(lambda x: 2.0 * (x - 0.3), 0.0, 1.0, root=0.3)
+    assert len(info['xs']) <= 4
+    assert _get_best(info) == pytest.approx(0.3, abs=TOL)
+
+
+@pytest.mark.parametrize('fun, root', [
+    (lambda x: x ** 3 - 0.125, 0.5),
+    (lambda x: math.exp(8 * x) - math.exp(8 * 0.9), 0.9),
+    (lambda x: math.tanh(50 * (x - 0.2)), 0.2),
+])
+def test_nonlinear_no_slower_than_bisection(fun, root):
+    info = _search(fun, 0.0, 1.0, root=root)
+    assert info['b'] - info['a'] <= TOL
+    # two end points, and at most two points per bisection step
+    assert len(info['xs']) <= 2 + 2 * math.ceil(math.log2(1.0 / TOL))
+
+
+def test_expand_up():
+    info = _search(lambda x: math.sqrt(x) - math.sqrt(10.0), 0.0, 1.0, root=10.0)
+    assert max(info['xs']) > 10.0
+    assert _get_best(info) == pytest.approx(10.0, abs=TOL)
+
+
+def test_expand_down_stops_at_low():
+    info = _search(lambda x: x + 1.0, 2.0, 3.0)
+    assert min(info['xs']) == 0.0
+    assert info.get('a', None) is None
+
+
+def test_upper_bound_too_small():
+    with pytest.raises(ValueError, match='upper bound'):
+        _search(lambda x: x - 10.0, 0.0, 1.0, high=2.0)
+
+
+def test_max_err():
+    with pytest.raises(ValueError, match='max_err'):
+        _search(lambda x: x - 10.0, 0.0, 1.0, max_err=5.0)
+
+
+def test_max_iter():
+    with pytest.raises(ValueError, match='did not converge'):
+        _search(lambda x: math.tanh(50 * (x - 0.2)), 0.0, 1.0, max_iter=4)
@@ -0,0 +1,87 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pathlib import Path
+
+import pytest
+
+from bag3_digital.measurement.liberty.cone import NetlistCone
+
+CDL_NETLIST = """\
+.SUBCKT inv in out VDD VSS
+MP0 out in VDD VDD pch_lvt w=1 l=1
+MN0 out in VSS VSS nch_lvt w=1 l=1
+.ENDS
+
+.SUBCKT nand a b out VDD VSS
+MP0 out a VDD VDD pch_lvt w=1 l=1
+MP1 out b VDD VDD pch_lvt w=1 l=1
+MN0 out a mid VSS nch_lvt w=1 l=1
+MN1 mid b VSS VSS nch_lvt w=1 l=1
+.ENDS
+
+.SUBCKT top in0 in1 in2 out0 out1 VDD VSS
+XI0 in0 m0 VDD VSS / inv
+XI1 m0 out0 VDD VSS / inv
+XI2 m0 m1 out1 VDD VSS / nand
+XI3 in2 m2 VDD VSS / inv
+XI4 in1 m1 VDD VSS / inv
+.ENDS
+"""
+
+SPECTRE_NETLIST = """\
+subckt inv in out VDD VSS
+    MP0 (out in VDD VDD) pfet_lvt w=1 l=1
+    MN0 (out in VSS VSS) nfet_lvt w=1 l=1
+ends inv
+subckt top in0 out0 VDD VSS
+    XI0 (in0 out0 VDD VSS) inv
+    XI1 (out0 m1 VDD VSS) inv
+    XI2 (m1 m2 VDD VSS) inv
+ends top
+"""
+
+
+def _get_cone(tmp_path: Path, text: str, name: str, out_pins, **kwargs):
+    path = tmp_path / name
+    path.write_text(text)
+    return NetlistCone(path, 'top', ['VDD', 'VSS'], **kwargs).get_cone(out_pins)
+
+
+def test_cdl_cone(tmp_path: Path) -> None:
+    # the nand is a boundary load of m0, so the fan-in of its other input is kept
+    assert _get_cone(tmp_path, CDL_NETLIST, 'top.cdl', ['out0']) == {'XI0', 'XI1', 'XI2', 'XI4'}
+
+
+def test_spectre_cone(tmp_path: Path) -> None:
+    assert _get_cone(tmp_path, SPECTRE_NETLIST, 'top.scs', ['out0']) == {'XI0', 'XI1'}
+
+
+def test_spectre_unknown_model(tmp_path: Path) -> None:
+    # NOTE: ports of unknown primitives are bidirectional, so the load XI1 also drives m1
+    assert _get_cone(tmp_path, SPECTRE_NETLIST, 'top.scs', ['out0'],
+                     mos_models=['foo*']) == {'XI0', 'XI1', 'XI2'}
+
+
+def test_missing_cell(tmp_path: Path) -> None:
+    path = tmp_path / 'top.cdl'
+    path.write_text(CDL_NETLIST)
+    with pytest.raises(ValueError):
+        NetlistCone(path, 'not_top', ['VDD', 'VSS'])
+
+
+def test_missing_output(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        _get_cone(tmp_path, CDL_NETLIST, 'top.cdl', ['out2'])
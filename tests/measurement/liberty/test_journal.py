@@ -0,0 +1,102 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from bag3_digital.measurement.liberty.journal import MeasJournal
+
+KEY = 'abc123'
+
+
+def _make_result(idx: int):
+    return dict(cell_rise=np.full((2, 3), float(idx)), cond=('a', idx), name=f'arc{idx}')
+
+
+def _write_journal(path, num):
+    journal = MeasJournal(path, KEY, False)
+    for idx in range(num):
+        journal.add(f'meas{idx}', _make_result(idx))
+    journal.close()
+
+
+def _check_result(journal, idx):
+    ans = journal.get(f'meas{idx}')
+    np.testing.assert_array_equal(ans['cell_rise'], _make_result(idx)['cell_rise'])
+    assert ans['cond'] == ('a', idx)
+
+
+def test_resume(tmp_path):
+    path = tmp_path / 'journal.pkl'
+    _write_journal(path, 3)
+    journal = MeasJournal(path, KEY, True)
+    assert journal.num_loaded == 3
+    for idx in range(3):
+        _check_result(journal, idx)
+    assert journal.get('meas3') is None
+    journal.close()
+
+
+def test_no_resume_or_new_key(tmp_path):
+    path = tmp_path / 'journal.pkl'
+    _write_journal(path, 2)
+    journal = MeasJournal(path, KEY, False)
+    assert journal.num_loaded == 0
+    journal.close()
+
+    _write_journal(path, 2)
+    journal = MeasJournal(path, 'other', True)
+    assert journal.num_loaded == 0
+    journal.close()
+    # the old journal is replaced
+    journal = MeasJournal(path, KEY, True)
+    assert journal.num_loaded == 0
+    journal.close()
+
+
+def test_replay_after_truncation(tmp_path):
+    path = tmp_path / 'journal.pkl'
+    _write_journal(path, 2)
+    size_2 = path.stat().st_size
+    _write_journal(path, 3)
+    content = path.read_bytes()
+
+    # a run killed at any point while writing the last record
+    for size in range(size_2, len(content)):
+        path.write_bytes(content[:size])
+        journal = MeasJournal(path, KEY, True)
+        assert journal.num_loaded == 2
+        # the truncated record is dropped, and new records append after valid ones
+        journal.add('meas3', _make_result(3))
+        journal.close()
+
+        journal = MeasJournal(path, KEY, True)
+        assert journal.num_loaded == 3
+        for idx in (0, 1, 3):
+            _check_result(journal, idx)
+        journal.close()
+
+
+def test_truncated_key(tmp_path):
+    path = tmp_path / 'journal.pkl'
+    _write_journal(path, 1)
+    path.write_bytes(path.read_bytes()[:3])
+    journal = MeasJournal(path, KEY, True)
+    assert journal.num_loaded == 0
+    journal.add('meas0', _make_result(0))
+    journal.close()
+
+    journal = MeasJournal(path, KEY, True)
+    _check_result(journal, 0)
+    journal.close()
@@ -0,0 +1,108 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+import pytest
+
+pytest.importorskip('bag')
+
+from bag3_digital.measurement.liberty.sched import MeasScheduler, default_costs
+
+
+def _run_all(sched, jobs, priorities=None):
+    started = []
+    num_running = [0, 0]
+
+    def _make_fun(meas_id):
+        async def _fun():
+            started.append(meas_id)
+            num_running[0] += 1
+            num_running[1] = max(num_running)
+            await asyncio.sleep(0.01)
+            num_running[0] -= 1
+            return meas_id
+        return _fun
+
+    async def _main():
+        return await asyncio.gather(*(sched.schedule(meas_id, kind, _make_fun(meas_id),
+                                                     priorities=priorities)()
+                                      for meas_id, kind in jobs))
+
+    results = asyncio.run(_main())
+    assert results == [meas_id for meas_id, _ in jobs]
+    return started, num_running[1]
+
+
+def test_longest_job_first(tmp_path):
+    sched = MeasScheduler(1, tmp_path / 'history.yaml', costs=dict(custom=5.0))
+    jobs = [('d0', 'delay'), ('s0', 'seq'), ('c0', 'in_cap'), ('x0', 'custom'), ('d1', 'delay')]
+    started, max_running = _run_all(sched, jobs)
+    # equal costs start in launch order
+    assert started == ['s0', 'c0', 'd0', 'd1', 'x0']
+    assert max_running == 1
+
+
+def test_priority_before_cost(tmp_path):
+    sched = MeasScheduler(1, tmp_path / 'history.yaml', priorities={'d*': 1, 'd1': 2})
+    jobs = [('s0', 'seq'), ('d0', 'delay'), ('c0', 'in_cap'), ('d1', 'delay')]
+    started, _ = _run_all(sched, jobs)
+    assert started == ['d1', 'd0', 's0', 'c0']
+    assert sched.get_priority('d1') == 2
+    assert sched.get_priority('d1', {}) == 0
+
+
+def test_max_jobs(tmp_path):
+    sched = MeasScheduler(3, tmp_path / 'history.yaml')
+    _, max_running = _run_all(sched, [(f'd{idx}', 'delay') for idx in range(10)])
+    assert max_running == 3
+
+    with pytest.raises(ValueError):
+        MeasScheduler(0, tmp_path / 'history.yaml')
+
+
+def test_history_costs(tmp_path):
+    history_file = tmp_path / 'history.yaml'
+    sched = MeasScheduler(2, history_file)
+    _run_all(sched, [('d0', 'delay'), ('d1', 'delay')])
+    sched.save_history()
+
+    sched = MeasScheduler(2, history_file)
+    cost = sched.get_cost('d0', 'delay')
+    assert 0 < cost < default_costs['delay']
+    # unknown measurements use the average of their type, or the default cost
+    avg = (cost + sched.get_cost('d1', 'delay')) / 2
+    assert sched.get_cost('d2', 'delay') == pytest.approx(avg)
+    assert sched.get_cost('c0', 'in_cap') == default_costs['in_cap']
+    # run times of different jobs are kept apart
+    assert sched.get_cost('d0', 'delay', job_name='other') == pytest.approx(avg)
+
+
+def test_cancel_releases_slot(tmp_path):
+    sched = MeasScheduler(1, tmp_path / 'history.yaml')
+
+    async def _block():
+        await asyncio.sleep(10)
+
+    async def _done():
+        return True
+
+    async def _main():
+        task = asyncio.ensure_future(sched.schedule('s0', 'seq', _block)())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        return await asyncio.wait_for(sched.schedule('d0', 'delay', _done)(), 1.0)
+
+    assert asyncio.run(_main())
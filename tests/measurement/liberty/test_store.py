@@ -0,0 +1,117 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from bag3_digital.measurement.liberty.store import CharResultStore, ArcDataStore
+
+LIB_DATA = dict(
+    cell_name='nand2',
+    input_pins=[dict(name='in<1:0>', bus_range=(1, 0), cap=1.0e-15)],
+    output_pins=[dict(name='out', bus_range=None)],
+)
+
+
+def _make_pin_data(scale: float):
+    return dict(
+        out=dict(
+            timing=[dict(related='in<0>', cond=('a', 1),
+                         data=dict(cell_rise=scale * np.arange(6.0).reshape(2, 3),
+                                   rise_transition=scale * np.ones((2, 3))))],
+            cap=np.array(scale * 2.0e-15),
+            num_sims=3,
+        ),
+    )
+
+
+def _check_equal(actual, expected):
+    if isinstance(expected, np.ndarray):
+        np.testing.assert_array_equal(actual, expected)
+        assert actual.shape == expected.shape
+    elif isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key, val in expected.items():
+            _check_equal(actual[key], val)
+    elif isinstance(expected, (list, tuple)):
+        assert type(actual) is type(expected) and len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            _check_equal(a, e)
+    else:
+        assert actual == expected
+
+
+def test_round_trip(tmp_path):
+    pin_data = _make_pin_data(1.0)
+    CharResultStore.save(tmp_path, 'tt_25', LIB_DATA, pin_data)
+    sim_env_name, lib_data, pin_data_load = CharResultStore.load(tmp_path)
+
+    assert sim_env_name == 'tt_25'
+    assert lib_data['cell_name'] == 'nand2'
+    # bus ranges are not stored
+    assert lib_data['input_pins'] == [dict(name='in<1:0>', cap=1.0e-15)]
+    _check_equal(pin_data_load, pin_data)
+    assert not pin_data_load['out']['cap'].flags.writeable
+
+
+def test_round_trip_streamed(tmp_path):
+    data = dict(cell_fall=np.linspace(0.0, 1.0, 12).reshape(3, 4))
+    ref = ArcDataStore(tmp_path / 'arcs').save('arc0', data)
+    CharResultStore.save(tmp_path / 'store', 'ff', {}, dict(out=dict(timing=[dict(data=ref)])))
+    _, _, pin_data = CharResultStore.load(tmp_path / 'store')
+    _check_equal(pin_data['out']['timing'][0]['data'], data)
+
+
+def test_no_arrays(tmp_path):
+    CharResultStore.save(tmp_path, 'ss', {}, dict(out=dict(func='!a')))
+    assert CharResultStore.load(tmp_path) == ('ss', {}, dict(out=dict(func='!a')))
+
+
+def test_resave(tmp_path):
+    CharResultStore.save(tmp_path, 'tt', LIB_DATA, _make_pin_data(1.0))
+    CharResultStore.save(tmp_path, 'tt', LIB_DATA, _make_pin_data(2.0))
+    _check_equal(CharResultStore.load(tmp_path)[2], _make_pin_data(2.0))
+    # data files of previous saves are removed
+    assert len(list(tmp_path.glob('data_*.bin'))) == 1
+
+
+def test_failed_save_keeps_old_results(tmp_path, monkeypatch):
+    CharResultStore.save(tmp_path, 'tt', LIB_DATA, _make_pin_data(1.0))
+
+    def _fail(*args, **kwargs):
+        raise OSError('crash')
+
+    # crash right before the index is replaced
+    monkeypatch.setattr(os, 'replace', _fail)
+    with pytest.raises(OSError):
+        CharResultStore.save(tmp_path, 'tt', LIB_DATA, _make_pin_data(2.0))
+    monkeypatch.undo()
+
+    _check_equal(CharResultStore.load(tmp_path)[2], _make_pin_data(1.0))
+
+
+def test_bad_version(tmp_path):
+    CharResultStore.save(tmp_path, 'tt', {}, {})
+    index_file = tmp_path / CharResultStore.index_name
+    with index_file.open('rb') as f:
+        index = pickle.load(f)
+    index['version'] = CharResultStore.version + 1
+    with index_file.open('wb') as f:
+        pickle.dump(index, f)
+    with pytest.raises(ValueError, match='version'):
+        CharResultStore.load(tmp_path)
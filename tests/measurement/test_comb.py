@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+
+import pytest
+
+pytest.importorskip('bag')
+pytest.importorskip('bag3_testbenches')
+
+from bag3_digital.measurement.comb import (
+    _get_cond_batches, _num_cyclic_changes, _get_staggered_pulses, _get_window_start
+)
+
+
+def _in_t_bit(expr: str) -> float:
+    if expr == 't_bit':
+        return 1.0
+    assert expr.endswith('*t_bit')
+    return float(expr[:-len('*t_bit')])
+
+
+def _check_batches(val_list, batches):
+    assert sorted(idx for idx_list in batches for idx in idx_list) == list(range(len(val_list)))
+    for idx_list in batches:
+        for pin_idx in range(len(val_list[0])):
+            assert _num_cyclic_changes([val_list[idx][pin_idx] for idx in idx_list]) <= 2
+
+
+@pytest.mark.parametrize('seq, expected', [
+    ([0], 0),
+    ([1, 1], 0),
+    ([0, 1], 2),
+    ([0, 0, 1, 1], 2),
+    ([1, 0, 0, 1], 2),
+    ([1, 0, 1, 0], 4),
+])
+def test_num_cyclic_changes(seq, expected):
+    assert _num_cyclic_changes(seq) == expected
+
+
+def test_cond_batches_single():
+    assert _get_cond_batches([[1, 0]]) == [[0]]
+
+
+def test_cond_batches_two_pins_gray_order():
+    # all conditions of two side inputs fit in one simulation in Gray code order
+    val_list = [[0, 0], [1, 1], [0, 1], [1, 0]]
+    assert _get_cond_batches(val_list) == [[0, 2, 1, 3]]
+
+
+def test_cond_batches_three_pins():
+    val_list = [list(vals) for vals in itertools.product((0, 1), repeat=3)]
+    batches = _get_cond_batches(val_list)
+    _check_batches(val_list, batches)
+    # the last side input toggles 4 times around the full Gray code cycle
+    assert [[val_list[idx] for idx in idx_list] for idx_list in batches] == [
+        [[0, 0, 0], [0, 0, 1], [0, 1, 1], [0, 1, 0], [1, 1, 0]],
+        [[1, 1, 1], [1, 0, 1], [1, 0, 0]],
+    ]
+
+
+def test_cond_batches_duplicate_conditions():
+    val_list = [[1, 0], [0, 1], [1, 0], [0, 1]]
+    batches = _get_cond_batches(val_list)
+    _check_batches(val_list, batches)
+    assert len(batches) == 1
+
+
+@pytest.mark.parametrize('num_win', [1, 2, 5])
+def test_staggered_windows(num_win):
+    in_pins = [f'in<{idx}>' for idx in range(num_win)]
+    pulse_list = _get_staggered_pulses(in_pins)
+    assert [pulse['pin'] for pulse in pulse_list] == in_pins
+    for idx, pulse in enumerate(pulse_list):
+        t_start = _get_window_start(idx, 1.0)
+        t_rise = _in_t_bit(pulse['td'])
+        t_fall = t_rise + _in_t_bit(pulse['tpw'])
+        # the input rises half a bit into its window and falls half a bit before the next one
+        assert t_rise == t_start + 0.5
+        assert t_fall + 0.5 == _get_window_start(idx + 1, 1.0)
+        # the pulse does not repeat before the end of simulation
+        assert t_rise + _in_t_bit(pulse['tper']) >= 2 * num_win + 1
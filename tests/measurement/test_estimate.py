@@ -0,0 +1,48 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from bag3_digital.measurement.estimate import RCEstimator
+
+RC_TABLE = dict(c_gate=1.0e-15, c_drain=0.5e-15, r_unit_p=20.0e3, r_unit_n=10.0e3)
+SWP_INFO = [('t_rf', dict(type='LIST', values=[10.0e-12, 50.0e-12])),
+            ('c_load', dict(type='LIST', values=[1.0e-15, 5.0e-15, 10.0e-15]))]
+KEYS = ['cell_rise', 'cell_fall', 'rise_transition', 'fall_transition']
+
+
+def test_rise_fall_asymmetry() -> None:
+    est = RCEstimator(dict(RC_TABLE, k_delay_trf=0, k_trf_trf=0), 'tt', 0.1, 0.9)
+    data = est.get_delay_data(2, KEYS, SWP_INFO)
+    for key in KEYS:
+        assert data[key].shape == (2, 3)
+    np.testing.assert_allclose(data['cell_rise'], 2 * data['cell_fall'])
+    np.testing.assert_allclose(data['rise_transition'], 2 * data['fall_transition'])
+
+
+def test_max_cap() -> None:
+    est = RCEstimator(RC_TABLE, 'tt', 0.1, 0.9)
+    max_trf = 100.0e-12
+    max_cap = est.get_max_cap(2, max_trf)
+    data = est.get_delay_data(2, ['rise_transition'], [('t_rf', dict(values=[0.0])),
+                                                       ('c_load', dict(values=[max_cap]))])
+    np.testing.assert_allclose(data['rise_transition'], max_trf)
+
+
+def test_max_cap_unreachable() -> None:
+    est = RCEstimator(RC_TABLE, 'tt', 0.1, 0.9)
+    with pytest.raises(ValueError):
+        est.get_max_cap(2, 1.0e-15)
@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: Apache-2.0
+# Copyright 2019 Blue Cheetah Analog Design Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip('bag')
+pytest.importorskip('bag3_testbenches')
+
+from bag3_digital.measurement.flop import _get_waves, _get_seed_windows, _get_probe
+
+LOW = -200.0e-12
+HIGH = 200.0e-12
+TOL = 1.0e-12
+MAX_ITER = 2 * int(math.ceil(math.log2((HIGH - LOW) / TOL))) + 2
+
+
+def _bisect(threshold: np.ndarray, w_lo: np.ndarray, w_hi: np.ndarray) -> np.ndarray:
+    lo = np.full(threshold.shape, LOW)
+    hi = np.full(threshold.shape, HIGH)
+    for _ in range(MAX_ITER):
+        active = hi - lo > TOL
+        if not np.any(active):
+            break
+        probe = _get_probe(lo, hi, w_lo, w_hi, active, TOL)
+        ok = probe >= threshold
+        hi = np.where(active & ok, probe, hi)
+        lo = np.where(active & ~ok, probe, lo)
+    return hi
+
+
+@pytest.mark.parametrize('n_rf, n_clk', [(1, 1), (1, 2), (1, 5), (5, 1), (2, 2), (3, 3),
+                                         (4, 7), (7, 6)])
+def test_waves_cover_grid_once(n_rf: int, n_clk: int) -> None:
+    count = np.zeros((n_rf, n_clk), dtype=int)
+    for blocks in _get_waves(n_rf, n_clk):
+        assert blocks
+        for rows, cols in blocks:
+            assert rows and cols
+            count[np.ix_(rows, cols)] += 1
+    assert np.all(count == 1)
+
+
+def test_waves_single_row() -> None:
+    assert _get_waves(1, 5) == [[([0], [0, 2, 4])], [([0], [1, 3])]]
+    assert _get_waves(1, 2) == [[([0], [0, 1])]]
+    assert _get_waves(1, 1) == [[([0], [0])]]
+
+
+def test_seed_windows() -> None:
+    values = np.array([[10.0, 0.0, 20.0]])
+    solved = np.array([[True, False, True]])
+    mask = np.ones(values.shape, dtype=bool)
+    w_lo, w_hi = _get_seed_windows(values, solved, mask, -100.0, 100.0, 1.0)
+    assert w_lo[0, 1] == 9.0 and w_hi[0, 1] == 21.0
+    # solved points keep the full range
+    assert w_lo[0, 0] == -100.0 and w_hi[0, 0] == 100.0
+    # windows are clipped to the search range
+    w_lo, w_hi = _get_seed_windows(values, solved, mask, 9.5, 20.5, 1.0)
+    assert w_lo[0, 1] == 9.5 and w_hi[0, 1] == 20.5
+    # points without solved neighbors get the full range
+    w_lo, w_hi = _get_seed_windows(values, np.zeros(values.shape, dtype=bool), mask, -100.0,
+                                   100.0, 1.0)
+    assert np.all(w_lo == -100.0) and np.all(w_hi == 100.0)
+
+
+@pytest.mark.parametrize('threshold', [-150.0e-12, 25.0e-12, 30.0e-12, 35.0e-12, 190.0e-12])
+def test_seeded_search(threshold: float) -> None:
+    # the window is seeded around 30 ps, the first and last thresholds miss it
+    values = np.array([[28.0e-12, 0.0, 32.0e-12]])
+    solved = np.array([[True, False, True]])
+    mask = ~solved
+    w_lo, w_hi = _get_seed_windows(values, solved, mask, LOW, HIGH, TOL)
+    target = np.full(values.shape, threshold)
+    ans = _bisect(target, w_lo, w_hi)
+    assert 0 <= ans[0, 1] - threshold <= TOL